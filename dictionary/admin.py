@@ -7,9 +7,10 @@ from django.urls import reverse
 from tinymce.widgets import TinyMCE
 from .models import (
     Language, CustomUser, Category, CategoryTranslation, Tag, TagTranslation,
-    Word, Translation, Example, Favourite, SearchHistory, WordLike,
+    Word, Translation, Example, Favourite, SearchHistory, SearchQueryDaily, WordLike,
     WordChangeLog, WordHistory, InterfaceTranslation
 )
+from .interface_catalog import publish as publish_interface_catalog
 
 # Добавляем ссылку на дашборд переводов в админку
 class TranslationDashboardAdmin(admin.ModelAdmin):
@@ -156,7 +157,7 @@ class ExampleInline(admin.TabularInline):
 class WordAdmin(admin.ModelAdmin):
     list_display = ['word', 'language', 'category', 'status', 'created_at']
     list_filter = ['language', 'category', 'status', 'created_at', 'difficulty']
-    search_fields = ['word', 'meaning']
+    search_fields = ['word', 'meaning_text']
     inlines = [TranslationInline]
     readonly_fields = ['created_at', 'updated_at']
     
@@ -341,12 +342,19 @@ class FavouriteAdmin(admin.ModelAdmin):
 
 @admin.register(SearchHistory)
 class SearchHistoryAdmin(admin.ModelAdmin):
-    list_display = ['user', 'word', 'searched_at']
-    list_filter = ['searched_at']
+    list_display = ['user', 'word', 'language', 'results_count', 'searched_at']
+    list_filter = ['searched_at', 'language']
     search_fields = ['user__username', 'word']
     readonly_fields = ['searched_at']
     ordering = ['-searched_at']
 
+@admin.register(SearchQueryDaily)
+class SearchQueryDailyAdmin(admin.ModelAdmin):
+    list_display = ['day', 'query', 'language', 'searches', 'zero_result_searches', 'is_miss']
+    list_filter = ['day', 'language', 'is_miss']
+    search_fields = ['query']
+    ordering = ['-day', '-searches']
+
 @admin.register(WordLike)
 class WordLikeAdmin(admin.ModelAdmin):
     list_display = ['user', 'word', 'is_like', 'created_at']
@@ -376,7 +384,7 @@ class InterfaceTranslationAdmin(admin.ModelAdmin):
     list_filter = ['language']
     search_fields = ['key', 'value']
     ordering = ['language', 'key']
-    actions = ['add_missing_keys']
+    actions = ['add_missing_keys', 'publish_catalog']
     
     def value_preview(self, obj):
         return obj.value[:50] + '...' if len(obj.value) > 50 else obj.value
@@ -411,6 +419,11 @@ class InterfaceTranslationAdmin(admin.ModelAdmin):
         
         self.message_user(request, f'Создано {created_count} недостающих переводов интерфейса')
     add_missing_keys.short_description = 'Добавить недостающие переводы интерфейса'
+    
+    def publish_catalog(self, request, queryset):
+        versions = publish_interface_catalog()
+        self.message_user(request, f'Опубликовано каталогов строк интерфейса: {len(versions)}')
+    publish_catalog.short_description = 'Опубликовать каталог строк интерфейса'
 
 # Расширенная админка для CustomUser
 class CustomUserAdmin(UserAdmin):
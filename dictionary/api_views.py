@@ -1,8 +1,18 @@
 # API views для редактирования категорий и тегов
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
+from django.urls import reverse
 from .models import Category, CategoryTranslation, Tag, TagTranslation, Word
+from .autocomplete import suggest
+from . import result_cache
+from .search_log import recorder
+from .registry import registry
+from .interface_catalog import catalogs
+from . import query_cache, tiered_cache
 import json
+import os
 
 
 @staff_member_required
@@ -183,3 +193,64 @@ def delete_tag_api(request, tag_id):
         return JsonResponse({'error': 'Тег не найден'}, status=404)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+def autocomplete_api(request):
+    """API автодополнения по префиксу заголовка слова"""
+    query = request.GET.get('q', '').strip()
+    language_code = request.GET.get('lang', '').strip() or None
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 20)
+    except ValueError:
+        limit = 10
+    
+    is_staff = request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser)
+    suggestions = suggest(query, language_code, limit=limit, published_only=not is_staff)
+    
+    if suggestions is None:
+        # Словари ещё не собраны - запасной вариант через БД
+        words = Word.objects.filter(is_deleted=False, word__istartswith=query)
+        if not is_staff:
+            words = words.filter(status='approved')
+        if language_code:
+            words = words.filter(language__code=language_code)
+        suggestions = [
+            {'id': word_id, 'word': word, 'slug': slug, 'language': code}
+            for word_id, word, slug, code in words.order_by('word').values_list(
+                'id', 'word', 'slug', 'language__code'
+            )[:limit]
+        ] if query else []
+    
+    for suggestion in suggestions:
+        suggestion['url'] = reverse('dictionary:word_detail', kwargs={'slug': suggestion['slug']})
+    
+    return JsonResponse({'suggestions': suggestions})
+
+
+@staff_member_required
+def search_cache_stats_api(request):
+    """Счётчики кэшей, буфера истории поиска и справочника текущего процесса (воркера)"""
+    return JsonResponse({
+        'pid': os.getpid(),
+        **result_cache.results.stats(),
+        'history': recorder.stats(),
+        'registry': registry.stats(),
+        'cache': tiered_cache.stats(),
+        'queries': query_cache.stats(),
+    })
+
+
+def interface_catalog_js(request, language_code, version):
+    """JS-каталог строк интерфейса; адрес с хэшем содержимого кэшируется без срока"""
+    # '0' - каталог языка не опубликован (так же его адрес строит iface_catalog_url)
+    current = catalogs.version(language_code) or '0'
+    if version != current:
+        # Устаревшая ссылка (каталог переопубликован) - на актуальную версию
+        return redirect('dictionary:interface_catalog_js', language_code=language_code, version=current)
+    response = HttpResponse(catalogs.render_js(language_code), content_type='application/javascript; charset=utf-8')
+    if current == '0':
+        # Пустой каталог: после публикации адрес сменится, но браузер должен переспрашивать
+        patch_cache_control(response, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
@@ -0,0 +1,398 @@
+"""Словарь автодополнения: отсортированные заголовки слов в memory-mapped файлах
+
+Для каждого языка строится отдельный файл. Все воркеры gunicorn отображают
+один и тот же файл в память, поэтому копия в памяти одна на хост.
+
+Формат файла:
+    заголовок  MAGIC, количество записей (u32)
+    смещения   u32 на каждую запись, относительно начала блока записей
+    записи     ключ, слово, slug (u16 длина + UTF-8), id (u32), флаги (u8)
+
+Ключ - headword_key слова (см. normalization.fold_headword). Записи
+отсортированы по байтам ключа, поэтому префиксный поиск - двоичный.
+
+Изменения отдельных слов не пересобирают словарь: они пишутся в небольшой
+файл-дельту того же формата ({код}.delta), который накладывается на словарь
+при поиске. Запись дельты заменяет запись словаря с тем же id, удалённые
+слова отмечены флагом FLAG_DELETED. Когда дельта вырастает больше DELTA_LIMIT
+слов, словарь пересобирается целиком, а дельта удаляется.
+"""
+import fcntl
+import heapq
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from .normalization import fold_headword
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'DLEX1\n'
+HEADER = struct.Struct('<6sI')
+OFFSET = struct.Struct('<I')
+LENGTH = struct.Struct('<H')
+TAIL = struct.Struct('<IB')
+
+FLAG_PUBLISHED = 1
+FLAG_DELETED = 2
+
+# Размер дельты (слов), после которого словарь пересобирается целиком
+DELTA_LIMIT = 500
+
+# Пауза перед фоновой пересборкой: серия сохранений даёт одну пересборку
+REBUILD_DELAY = 1.0
+
+
+def lexicon_dir():
+    return getattr(settings, 'AUTOCOMPLETE_DIR', os.path.join(settings.BASE_DIR, 'var', 'autocomplete'))
+
+
+def lexicon_path(language_code):
+    return os.path.join(lexicon_dir(), f'{language_code}.lex')
+
+
+def delta_path(language_code):
+    return os.path.join(lexicon_dir(), f'{language_code}.delta')
+
+
+def language_codes():
+    return [code for code, name in settings.LANGUAGES]
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _read_records(data):
+    """Все записи файла словаря по порядку (для небольших файлов-дельт)"""
+    magic, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError('Некорректный заголовок файла словаря')
+    position = HEADER.size + OFFSET.size * count
+    records = []
+    for _ in range(count):
+        values = []
+        for _ in range(3):
+            (length,) = LENGTH.unpack_from(data, position)
+            position += LENGTH.size
+            values.append(data[position:position + length])
+            position += length
+        word_id, flags = TAIL.unpack_from(data, position)
+        position += TAIL.size
+        key, word, slug = values
+        records.append((key, word.decode('utf-8'), slug.decode('utf-8'), word_id, flags))
+    return records
+
+
+class Lexicon:
+    """Отображённый в память словарь одного языка с наложенной дельтой
+
+    Перед каждым поиском проверяется stat() обоих файлов: после атомарной
+    замены файла сборщиком словарь (или дельта) перечитывается."""
+
+    def __init__(self, path, delta_path=None):
+        self.path = path
+        self.delta_path = delta_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._mmap = None
+        self._count = 0
+        self._records_start = 0
+        self._delta_signature = None
+        self._delta = []
+        self._delta_ids = frozenset()
+
+    def _refresh(self):
+        signature = _file_signature(self.path)
+        if signature is None:
+            self._close()
+            return False
+        if signature == self._signature:
+            return self._mmap is not None
+        self._close()
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            mapped.close()
+            logger.error('Некорректный файл автодополнения: %s', self.path)
+            return False
+        self._mmap = mapped
+        self._count = count
+        self._records_start = HEADER.size + OFFSET.size * count
+        self._signature = signature
+        return True
+
+    def _refresh_delta(self):
+        signature = _file_signature(self.delta_path) if self.delta_path else None
+        if signature == self._delta_signature:
+            return
+        records = []
+        if signature is not None:
+            try:
+                with open(self.delta_path, 'rb') as f:
+                    records = _read_records(f.read())
+            except FileNotFoundError:
+                signature = None
+            except (ValueError, struct.error):
+                logger.error('Некорректный файл дельты автодополнения: %s', self.delta_path)
+        self._delta = records
+        self._delta_ids = frozenset(record[3] for record in records)
+        self._delta_signature = signature
+
+    def _close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+        self._signature = None
+        self._count = 0
+
+    def _read_string(self, position):
+        (length,) = LENGTH.unpack_from(self._mmap, position)
+        start = position + LENGTH.size
+        return self._mmap[start:start + length], start + length
+
+    def _key_at(self, index):
+        (offset,) = OFFSET.unpack_from(self._mmap, HEADER.size + OFFSET.size * index)
+        key, _ = self._read_string(self._records_start + offset)
+        return key
+
+    def _record_at(self, index):
+        (offset,) = OFFSET.unpack_from(self._mmap, HEADER.size + OFFSET.size * index)
+        key, position = self._read_string(self._records_start + offset)
+        word, position = self._read_string(position)
+        slug, position = self._read_string(position)
+        word_id, flags = TAIL.unpack_from(self._mmap, position)
+        return key, word.decode('utf-8'), slug.decode('utf-8'), word_id, flags
+
+    def lookup(self, prefix, limit=10, published_only=True):
+        """Записи (key, word, slug, id, flags), ключ которых начинается с prefix
+
+        Возвращает None, если файл словаря ещё не собран."""
+        with self._lock:
+            if not self._refresh():
+                return None
+            self._refresh_delta()
+            needle = prefix.encode('utf-8')
+            low, high = 0, self._count
+            while low < high:
+                middle = (low + high) // 2
+                if self._key_at(middle) < needle:
+                    low = middle + 1
+                else:
+                    high = middle
+            results = []
+            for index in range(low, self._count):
+                record = self._record_at(index)
+                if not record[0].startswith(needle):
+                    break
+                if record[3] in self._delta_ids:
+                    # Слово изменено после сборки - актуальная запись в дельте
+                    continue
+                if published_only and not record[4] & FLAG_PUBLISHED:
+                    continue
+                results.append(record)
+                if len(results) >= limit:
+                    break
+            changed = [
+                record for record in self._delta
+                if record[0].startswith(needle) and not record[4] & FLAG_DELETED
+                and (record[4] & FLAG_PUBLISHED or not published_only)
+            ]
+            if changed:
+                results = list(heapq.merge(results, changed, key=lambda record: record[0]))[:limit]
+            return results
+
+
+_lexicons = {}
+
+
+def get_lexicon(language_code):
+    lexicon = _lexicons.get(language_code)
+    if lexicon is None:
+        lexicon = _lexicons.setdefault(
+            language_code, Lexicon(lexicon_path(language_code), delta_path(language_code))
+        )
+    return lexicon
+
+
+def suggest(query, language_code=None, limit=10, published_only=True):
+    """Подсказки по префиксу: список словарей, отсортированных по ключу
+
+    None - словари ещё не собраны, нужно использовать запрос к БД."""
+    if not query.strip():
+        return []
+    codes = [language_code] if language_code else language_codes()
+    per_language = []
+    for code in codes:
+        # Запрос нормализуется так же, как headword_key слов этого языка
+        prefix = fold_headword(query, code)
+        if not prefix:
+            continue
+        records = get_lexicon(code).lookup(prefix, limit=limit, published_only=published_only)
+        if records is None:
+            return None
+        per_language.append([record + (code,) for record in records])
+    merged = heapq.merge(*per_language, key=lambda record: record[0])
+    return [
+        {'id': word_id, 'word': word, 'slug': slug, 'language': code}
+        for key, word, slug, word_id, flags, code in list(merged)[:limit]
+    ]
+
+
+def _entry(language_code, word_id, key, word, slug, status):
+    return (
+        (key or fold_headword(word, language_code)).encode('utf-8'), word, slug or '', word_id,
+        FLAG_PUBLISHED if status == 'approved' else 0,
+    )
+
+
+def _language_rows(language_code):
+    from .models import Word
+
+    return Word.objects.filter(
+        language__code=language_code, is_deleted=False
+    ).values_list('id', 'headword_key', 'word', 'slug', 'status')
+
+
+def _write_file(path, entries):
+    """Записывает отсортированные записи в файл и атомарно подменяет старый"""
+    offsets = bytearray()
+    records = bytearray()
+    for key, word, slug, word_id, flags in entries:
+        offsets += OFFSET.pack(len(records))
+        for value in (key, word.encode('utf-8'), slug.encode('utf-8')):
+            value = value[:0xFFFF]
+            records += LENGTH.pack(len(value)) + value
+        records += TAIL.pack(word_id, flags)
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(entries)))
+            f.write(offsets)
+            f.write(records)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def _language_lock(language_code):
+    """Блокировка файлов словаря языка между процессами (воркерами gunicorn)"""
+    directory = lexicon_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'.{language_code}.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _build(language_code):
+    entries = sorted(_entry(language_code, *row) for row in _language_rows(language_code).iterator())
+    _write_file(lexicon_path(language_code), entries)
+    try:
+        os.unlink(delta_path(language_code))
+    except FileNotFoundError:
+        pass
+    return len(entries)
+
+
+def build_lexicon(language_code):
+    """Собирает файл словаря для языка, подменяет старый и удаляет дельту"""
+    with _language_lock(language_code):
+        return _build(language_code)
+
+
+def update_lexicon(language_code, word_ids):
+    """Записывает изменения слов в дельту словаря языка
+
+    Если словарь ещё не собран или дельта выросла больше DELTA_LIMIT слов,
+    словарь пересобирается целиком. Возвращает размер дельты."""
+    with _language_lock(language_code):
+        if not os.path.exists(lexicon_path(language_code)):
+            _build(language_code)
+            return 0
+        path = delta_path(language_code)
+        delta = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    delta = {record[3]: record for record in _read_records(f.read())}
+            except (ValueError, struct.error):
+                logger.error('Некорректный файл дельты автодополнения: %s', path)
+                _build(language_code)
+                return 0
+        word_ids = set(word_ids)
+        for word_id in word_ids:
+            # Слова нет среди неудалённых слов языка - удалено или перенесено
+            delta[word_id] = (b'', '', '', word_id, FLAG_DELETED)
+        for row in _language_rows(language_code).filter(pk__in=word_ids):
+            delta[row[0]] = _entry(language_code, *row)
+        if len(delta) > DELTA_LIMIT:
+            _build(language_code)
+            return 0
+        _write_file(path, sorted(delta.values()))
+        return len(delta)
+
+
+_pending = {}
+_pending_lock = threading.Lock()
+_worker = None
+
+
+def schedule_rebuild(language_code, word_ids=None):
+    """Обновить словарь языка в фоне (повторные вызовы объединяются)
+
+    word_ids - изменённые слова, их записи попадут в дельту; None - пересобрать
+    словарь целиком."""
+    global _worker
+    with _pending_lock:
+        if word_ids is None or _pending.get(language_code, set()) is None:
+            _pending[language_code] = None
+        else:
+            _pending.setdefault(language_code, set()).update(word_ids)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_rebuild_pending, name='autocomplete-rebuild', daemon=True)
+            _worker.start()
+
+
+def _rebuild_pending():
+    global _worker
+    try:
+        while True:
+            time.sleep(REBUILD_DELAY)
+            with _pending_lock:
+                if not _pending:
+                    _worker = None
+                    return
+                pending = sorted(_pending.items())
+                _pending.clear()
+            for code, word_ids in pending:
+                try:
+                    if word_ids is None:
+                        build_lexicon(code)
+                    else:
+                        update_lexicon(code, word_ids)
+                except Exception:
+                    logger.exception('Не удалось обновить словарь автодополнения (%s)', code)
+    finally:
+        connection.close()
@@ -0,0 +1,76 @@
+"""Валидаторы публичных страниц (ETag, Last-Modified) для условных GET-запросов
+
+Валидаторы считаются до выборки и рендеринга, совпадение отдаёт 304 сразу
+(views.home, views.word_detail через django.views.decorators.http.condition).
+
+- Страница слова: время сборки её документа. WordDocument пересобирается при
+  любом изменении слова, его переводов, примеров, тегов и категории (в том
+  числе при удалении перевода или примера), поэтому built_at не меньше любой
+  из их отметок времени.
+- Главная (только анонимные пользователи): поколение выдачи поиска по языку,
+  версия справочника и счётчики словаря меняются вместе с данными страницы.
+
+В ETag входят язык интерфейса, версия его каталога строк, зритель и
+PAGE_RELEASE (новая выкладка шаблонов). Пока у пользователя есть
+непоказанные сообщения, валидаторы не выдаются: страница должна их вывести.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+
+from . import result_cache
+from .interface_catalog import catalogs
+from .registry import registry
+
+
+def _has_pending_messages(request):
+    # len() не помечает сообщения показанными, в отличие от перебора
+    return len(messages.get_messages(request)) > 0
+
+
+def _page_etag(request, *parts):
+    language = request.session.get('language', 'ru')
+    viewer = request.user.pk if request.user.is_authenticated else 0
+    payload = '|'.join(str(part) for part in (
+        getattr(settings, 'PAGE_RELEASE', ''), language, catalogs.version(language), viewer, *parts,
+    ))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _is_staff(request):
+    return request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser)
+
+
+def _document_built_at(request, slug):
+    """Время сборки документа слова; один запрос на запрос страницы"""
+    from .models import WordDocument
+
+    if not hasattr(request, '_document_built_at'):
+        documents = WordDocument.objects.filter(slug=slug, is_deleted=False)
+        if not _is_staff(request):
+            documents = documents.filter(status='approved')
+        request._document_built_at = documents.values_list('built_at', flat=True).first()
+    return request._document_built_at
+
+
+def word_detail_etag(request, slug):
+    if _has_pending_messages(request):
+        return None
+    built_at = _document_built_at(request, slug)
+    if built_at is None:
+        return None
+    return _page_etag(request, 'word', slug, built_at.isoformat())
+
+
+def word_detail_last_modified(request, slug):
+    if _has_pending_messages(request):
+        return None
+    return _document_built_at(request, slug)
+
+
+def home_etag(request):
+    if request.user.is_authenticated or _has_pending_messages(request):
+        return None
+    language_code = request.GET.get('lang', '') or None
+    return _page_etag(request, 'home', result_cache.generation(language_code), registry.version())
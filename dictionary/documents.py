@@ -0,0 +1,179 @@
+"""Документы страниц слов (WordDocument): всё, что выводит word_detail, в одной записи
+
+Документ собирается из слова, его переводов (с целевыми словами), примеров,
+тегов и категории; названия тегов и категории хранятся сразу на всех языках.
+Страница слова читает одну запись по первичному ключу (slug). Документы
+пересобираются по сигналам после коммита - только для затронутых слов.
+"""
+import logging
+import threading
+
+from django.db import transaction
+from django.db.models import Prefetch, Q
+
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+# Версия структуры data: документ другой версии пересобирается при чтении
+DOCUMENT_VERSION = 1
+
+# Слова, документы которых пересоберутся после коммита транзакции потока
+_scheduled = threading.local()
+
+
+def _language(language):
+    return {'code': language.code, 'name': language.name}
+
+
+def _names(obj, translated_name):
+    return {language.code: translated_name(obj, language.code) for language in registry.languages()}
+
+
+def build_data(word):
+    """Данные документа для слова, загруженного через document_words()"""
+    category = word.category
+    return {
+        'version': DOCUMENT_VERSION,
+        'id': word.pk,
+        'word': word.word,
+        'slug': word.slug,
+        'meaning': word.meaning,
+        'pronunciation': word.pronunciation,
+        'difficulty': word.difficulty,
+        'difficulty_display': word.get_difficulty_display(),
+        'status': word.status,
+        'status_display': word.get_status_display(),
+        'created_at': word.created_at.isoformat(),
+        'created_by': {'username': word.created_by.username} if word.created_by else None,
+        'language': _language(word.language),
+        'category': {
+            'code': category.code,
+            'names': _names(category, registry.category_name),
+        } if category else None,
+        'tags': [
+            {
+                'code': tag.code,
+                'display_mode': tag.display_mode,
+                'names': _names(tag, registry.tag_name),
+            }
+            for tag in word.tags.all()
+        ],
+        'translations': [
+            {
+                'note': translation.note,
+                'to_word': {
+                    'word': translation.to_word.word,
+                    'slug': translation.to_word.slug,
+                    'meaning': translation.to_word.meaning,
+                    'language': _language(translation.to_word.language),
+                },
+            }
+            for translation in word.from_translations.all()
+        ],
+        'examples': [
+            {
+                'text': example.text,
+                'author': {'username': example.author.username} if example.author else None,
+            }
+            for example in word.examples.all()
+        ],
+    }
+
+
+def document_words():
+    """Слова со всем, что входит в документ: шесть запросов на любую пачку"""
+    from .models import Example, Translation, Word
+
+    return Word.objects.select_related('language', 'category', 'created_by').prefetch_related(
+        'tags',
+        Prefetch('from_translations', queryset=Translation.objects.select_related('to_word__language')),
+        Prefetch('examples', queryset=Example.objects.select_related('author')),
+    )
+
+
+def rebuild(word_ids):
+    """Пересобирает документы слов; документы несуществующих слов удаляются"""
+    from .models import WordDocument
+
+    word_ids = set(word_ids)
+    if not word_ids:
+        return 0
+    documents = [
+        WordDocument(
+            slug=word.slug, word_id=word.pk, status=word.status,
+            is_deleted=word.is_deleted, data=build_data(word),
+        )
+        for word in document_words().filter(pk__in=word_ids)
+    ]
+    with transaction.atomic():
+        # slug мог перейти к другому слову: его документ тоже удаляется и соберётся при чтении
+        WordDocument.objects.filter(
+            Q(word_id__in=word_ids) | Q(slug__in=[document.slug for document in documents])
+        ).delete()
+        WordDocument.objects.bulk_create(documents)
+    return len(documents)
+
+
+def _rebuild_scheduled(sources):
+    word_ids = set()
+    try:
+        for source in sources:
+            word_ids.update(source)
+        rebuild(word_ids)
+    except Exception:
+        # Изменение уже закоммичено; устаревший документ соберётся при чтении (get_document)
+        logger.exception('Не удалось пересобрать документы слов %s', sorted(word_ids)[:20])
+
+
+def _pending_sources():
+    if not hasattr(_scheduled, 'sources'):
+        _scheduled.sources = []
+    return _scheduled.sources
+
+
+def _rebuild_pending():
+    sources = _pending_sources()
+    if not sources:
+        return
+    _scheduled.sources = []
+    _rebuild_scheduled(sources)
+
+
+def schedule_rebuild(word_ids):
+    """Пересобрать документы после коммита; word_ids - id или queryset values_list
+
+    Queryset вычисляется после коммита, поэтому видит итоговое состояние связей.
+    Все вызовы в одной транзакции пересобирают документы одним rebuild()."""
+    if not transaction.get_connection().in_atomic_block:
+        _rebuild_scheduled([word_ids])
+        return
+    _pending_sources().append(word_ids)
+    # Обработчик добавляется на каждый вызов: откат точки сохранения убирает
+    # добавленные в ней. Первый выполненный пересобирает все слова, остальные
+    # ничего не делают. Слова из откаченной транзакции пересоберутся со
+    # следующим коммитом - лишняя, но безвредная работа
+    transaction.on_commit(_rebuild_pending)
+
+
+def get_document(slug, staff=False):
+    """Данные документа по slug с учётом видимости слова; None, если слова нет
+
+    Документ, которого ещё нет или который устарел по версии, собирается сразу."""
+    from .models import Word, WordDocument
+
+    documents = WordDocument.objects.filter(slug=slug, is_deleted=False)
+    if not staff:
+        documents = documents.filter(status='approved')
+    data = documents.values_list('data', flat=True).first()
+    if data is not None and data.get('version') == DOCUMENT_VERSION:
+        return data
+
+    words = Word.objects.filter(slug=slug, is_deleted=False)
+    if not staff:
+        words = words.filter(status='approved')
+    word_id = words.values_list('pk', flat=True).first()
+    if word_id is None:
+        return None
+    rebuild([word_id])
+    return documents.values_list('data', flat=True).first()
@@ -87,37 +87,29 @@ class WordForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         # Показываем только видимые теги
         if 'tags' in self.fields:
-            self.fields['tags'].queryset = Tag.objects.filter(display_mode='visible')
+            self.fields['tags'].queryset = Tag.objects.cached().filter(display_mode='visible')
     
-    def clean_word(self):
-        """Валидация уникальности слова в рамках языка"""
-        word = self.cleaned_data.get('word')
-        language = self.cleaned_data.get('language')
+    def clean(self):
+        """Дополнительная валидация формы"""
+        cleaned_data = super().clean()
+        word = cleaned_data.get('word')
+        meaning = cleaned_data.get('meaning')
+        language = cleaned_data.get('language')
         
+        # Уникальность слова в рамках языка: язык очищается после слова,
+        # поэтому проверка здесь, а не в clean_word
         if word and language:
-            # Проверка на дубликаты с учетом новых методов модели
-            existing = Word.objects.published().filter(
-                word__iexact=word, 
-                language=language
-            )
+            existing = Word.objects.by_headword(word, language)
             
             # Исключаем текущий объект при редактировании
             if self.instance and self.instance.pk:
                 existing = existing.exclude(pk=self.instance.pk)
             
             if existing.exists():
-                raise forms.ValidationError(
+                self.add_error('word', forms.ValidationError(
                     f'Слово "{word}" уже существует на языке {language.name}. '
                     f'Попробуйте использовать другую формулировку.'
-                )
-        
-        return word
-    
-    def clean(self):
-        """Дополнительная валидация формы"""
-        cleaned_data = super().clean()
-        word = cleaned_data.get('word')
-        meaning = cleaned_data.get('meaning')
+                ))
         
         # Проверяем что есть основные поля
         if word and meaning and len(meaning.strip()) < 10:
@@ -0,0 +1,225 @@
+"""Нечёткий поиск похожих слов: BK-дерево заголовков по расстоянию Левенштейна
+
+Для каждого языка в памяти процесса строится BK-дерево по headword_key
+неудалённых слов. Индекс строится при первом обращении и дальше обновляется
+по одной записи: изменения в своём процессе приходят через сигналы, изменения
+других воркеров подтягиваются по updated_at не чаще REFRESH_INTERVAL секунд.
+"""
+import threading
+import time
+
+from django.utils import timezone
+
+from .normalization import fold_headword
+
+# Как часто проверять изменения, сделанные другими процессами
+REFRESH_INTERVAL = 30.0
+
+
+def levenshtein(a, b, limit=None):
+    """Расстояние Левенштейна; при превышении limit возвращает limit + 1"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def default_max_distance(key):
+    """Допустимое число опечаток зависит от длины слова"""
+    return 1 if len(key) <= 4 else 2 if len(key) <= 8 else 3
+
+
+class BKTree:
+    """BK-дерево ключей; узел - [ключ, {расстояние: дочерний узел}]
+
+    Узлы не удаляются: у ключа без слов просто нет записей в индексе."""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, key):
+        if self.root is None:
+            self.root = [key, {}]
+            return
+        node = self.root
+        while True:
+            distance = levenshtein(key, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [key, {}]
+                return
+            node = child
+
+    def search(self, key, max_distance):
+        """Пары (расстояние, ключ) не дальше max_distance"""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_key, children = stack.pop()
+            distance = levenshtein(key, node_key)
+            if distance <= max_distance:
+                found.append((distance, node_key))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+
+class FuzzyIndex:
+    """Индекс похожих слов одного языка"""
+
+    def __init__(self, language_code):
+        self.language_code = language_code
+        self._lock = threading.RLock()
+        self._tree = BKTree()
+        self._entries = {}  # ключ -> {id: (слово, slug)}
+        self._keys = {}     # id -> ключ
+        self._synced_at = None
+        self._checked_at = 0.0
+
+    def _load(self, rows):
+        for word_id, key, word, slug, is_deleted in rows:
+            self._put(word_id, key or fold_headword(word, self.language_code), word, slug, is_deleted)
+
+    def _put(self, word_id, key, word, slug, is_deleted):
+        self._discard(word_id)
+        if is_deleted or not key:
+            return
+        if key not in self._entries:
+            self._entries[key] = {}
+            self._tree.add(key)
+        self._entries[key][word_id] = (word, slug)
+        self._keys[word_id] = key
+
+    def _discard(self, word_id):
+        key = self._keys.pop(word_id, None)
+        if key is not None:
+            self._entries[key].pop(word_id, None)
+
+    def _rows(self):
+        from .models import Word
+        return Word.objects.filter(language__code=self.language_code)
+
+    def rebuild(self):
+        """Полностью перестраивает индекс по базе"""
+        with self._lock:
+            started = timezone.now()
+            self._tree = BKTree()
+            self._entries = {}
+            self._keys = {}
+            self._load(self._rows().filter(is_deleted=False).values_list(
+                'id', 'headword_key', 'word', 'slug', 'is_deleted'
+            ).iterator())
+            self._synced_at = started
+            self._checked_at = time.monotonic()
+
+    def refresh(self):
+        """Подтягивает изменения других процессов по updated_at
+
+        Удалённые из базы слова не видны по updated_at, поэтому при
+        расхождении числа слов индекс перестраивается целиком."""
+        with self._lock:
+            if self._synced_at is None:
+                self.rebuild()
+                return
+            if time.monotonic() - self._checked_at < REFRESH_INTERVAL:
+                return
+            started = timezone.now()
+            rows = self._rows()
+            self._load(rows.filter(updated_at__gte=self._synced_at).values_list(
+                'id', 'headword_key', 'word', 'slug', 'is_deleted'
+            ))
+            self._synced_at = started
+            self._checked_at = time.monotonic()
+            if rows.filter(is_deleted=False).count() != len(self._keys):
+                self.rebuild()
+
+    def update_word(self, word):
+        """Обновляет запись слова после сохранения в этом процессе"""
+        with self._lock:
+            if self._synced_at is None:
+                return
+            self._put(word.pk, word.headword_key, word.word, word.slug, word.is_deleted)
+
+    def discard_word(self, word_id):
+        with self._lock:
+            self._discard(word_id)
+
+    def similar(self, text, limit=5, max_distance=None, exclude_exact=True):
+        """Ближайшие слова: список (расстояние, id, слово, slug)"""
+        key = fold_headword(text, self.language_code)
+        if not key:
+            return []
+        if max_distance is None:
+            max_distance = default_max_distance(key)
+        self.refresh()
+        with self._lock:
+            matches = []
+            for distance, found_key in self._tree.search(key, max_distance):
+                if exclude_exact and distance == 0:
+                    continue
+                for word_id, (word, slug) in self._entries.get(found_key, {}).items():
+                    matches.append((distance, found_key, word_id, word, slug))
+        matches.sort()
+        return [
+            (distance, word_id, word, slug)
+            for distance, found_key, word_id, word, slug in matches[:limit]
+        ]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(language_code):
+    index = _indexes.get(language_code)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(language_code, FuzzyIndex(language_code))
+    return index
+
+
+def similar_words(language_code, texts, limit=5, max_distance=None, exclude_exact=True):
+    """Похожие слова для пачки текстов одним обращением к индексу
+
+    Возвращает словарь текст -> список словарей {id, word, slug, distance}."""
+    index = get_index(language_code)
+    return {
+        text: [
+            {'id': word_id, 'word': word, 'slug': slug, 'distance': distance}
+            for distance, word_id, word, slug in index.similar(
+                text, limit=limit, max_distance=max_distance, exclude_exact=exclude_exact
+            )
+        ]
+        for text in texts
+    }
+
+
+def word_saved(word, language_code, old_language_code=None):
+    """Синхронизирует индексы после сохранения слова в этом процессе"""
+    if old_language_code and old_language_code != language_code and old_language_code in _indexes:
+        _indexes[old_language_code].discard_word(word.pk)
+    if language_code in _indexes:
+        _indexes[language_code].update_word(word)
+
+
+def word_deleted(word_id, language_code):
+    if language_code in _indexes:
+        _indexes[language_code].discard_word(word_id)
@@ -0,0 +1,129 @@
+"""Каталог строк интерфейса, скомпилированный из InterfaceTranslation
+
+Строки редактируются в БД (interface_translations_edit, админка), но во время
+запросов из БД не читаются: шаг публикации (publish) собирает их в каталоги
+по языкам (InterfaceCatalog) с хэшем содержимого и увеличивает версию каталога
+в общем кэше Django. Процессы держат каталоги в памяти, сверяют версию не чаще
+CHECK_INTERVAL секунд и перечитывают каталоги только при её изменении.
+
+Для браузера каталог языка отдаётся как JS по адресу с хэшем содержимого,
+поэтому его можно кэшировать без срока.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'dictionary:interface-catalog-version'
+
+# Как часто сверять версию каталога с общим кэшем
+CHECK_INTERVAL = 5.0
+
+DEFAULT_LANGUAGE = 'ru'
+
+
+def content_hash(strings):
+    payload = json.dumps(strings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def compile_catalogs():
+    """Строки интерфейса из БД по языкам: {код языка: {ключ: значение}}"""
+    from .models import InterfaceTranslation, Language
+
+    catalogs = {code: {} for code in Language.objects.values_list('code', flat=True)}
+    for code, key, value in InterfaceTranslation.objects.values_list('language__code', 'key', 'value'):
+        catalogs[code][key] = value
+    return catalogs
+
+
+def publish():
+    """Компилирует и публикует каталоги; возвращает {код языка: хэш}"""
+    from .models import InterfaceCatalog
+
+    catalogs = compile_catalogs()
+    versions = {code: content_hash(strings) for code, strings in catalogs.items()}
+    with transaction.atomic():
+        InterfaceCatalog.objects.exclude(language_code__in=list(catalogs)).delete()
+        for code, strings in catalogs.items():
+            InterfaceCatalog.objects.update_or_create(
+                language_code=code,
+                defaults={'version': versions[code], 'strings': strings},
+            )
+        transaction.on_commit(lambda: _bump_version(content_hash(versions)))
+    return versions
+
+
+def _bump_version(version):
+    cache.set(VERSION_KEY, version, None)
+    catalogs.invalidate()
+
+
+class Catalogs:
+    """Опубликованные каталоги в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._strings = None
+        self._versions = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.loads = 0
+
+    def _load(self):
+        from .models import InterfaceCatalog
+
+        strings, versions = {}, {}
+        for code, version, catalog in InterfaceCatalog.objects.values_list('language_code', 'version', 'strings'):
+            strings[code] = catalog
+            versions[code] = version
+        self.loads += 1
+        return strings, versions
+
+    def _current(self):
+        if self._strings is not None and time.monotonic() - self._checked_at < CHECK_INTERVAL:
+            return self._strings
+        with self._lock:
+            version = cache.get(VERSION_KEY)
+            if self._strings is None or version != self._version:
+                self._strings, self._versions = self._load()
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._strings
+
+    def invalidate(self):
+        with self._lock:
+            self._strings = None
+
+    def strings(self, language_code):
+        """Каталог языка: {ключ: значение}"""
+        return self._current().get(language_code, {})
+
+    def version(self, language_code):
+        """Хэш опубликованного каталога языка ('' - каталог не опубликован)"""
+        self._current()
+        return self._versions.get(language_code, '')
+
+    def get(self, key, language_code, default=None):
+        """Строка по ключу; без перевода - строка языка по умолчанию, затем default или ключ"""
+        strings = self._current()
+        value = strings.get(language_code, {}).get(key)
+        if not value:
+            value = strings.get(DEFAULT_LANGUAGE, {}).get(key)
+        return value or (default if default is not None else key)
+
+    def render_js(self, language_code):
+        """JS-каталог языка: window.INTERFACE_STRINGS"""
+        payload = json.dumps(self.strings(language_code), sort_keys=True, ensure_ascii=False)
+        # Закрывающий тег не должен оборвать <script>, если каталог встроят в страницу
+        payload = payload.replace('</', '<\\/')
+        return f'window.INTERFACE_STRINGS = {payload};\n'
+
+    def stats(self):
+        return {'version': self._version, 'loads': self.loads, 'languages': sorted(self._versions)}
+
+
+catalogs = Catalogs()
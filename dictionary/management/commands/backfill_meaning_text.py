@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from dictionary.models import Word
+from dictionary.normalization import html_to_text, make_excerpt
+
+
+class Command(BaseCommand):
+    help = 'Заполняет текстовую копию значения слов и выдержку для списков (meaning_text, excerpt) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество слов в одной транзакции',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать текст для всех слов, а не только для незаполненных',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        words = Word.objects.order_by('pk')
+        if not options['all']:
+            words = words.filter(Q(meaning_text='') | Q(excerpt='')).exclude(meaning='')
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(words.filter(pk__gt=last_pk).only('pk', 'meaning', 'meaning_text', 'excerpt')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = []
+            for word in batch:
+                text = html_to_text(word.meaning)
+                excerpt = make_excerpt(text)
+                if (text, excerpt) != (word.meaning_text, word.excerpt):
+                    word.meaning_text = text
+                    word.excerpt = excerpt
+                    changed.append(word)
+            with transaction.atomic():
+                Word.objects.bulk_update(changed, ['meaning_text', 'excerpt'])
+            updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f'Обновлено слов: {updated}'))
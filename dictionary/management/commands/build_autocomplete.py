@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from dictionary.autocomplete import build_lexicon, language_codes, lexicon_dir
+
+
+class Command(BaseCommand):
+    help = 'Собирает словари автодополнения (memory-mapped файлы по языкам)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language',
+            action='append',
+            dest='languages',
+            help='Код языка (можно указать несколько раз). По умолчанию - все языки из LANGUAGES',
+        )
+
+    def handle(self, *args, **options):
+        codes = options['languages'] or language_codes()
+        self.stdout.write(f'Каталог словарей: {lexicon_dir()}')
+
+        for code in codes:
+            started = time.monotonic()
+            count = build_lexicon(code)
+            elapsed = (time.monotonic() - started) * 1000
+            self.stdout.write(
+                self.style.SUCCESS(f'{code}: {count} слов ({elapsed:.0f} мс)')
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from dictionary.documents import rebuild
+from dictionary.models import Word, WordDocument
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает документы страниц слов (WordDocument) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Количество слов в одной пачке',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Собрать только отсутствующие документы',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        words = Word.objects.order_by('pk')
+        if options['missing']:
+            words = words.exclude(pk__in=WordDocument.objects.values('word_id'))
+
+        built = 0
+        last_pk = 0
+        while True:
+            batch = list(words.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1]
+            built += rebuild(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Собрано документов: {built}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from dictionary.interface_catalog import publish
+
+
+class Command(BaseCommand):
+    help = 'Компилирует строки интерфейса (InterfaceTranslation) в опубликованные каталоги по языкам'
+
+    def handle(self, *args, **options):
+        versions = publish()
+        for code, version in sorted(versions.items()):
+            self.stdout.write(f'{code}: {version}')
+        self.stdout.write(self.style.SUCCESS(f'Опубликовано каталогов: {len(versions)}'))
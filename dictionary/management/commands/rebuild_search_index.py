@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from dictionary.search import ensure_index, fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс слов (FTS5)'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(
+                self.style.WARNING('Полнотекстовый индекс поддерживается только для SQLite')
+            )
+            return
+
+        if ensure_index():
+            self.stdout.write('Схема индекса и триггеры восстановлены')
+        indexed = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Индекс перестроен: {indexed} слов')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from dictionary.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики словаря (DictionaryStat) и поля переводов слов (Word.approved_translations, Word.translation_languages) с БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя',
+        )
+
+    def handle(self, *args, **options):
+        fixed_words, changes = reconcile(dry_run=options['dry_run'])
+        for key, (old, new) in sorted(changes.items()):
+            self.stdout.write(f'{key}: {old} -> {new}')
+        verb = 'Найдено' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} полей переводов слов: {fixed_words}, счётчиков словаря: {len(changes)}'
+        ))
@@ -0,0 +1,36 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dictionary.search_log import rollup_day
+
+
+class Command(BaseCommand):
+    help = 'Сводит историю поиска в дневные счётчики по языкам (запускать периодически, например из cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Сколько последних дней пересчитать, включая сегодняшний (по умолчанию 2)',
+        )
+        parser.add_argument(
+            '--date',
+            help='Пересчитать только указанный день (ГГГГ-ММ-ДД)',
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                days = [datetime.date.fromisoformat(options['date'])]
+            except ValueError:
+                raise CommandError('Дата должна быть в формате ГГГГ-ММ-ДД')
+        else:
+            today = timezone.localdate()
+            days = [today - datetime.timedelta(days=offset) for offset in range(max(options['days'], 1))]
+
+        for day in sorted(days):
+            count = rollup_day(day)
+            self.stdout.write(f'{day}: {count} запросов')
+        self.stdout.write(self.style.SUCCESS('Сводка поиска обновлена'))
@@ -0,0 +1,82 @@
+"""Микрокэш nginx для анонимных страниц и его обновление после изменения слов
+
+Ответы views.home и views.word_detail анонимным пользователям nginx хранит
+MICRO_CACHE_SECONDS секунд (X-Accel-Expires, см. nginx.conf), браузеру
+отдаётся «public, max-age=0»: он переспрашивает страницу с ETag.
+Ответы вошедшим пользователям и ответы с непоказанными сообщениями -
+«private, no-cache», nginx их не хранит.
+
+После коммита изменения слова страницы слова и главной запрашиваются заново
+через внутренний сервер nginx (CACHE_PURGE_URL), который всегда идёт в Django
+и перезаписывает запись кэша (proxy_cache_bypass): в nginx без модуля
+ngx_cache_purge это замена удаления записи. Остальные варианты главной
+(фильтры, страницы выдачи) устаревают не дольше срока микрокэша. Поиск (?q=)
+nginx не кэширует: каждый запрос должен попасть в историю поиска.
+"""
+import logging
+import threading
+import urllib.request
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+
+from .conditional import _has_pending_messages
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MICRO_CACHE_SECONDS = 10
+REFRESH_TIMEOUT = 5
+
+
+def _micro_cache_seconds():
+    return getattr(settings, 'MICRO_CACHE_SECONDS', DEFAULT_MICRO_CACHE_SECONDS)
+
+
+def role_cache_control(view):
+    """Cache-Control по роли зрителя: анонимные ответы - в общий микрокэш nginx"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        # Проверяется до рендеринга: страница выводит сообщения и помечает их показанными
+        shared = not request.user.is_authenticated and not _has_pending_messages(request)
+        response = view(request, *args, **kwargs)
+        seconds = _micro_cache_seconds()
+        if shared and seconds and response.status_code in (200, 304):
+            patch_cache_control(response, public=True, max_age=0)
+            response['X-Accel-Expires'] = str(seconds)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+            response['X-Accel-Expires'] = '0'
+        return response
+    return wrapper
+
+
+# Обновление записей микрокэша
+
+def home_paths(*language_codes):
+    """Варианты главной без поиска: общий и по языкам"""
+    return {'/'} | {f'/?lang={code}' for code in language_codes if code}
+
+
+def _refresh(paths):
+    base = settings.CACHE_PURGE_URL.rstrip('/')
+    for path in sorted(paths):
+        request = urllib.request.Request(base + path, headers={'User-Agent': 'dictionary-microcache'})
+        try:
+            with urllib.request.urlopen(request, timeout=REFRESH_TIMEOUT) as response:
+                response.read()
+        except OSError as error:
+            # 404 удалённого или снятого с публикации слова тоже обновляет запись
+            if getattr(error, 'code', None) != 404:
+                logger.warning('Не удалось обновить микрокэш %s: %s', path, error)
+
+
+def refresh(paths):
+    """Запрашивает страницы заново через nginx в фоновом потоке после коммита"""
+    paths = set(paths)
+    if not paths or not getattr(settings, 'CACHE_PURGE_URL', ''):
+        return
+    transaction.on_commit(lambda: threading.Thread(
+        target=_refresh, args=(paths,), name='microcache-refresh', daemon=True,
+    ).start())
@@ -0,0 +1,56 @@
+# Полнотекстовый индекс FTS5 для поиска по словам и значениям
+
+from django.db import migrations
+
+
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS dictionary_word_fts USING fts5(
+        word, meaning, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS dictionary_word_fts_ai AFTER INSERT ON dictionary_word BEGIN
+        INSERT INTO dictionary_word_fts(rowid, word, meaning) VALUES (new.id, new.word, new.meaning);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS dictionary_word_fts_ad AFTER DELETE ON dictionary_word BEGIN
+        DELETE FROM dictionary_word_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS dictionary_word_fts_au AFTER UPDATE OF word, meaning ON dictionary_word BEGIN
+        DELETE FROM dictionary_word_fts WHERE rowid = old.id;
+        INSERT INTO dictionary_word_fts(rowid, word, meaning) VALUES (new.id, new.word, new.meaning);
+    END""",
+    """INSERT INTO dictionary_word_fts(rowid, word, meaning)
+        SELECT id, word, meaning FROM dictionary_word""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS dictionary_word_fts_au',
+    'DROP TRIGGER IF EXISTS dictionary_word_fts_ad',
+    'DROP TRIGGER IF EXISTS dictionary_word_fts_ai',
+    'DROP TABLE IF EXISTS dictionary_word_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    """Создаём индекс и триггеры синхронизации (только для SQLite)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    """Удаляем индекс и триггеры"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0007_tag_display_mode'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
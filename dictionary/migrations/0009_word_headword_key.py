@@ -0,0 +1,76 @@
+# Generated by Django 4.0.8 on 2026-10-17 04:02
+
+import logging
+import unicodedata
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+HEADWORD_KEY_LENGTH = 100
+
+# Правила нормализации на момент миграции (копия dictionary.normalization:
+# миграция не должна меняться вместе с кодом приложения)
+DOTTED_I_LANGUAGES = ('tr', 'kk')
+
+PROTECTED_LETTERS = {
+    'ru': set('й'),
+    'kk': set('й'),
+    'tr': set('çşğöü'),
+}
+
+
+def fold_headword(text, language_code=None):
+    """Ключ заголовка слова: без регистра, лишней диакритики и лишних пробелов"""
+    text = unicodedata.normalize('NFKC', text or '')
+    if language_code in DOTTED_I_LANGUAGES:
+        text = text.replace('I', 'ı').replace('İ', 'i')
+    text = unicodedata.normalize('NFC', text.casefold())
+
+    protected = PROTECTED_LETTERS.get(language_code, ())
+    folded = []
+    for char in text:
+        if char in protected:
+            folded.append(char)
+            continue
+        folded.extend(
+            part for part in unicodedata.normalize('NFD', char)
+            if unicodedata.category(part) != 'Mn'
+        )
+    return ' '.join(''.join(folded).split())
+
+
+def populate_headword_keys(apps, schema_editor):
+    """Заполняем нормализованные заголовки для существующих слов"""
+    Word = apps.get_model('dictionary', 'Word')
+
+    seen = set()
+    for word in Word.objects.select_related('language').order_by('created_at', 'id'):
+        key = fold_headword(word.word, word.language.code)[:HEADWORD_KEY_LENGTH]
+        if (word.language_id, key) in seen:
+            # Дубликат с точностью до регистра - оставляем для ручного слияния
+            logger.warning('Дубликат заголовка: "%s" (%s, id=%s)', word.word, word.language.code, word.id)
+            suffix = f'#{word.id}'
+            key = key[:HEADWORD_KEY_LENGTH - len(suffix)] + suffix
+        seen.add((word.language_id, key))
+        Word.objects.filter(pk=word.pk).update(headword_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0008_word_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='headword_key',
+            field=models.CharField(default='', editable=False, help_text='Нормализованный заголовок: без регистра и диакритики', max_length=100),
+        ),
+        migrations.RunPython(populate_headword_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='word',
+            constraint=models.UniqueConstraint(fields=('language', 'headword_key'), name='unique_word_headword_key'),
+        ),
+    ]
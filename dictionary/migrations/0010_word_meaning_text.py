@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+from dictionary.normalization import html_to_text
+
+
+def populate_meaning_text(apps, schema_editor):
+    """Заполняем текст значений существующих слов"""
+    Word = apps.get_model('dictionary', 'Word')
+    
+    for word in Word.objects.only('id', 'meaning').iterator():
+        Word.objects.filter(pk=word.pk).update(meaning_text=html_to_text(word.meaning))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0009_word_headword_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='meaning_text',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Текст значения без HTML-разметки (для поиска)'),
+        ),
+        migrations.RunPython(populate_meaning_text, migrations.RunPython.noop),
+    ]
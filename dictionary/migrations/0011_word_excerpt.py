@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+from dictionary.normalization import make_excerpt
+
+
+def populate_excerpts(apps, schema_editor):
+    """Заполняем выдержки значений существующих слов"""
+    Word = apps.get_model('dictionary', 'Word')
+    
+    for word in Word.objects.only('id', 'meaning_text').iterator():
+        Word.objects.filter(pk=word.pk).update(excerpt=make_excerpt(word.meaning_text))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0010_word_meaning_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Начало значения для карточек в списках', max_length=255),
+        ),
+        migrations.RunPython(populate_excerpts, migrations.RunPython.noop),
+    ]
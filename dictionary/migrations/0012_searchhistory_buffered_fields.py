@@ -0,0 +1,40 @@
+# Generated by Django 4.0.8 on 2026-10-17 07:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0011_word_excerpt'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='searchhistory',
+            options={'ordering': ['-searched_at'], 'verbose_name': 'Поисковый запрос', 'verbose_name_plural': 'История поиска'},
+        ),
+        migrations.AddField(
+            model_name='searchhistory',
+            name='language',
+            field=models.CharField(blank=True, default='', help_text='Код языка фильтра (пусто - все языки)', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='searchhistory',
+            name='results_count',
+            field=models.PositiveIntegerField(blank=True, help_text='Количество найденных слов (с ограничением подсчёта)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='searchhistory',
+            name='searched_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='searchhistory',
+            name='user',
+            field=models.ForeignKey(blank=True, help_text='Пусто для анонимных посетителей', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_history', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
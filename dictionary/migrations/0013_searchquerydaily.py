@@ -0,0 +1,42 @@
+# Generated by Django 4.0.8 on 2026-10-17 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0012_searchhistory_buffered_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQueryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('language', models.CharField(blank=True, default='', help_text='Код языка фильтра (пусто - все языки)', max_length=10)),
+                ('query', models.CharField(help_text='Запрос без учёта регистра и лишних пробелов', max_length=100)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_result_searches', models.PositiveIntegerField(default=0, help_text='Сколько раз запрос ничего не нашёл')),
+                ('is_miss', models.BooleanField(default=False, help_text='За день запрос ни разу ничего не нашёл')),
+            ],
+            options={
+                'verbose_name': 'Сводка поиска за день',
+                'verbose_name_plural': 'Сводки поиска по дням',
+                'ordering': ['-day', '-searches'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchquerydaily',
+            index=models.Index(fields=['day', '-searches'], name='search_daily_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchquerydaily',
+            index=models.Index(fields=['day', 'is_miss', '-searches'], name='search_daily_miss_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchquerydaily',
+            constraint=models.UniqueConstraint(fields=('day', 'language', 'query'), name='unique_search_query_daily'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 08:14
+
+from django.db import migrations, models
+
+from dictionary.morphology import stem_text
+
+
+def populate_stem_keys(apps, schema_editor):
+    """Заполняем основы заголовков для существующих слов"""
+    Word = apps.get_model('dictionary', 'Word')
+    
+    for word in Word.objects.select_related('language').only('id', 'word', 'language__code').iterator():
+        Word.objects.filter(pk=word.pk).update(stem_key=stem_text(word.word, word.language.code)[:100])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0013_searchquerydaily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='stem_key',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Основа заголовка без словоизменительных окончаний (для поиска форм слова)', max_length=100),
+        ),
+        migrations.RunPython(populate_stem_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.8 on 2026-10-17 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0014_word_stem_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='translation',
+            index=models.Index(fields=['from_word', 'status', 'to_word'], name='translation_from_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translation',
+            index=models.Index(fields=['to_word', 'status', 'from_word'], name='translation_to_status_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 08:52
+
+from django.db import migrations, models
+
+from dictionary.normalization import transliteration_key
+
+
+def populate_translit_keys(apps, schema_editor):
+    """Заполняем ключи транслитерации для существующих слов"""
+    Word = apps.get_model('dictionary', 'Word')
+    
+    for word in Word.objects.select_related('language').only('id', 'word', 'language__code').iterator():
+        Word.objects.filter(pk=word.pk).update(translit_key=transliteration_key(word.word, word.language.code)[:200])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0015_translation_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='translit_key',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Заголовок в латинице без диакритики (поиск в любой письменности)', max_length=200),
+        ),
+        migrations.RunPython(populate_translit_keys, migrations.RunPython.noop),
+    ]
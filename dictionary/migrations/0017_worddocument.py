@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 09:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0016_word_translit_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordDocument',
+            fields=[
+                ('slug', models.SlugField(max_length=150, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'На проверке'), ('approved', 'Опубликовано'), ('rejected', 'Отклонено')], max_length=10)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('data', models.JSONField(help_text='Слово, переводы, примеры и теги с названиями на всех языках')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('word', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='document', to='dictionary.word')),
+            ],
+            options={
+                'verbose_name': 'Документ страницы слова',
+                'verbose_name_plural': 'Документы страниц слов',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.0.8 on 2026-10-17 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0017_worddocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterfaceCatalog',
+            fields=[
+                ('language_code', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('version', models.CharField(help_text='Хэш содержимого каталога', max_length=40)),
+                ('strings', models.JSONField(default=dict, help_text='Ключ -> строка интерфейса')),
+                ('published_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Каталог строк интерфейса',
+                'verbose_name_plural': 'Каталоги строк интерфейса',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.0.8 on 2026-10-17 10:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_approved_translations(apps, schema_editor):
+    """Заполняем число одобренных переводов существующих слов"""
+    Word = apps.get_model('dictionary', 'Word')
+    Translation = apps.get_model('dictionary', 'Translation')
+    
+    approved = Translation.objects.filter(from_word=OuterRef('pk'), status='approved').order_by().values(
+        'from_word'
+    ).annotate(count=Count('id')).values('count')
+    Word.objects.update(approved_translations=Coalesce(Subquery(approved), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0018_interfacecatalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DictionaryStat',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Счётчик словаря',
+                'verbose_name_plural': 'Счётчики словаря',
+            },
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='approved_translations',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Число одобренных переводов (ведут сигналы переводов)'),
+        ),
+        migrations.RunPython(populate_approved_translations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.8 on 2026-10-17 10:32
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from dictionary.stats import language_set
+
+
+def populate_translation_languages(apps, schema_editor):
+    """Заполняем языки одобренных переводов существующих слов"""
+    Word = apps.get_model('dictionary', 'Word')
+    Translation = apps.get_model('dictionary', 'Translation')
+    
+    codes = defaultdict(set)
+    for word_id, code in Translation.objects.filter(status='approved').values_list('from_word_id', 'to_word__language__code'):
+        codes[word_id].add(code)
+    for word_id, word_codes in codes.items():
+        Word.objects.filter(pk=word_id).update(translation_languages=language_set(word_codes))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0019_dictionarystat_word_approved_translations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='translation_languages',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Коды языков одобренных переводов: ",en,kk," (ведут сигналы переводов)', max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['is_deleted', 'approved_translations'], name='word_translated_idx'),
+        ),
+        migrations.RunPython(populate_translation_languages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 11:05
+
+from django.db import migrations
+
+from dictionary.normalization import fold_headword
+
+
+def refold_kazakh_headword_keys(apps, schema_editor):
+    """Пересчитываем заголовки казахских слов: буквы латиницы с диакритикой больше не сводятся"""
+    Word = apps.get_model('dictionary', 'Word')
+    
+    for word_id, word, key in Word.objects.filter(language__code='kk').values_list('id', 'word', 'headword_key'):
+        if '#' in key:
+            # Дубликат, оставленный для ручного слияния
+            continue
+        folded = fold_headword(word, 'kk')
+        if folded != key:
+            Word.objects.filter(pk=word_id).update(headword_key=folded)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0020_word_translation_languages'),
+    ]
+
+    operations = [
+        migrations.RunPython(refold_kazakh_headword_keys, migrations.RunPython.noop),
+    ]
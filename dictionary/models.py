@@ -1,10 +1,17 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.utils import translation
+from django.utils import timezone, translation
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 
+from .morphology import stem_text
+from .normalization import fold_headword, html_to_text, make_excerpt, transliteration_key
+from .query_cache import CachedQuerySet
+from .registry import registry
+from . import stats
+
 
 class TimestampedModel(models.Model):
     """Абстрактная модель с временными метками"""
@@ -37,19 +44,24 @@ class Language(models.Model):
     code = models.CharField(max_length=10, unique=True)  # 'ru', 'kk', 'en', 'tr'
     name = models.CharField(max_length=50)  # 'Русский', 'Қазақша', 'English', 'Türkçe'
     
+    objects = CachedQuerySet.as_manager()
+    
     @property
     def word_count(self):
-        """Количество слов на этом языке"""
-        return self.word_set.filter(is_deleted=False, status='approved').count()
+        """Количество опубликованных слов на этом языке (счётчик stats)
+
+        Для списка языков счётчики загружаются одним запросом: stats.load_word_counts."""
+        loaded = self.__dict__.get('_word_count')
+        return stats.value(stats.language_key(self.pk)) if loaded is None else loaded
     
     def get_translation_progress(self):
         """Процент переведенных категорий и тегов на этот язык"""
-        from django.db.models import Count
-        total_categories = Category.objects.count()
-        total_tags = Tag.objects.count()
+        snapshot = registry.snapshot()
+        total_categories = len(snapshot.categories)
+        total_tags = len(snapshot.tags)
         
-        translated_categories = self.categorytranslation_set.count()
-        translated_tags = self.tagtranslation_set.count()
+        translated_categories = sum(1 for _, code in snapshot.category_names if code == self.code)
+        translated_tags = sum(1 for _, code in snapshot.tag_names if code == self.code)
         
         total_items = total_categories + total_tags
         translated_items = translated_categories + translated_tags
@@ -80,20 +92,20 @@ class CustomUser(AbstractUser):
 class Category(SluggedModel, TimestampedModel):
     code = models.CharField(max_length=50, unique=True)  # например, 'animals', 'food'
     
+    objects = CachedQuerySet.as_manager()
+    
     def get_slug_source(self):
         return self.code
     
     def get_name(self, language_code='ru'):
-        """Получить название на определенном языке"""
-        try:
-            return self.translations.get(language__code=language_code).name
-        except CategoryTranslation.DoesNotExist:
-            return self.code
+        """Получить название на определенном языке (из справочника процесса)"""
+        return registry.category_name(self, language_code)
     
     @property
     def word_count(self):
-        """Количество слов в этой категории"""
-        return self.words.filter(is_deleted=False, status='approved').count()
+        """Количество опубликованных слов в этой категории (счётчик stats)"""
+        loaded = self.__dict__.get('_word_count')
+        return stats.value(stats.category_key(self.pk)) if loaded is None else loaded
     
     def __str__(self):
         return self.code
@@ -125,20 +137,20 @@ class Tag(SluggedModel, TimestampedModel):
     code = models.CharField(max_length=30, unique=True)  # например, 'noun', 'verb'
     display_mode = models.CharField(max_length=10, choices=DISPLAY_CHOICES, default='visible', help_text='Режим отображения тега')
     
+    objects = CachedQuerySet.as_manager()
+    
     def get_slug_source(self):
         return self.code
     
     def get_name(self, language_code='ru'):
-        """Получить название на определенном языке"""
-        try:
-            return self.translations.get(language__code=language_code).name
-        except TagTranslation.DoesNotExist:
-            return self.code
+        """Получить название на определенном языке (из справочника процесса)"""
+        return registry.tag_name(self, language_code)
     
     @property
     def word_count(self):
-        """Количество слов с этим тегом"""
-        return self.words.filter(is_deleted=False, status='approved').count()
+        """Количество опубликованных слов с этим тегом (счётчик stats)"""
+        loaded = self.__dict__.get('_word_count')
+        return stats.value(stats.tag_key(self.pk)) if loaded is None else loaded
     
     def __str__(self):
         return self.code
@@ -161,7 +173,7 @@ class TagTranslation(models.Model):
         return f'{self.tag.code} [{self.language.code}]: {self.name[:20]}...'
 
 
-class WordQuerySet(models.QuerySet):
+class WordQuerySet(CachedQuerySet):
     """Кастомный QuerySet для модели Word"""
     
     def published(self):
@@ -176,23 +188,53 @@ class WordQuerySet(models.QuerySet):
         """Фильтр по уровню сложности"""
         return self.filter(difficulty=difficulty)
     
+    def by_headword(self, word, language):
+        """Поиск по нормализованному заголовку (без учёта регистра и диакритики)"""
+        return self.filter(language=language, headword_key=fold_headword(word, language.code))
+    
+    def by_lookup_key(self, word, language):
+        """Поиск заголовка в любой письменности и без диакритики; точное совпадение первым"""
+        key = fold_headword(word, language.code)
+        return self.filter(
+            models.Q(headword_key=key) | models.Q(translit_key=transliteration_key(word, language.code)),
+            language=language,
+        ).order_by(models.Case(
+            models.When(headword_key=key, then=models.Value(0)),
+            default=models.Value(1),
+        ), 'id')
+    
     def with_translations(self):
-        """Слова у которых есть переводы"""
-        return self.filter(from_translations__isnull=False).distinct()
+        """Слова, у которых есть одобренные переводы"""
+        return self.filter(approved_translations__gt=0)
     
     def without_translations(self):
-        """Слова без переводов"""
-        return self.filter(from_translations__isnull=True)
+        """Слова без одобренных переводов"""
+        return self.filter(approved_translations=0)
+    
+    def translated_to(self, language_code):
+        """Слова с одобренным переводом на язык"""
+        return self.filter(translation_languages__contains=f',{language_code},')
+    
+    def untranslated_to(self, language_code):
+        """Слова без одобренного перевода на язык"""
+        return self.exclude(translation_languages__contains=f',{language_code},')
     
     def by_category(self, category_code):
         """Фильтр по категории"""
         return self.filter(category__code=category_code)
     
+    def for_list(self):
+        """Только поля, которые выводятся в карточках и таблицах списков слов"""
+        return self.select_related('language', 'category').only(*Word.LIST_FIELDS)
+    
     def recent(self, days=30):
-        """Недавно добавленные слова"""
+        """Недавно добавленные слова
+
+        Порог округляется до минуты: запросы в течение минуты совпадают и
+        попадают в кэш запросов (cached())."""
         from django.utils import timezone
         from datetime import timedelta
-        date_threshold = timezone.now() - timedelta(days=days)
+        date_threshold = (timezone.now() - timedelta(days=days)).replace(second=0, microsecond=0)
         return self.filter(created_at__gte=date_threshold)
 
 
@@ -211,14 +253,46 @@ class WordManager(models.Manager):
     def by_difficulty(self, difficulty):
         return self.get_queryset().by_difficulty(difficulty)
     
+    def by_headword(self, word, language):
+        return self.get_queryset().by_headword(word, language)
+    
+    def by_lookup_key(self, word, language):
+        return self.get_queryset().by_lookup_key(word, language)
+    
+    def get_or_create_headword(self, word, language, defaults=None):
+        """get_or_create по нормализованному заголовку слова"""
+        existing = self.by_headword(word, language).first()
+        if existing:
+            return existing, False
+        try:
+            with transaction.atomic(using=self.db):
+                return self.create(word=word, language=language, **(defaults or {})), True
+        except IntegrityError:
+            existing = self.by_headword(word, language).first()
+            if existing:
+                return existing, False
+            raise
+    
     def with_translations(self):
         return self.get_queryset().with_translations()
     
     def without_translations(self):
         return self.get_queryset().without_translations()
     
+    def translated_to(self, language_code):
+        return self.get_queryset().translated_to(language_code)
+    
+    def untranslated_to(self, language_code):
+        return self.get_queryset().untranslated_to(language_code)
+    
+    def for_list(self):
+        return self.get_queryset().for_list()
+    
     def recent(self, days=30):
         return self.get_queryset().recent(days=days)
+    
+    def cached(self, timeout=None):
+        return self.get_queryset().cached(timeout)
 
 
 class Word(models.Model):
@@ -236,9 +310,14 @@ class Word(models.Model):
         ('hard', 'Сложно'),
     ]
     word = models.CharField(max_length=100)
+    headword_key = models.CharField(max_length=100, editable=False, default='', help_text='Нормализованный заголовок: без регистра и диакритики')
+    translit_key = models.CharField(max_length=200, editable=False, default='', db_index=True, help_text='Заголовок в латинице без диакритики (поиск в любой письменности)')
+    stem_key = models.CharField(max_length=100, editable=False, default='', db_index=True, help_text='Основа заголовка без словоизменительных окончаний (для поиска форм слова)')
     slug = models.SlugField(max_length=150, unique=True, blank=True, help_text='URL-friendly идентификатор')
     language = models.ForeignKey(Language, on_delete=models.CASCADE)
     meaning = models.TextField()
+    meaning_text = models.TextField(editable=False, blank=True, default='', help_text='Текст значения без HTML-разметки (для поиска)')
+    excerpt = models.CharField(max_length=255, editable=False, blank=True, default='', help_text='Начало значения для карточек в списках')
     # Если нужно поддерживать несколько категорий для одного слова, раскомментируйте:
     # categories = models.ManyToManyField(Category, blank=True, related_name='words')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='words')
@@ -251,6 +330,8 @@ class Word(models.Model):
     example_audio = models.FileField(upload_to='example_audio/', blank=True, null=True, help_text='Аудио примера')
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_LEVELS, default='none', blank=True, null=True)
     is_deleted = models.BooleanField(default=False, help_text='Soft-delete: не удалять из БД, а скрывать')
+    approved_translations = models.PositiveIntegerField(default=0, editable=False, help_text='Число одобренных переводов (ведут сигналы переводов)')
+    translation_languages = models.CharField(max_length=200, editable=False, blank=True, default='', help_text='Коды языков одобренных переводов: ",en,kk," (ведут сигналы переводов)')
     created_by = models.ForeignKey('CustomUser', on_delete=models.SET_NULL, null=True, blank=True, related_name='added_words')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -259,15 +340,51 @@ class Word(models.Model):
     # Кастомный менеджер
     objects = WordManager()
     
+    # Поля, которые ведут сигналы переводов: save() их не перезаписывает
+    COUNTER_FIELDS = ('approved_translations', 'translation_languages')
+    
+    # Поля карточек и строк в списках слов (см. WordQuerySet.for_list)
+    LIST_FIELDS = (
+        'id', 'word', 'slug', 'excerpt', 'status', 'difficulty', 'created_at',
+        'language__code', 'language__name', 'category__code', 'approved_translations',
+        'translation_languages', 'updated_at',
+    )
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные значения, чтобы сигналы видели, что изменилось
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def has_changed(self, *field_names):
+        """Изменилось ли хотя бы одно поле (по attname) с момента загрузки из БД"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(
+            name not in loaded or loaded[name] != getattr(self, name)
+            for name in field_names
+        )
+    
+    def loaded_value(self, field_name):
+        """Значение поля на момент загрузки из БД (None для новых объектов)"""
+        return getattr(self, '_loaded_values', {}).get(field_name)
+    
     @property
     def is_published(self):
         """Проверка что слово опубликовано"""
         return self.status == 'approved' and not self.is_deleted
     
+    @property
+    def translation_language_codes(self):
+        """Коды языков, на которые у слова есть одобренные переводы"""
+        return [code for code in self.translation_languages.split(',') if code]
+    
     @property 
     def translation_count(self):
-        """Количество переводов этого слова"""
-        return self.from_translations.filter(status='approved').count()
+        """Количество одобренных переводов этого слова"""
+        return self.approved_translations
     
     def get_translations_for_language(self, language_code):
         """Получить переводы на определенный язык"""
@@ -301,6 +418,11 @@ class Word(models.Model):
             models.Index(fields=['slug']),
             models.Index(fields=['created_at']),
             models.Index(fields=['difficulty']),
+            # Фильтры «с переводами» / «без переводов»
+            models.Index(fields=['is_deleted', 'approved_translations'], name='word_translated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['language', 'headword_key'], name='unique_word_headword_key'),
         ]
     
     def generate_unique_slug(self):
@@ -359,17 +481,13 @@ class Word(models.Model):
         if not self.meaning or not self.meaning.strip():
             raise ValidationError('Значение слова не может быть пустым')
         
-        # Проверяем уникальность слова на том же языке
+        # Проверяем уникальность слова на том же языке (по нормализованному заголовку)
+        if not self.language_id:
+            return
+        existing = Word.objects.by_headword(self.word, self.language)
         if self.pk:  # Для существующего слова
-            existing = Word.objects.filter(
-                word=self.word, 
-                language=self.language
-            ).exclude(pk=self.pk).first()
-        else:  # Для нового слова
-            existing = Word.objects.filter(
-                word=self.word, 
-                language=self.language
-            ).first()
+            existing = existing.exclude(pk=self.pk)
+        existing = existing.first()
         
         if existing:
             raise ValidationError(
@@ -377,6 +495,28 @@ class Word(models.Model):
             )
     
     def save(self, *args, **kwargs):
+        self.headword_key = fold_headword(self.word, self.language.code)
+        self.translit_key = transliteration_key(self.word, self.language.code)[:200]
+        self.stem_key = stem_text(self.word, self.language.code)[:100]
+        self.meaning_text = html_to_text(self.meaning)
+        self.excerpt = make_excerpt(self.meaning_text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Значение счётчика в объекте могло устареть - записываем все загруженные поля, кроме счётчиков
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+            kwargs['update_fields'] = update_fields
+        if update_fields is not None:
+            derived = {'word': ('headword_key', 'translit_key', 'stem_key'), 'meaning': ('meaning_text', 'excerpt')}
+            # updated_at - ключ кэша карточек слова: меняется при любом сохранении
+            kwargs['update_fields'] = set(update_fields).union(
+                {'updated_at'}, *(derived[name] for name in update_fields if name in derived)
+            )
+        
         if not self.slug:
             # Создаем slug из слова и языка
             base_slug = slugify(self.word)
@@ -422,9 +562,16 @@ class Word(models.Model):
                 self.slug = f"word-{self.pk or 'new'}{lang_suffix}"
         
         super().save(*args, **kwargs)
+        # Сигналы post_save уже отработали - сохранённое состояние становится исходным
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
     
     def __str__(self):
-        return f'{self.word} ({self.language.code})'
+        language = registry.language(self.language_id)
+        return f'{self.word} ({language.code if language else self.language_id})'
     
     def get_absolute_url(self):
         return f'/word/{self.slug}/'
@@ -458,9 +605,43 @@ class Translation(models.Model):
     class Meta:
         unique_together = ('from_word', 'to_word')
         ordering = ['from_word', 'order']
+        indexes = [
+            # Обратный поиск через переводы (search.translation_q) в обе стороны
+            models.Index(fields=['from_word', 'status', 'to_word'], name='translation_from_status_idx'),
+            models.Index(fields=['to_word', 'status', 'from_word'], name='translation_to_status_idx'),
+        ]
         verbose_name = 'Перевод'
         verbose_name_plural = 'Переводы'
 
+class DictionaryStat(models.Model):
+    """Счётчик словаря, который ведётся приращениями (см. stats.py)"""
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'{self.key} = {self.value}'
+    
+    class Meta:
+        verbose_name = 'Счётчик словаря'
+        verbose_name_plural = 'Счётчики словаря'
+
+class WordDocument(models.Model):
+    """Готовые данные страницы слова (см. documents.py): страница читает одну запись по slug"""
+    slug = models.SlugField(max_length=150, primary_key=True)
+    word = models.OneToOneField(Word, on_delete=models.CASCADE, related_name='document')
+    status = models.CharField(max_length=10, choices=Word.STATUS_CHOICES)
+    is_deleted = models.BooleanField(default=False)
+    data = models.JSONField(help_text='Слово, переводы, примеры и теги с названиями на всех языках')
+    built_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.slug
+    
+    class Meta:
+        verbose_name = 'Документ страницы слова'
+        verbose_name_plural = 'Документы страниц слов'
+
 class Example(TimestampedModel):
     word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='examples')
     text = models.TextField(help_text='Пример использования слова')
@@ -489,9 +670,45 @@ class Favourite(models.Model):
         verbose_name_plural = 'Избранное'
 
 class SearchHistory(models.Model):
-    user = models.ForeignKey('CustomUser', on_delete=models.CASCADE, related_name='search_history')
+    """Поисковый запрос; пишется пачками через dictionary.search_log"""
+    user = models.ForeignKey('CustomUser', on_delete=models.CASCADE, null=True, blank=True, related_name='search_history', help_text='Пусто для анонимных посетителей')
     word = models.CharField(max_length=100)
-    searched_at = models.DateTimeField(auto_now_add=True)
+    language = models.CharField(max_length=10, blank=True, default='', help_text='Код языка фильтра (пусто - все языки)')
+    results_count = models.PositiveIntegerField(null=True, blank=True, help_text='Количество найденных слов (с ограничением подсчёта)')
+    # Время самого запроса, а не записи пачки в БД
+    searched_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    def __str__(self):
+        return f'{self.word} ({self.searched_at:%d.%m.%Y %H:%M})'
+    
+    class Meta:
+        ordering = ['-searched_at']
+        verbose_name = 'Поисковый запрос'
+        verbose_name_plural = 'История поиска'
+
+class SearchQueryDaily(models.Model):
+    """Дневная сводка поисковых запросов по языку (см. команду rollup_search_history)"""
+    day = models.DateField()
+    language = models.CharField(max_length=10, blank=True, default='', help_text='Код языка фильтра (пусто - все языки)')
+    query = models.CharField(max_length=100, help_text='Запрос без учёта регистра и лишних пробелов')
+    searches = models.PositiveIntegerField(default=0)
+    zero_result_searches = models.PositiveIntegerField(default=0, help_text='Сколько раз запрос ничего не нашёл')
+    is_miss = models.BooleanField(default=False, help_text='За день запрос ни разу ничего не нашёл')
+    
+    def __str__(self):
+        return f'{self.day} {self.language or "*"} {self.query}: {self.searches}'
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'language', 'query'], name='unique_search_query_daily'),
+        ]
+        indexes = [
+            models.Index(fields=['day', '-searches'], name='search_daily_top_idx'),
+            models.Index(fields=['day', 'is_miss', '-searches'], name='search_daily_miss_idx'),
+        ]
+        ordering = ['-day', '-searches']
+        verbose_name = 'Сводка поиска за день'
+        verbose_name_plural = 'Сводки поиска по дням'
 
 class WordLike(models.Model):
     user = models.ForeignKey('CustomUser', on_delete=models.CASCADE, related_name='word_likes')
@@ -536,4 +753,18 @@ class InterfaceTranslation(models.Model):
         v = self.value if len(self.value) <= 20 else self.value[:17] + '...'
         return f'{self.language.code}: {self.key} = {v}'
 
+class InterfaceCatalog(models.Model):
+    """Опубликованный каталог строк интерфейса одного языка (см. interface_catalog.py)"""
+    language_code = models.CharField(max_length=10, primary_key=True)
+    version = models.CharField(max_length=40, help_text='Хэш содержимого каталога')
+    strings = models.JSONField(default=dict, help_text='Ключ -> строка интерфейса')
+    published_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'{self.language_code} ({self.version})'
+    
+    class Meta:
+        verbose_name = 'Каталог строк интерфейса'
+        verbose_name_plural = 'Каталоги строк интерфейса'
+
         
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Упрощённые стеммеры для языков словаря (ru, kk, tr, en)
+
+Стеммер отрезает словоизменительные окончания и суффиксы, чтобы разные формы
+одного слова давали одну основу: "договора", "договоры" -> "договор",
+"заңның" -> "заң", "kanunlar" -> "kanun". Это не полноценный морфологический
+анализ: словообразование и чередования в основе не учитываются.
+
+Стеммеры работают с уже нормализованным текстом (normalization.fold_headword):
+нижний регистр, без лишней диакритики.
+"""
+import re
+
+from .normalization import fold_headword
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Минимальная длина основы: короче не режем, иначе "суд" и "сук" совпадут
+MIN_STEM = 3
+
+# Турецкие корни в латинице короче не режем: "kanun" не должен стать "kan"
+TR_MIN_STEM = 4
+
+RU_VOWELS = set('аеиоуыэюяё')
+
+# Окончания по убыванию длины внутри групп; из группы снимается одно окончание
+RU_ENDINGS = (
+    # возвратные глаголы и причастия
+    ('ющимися', 'ющимся', 'ющиеся', 'вшимися', 'ющийся', 'ющаяся', 'ющееся', 'вшийся', 'ться', 'тся', 'ся', 'сь'),
+    # прилагательные и причастия
+    ('ейшими', 'ейшего', 'ейшему', 'ейшая', 'ейшее', 'ейший', 'ейшей',
+     'ющими', 'ующий', 'ющий', 'ующая', 'ющая', 'ующее', 'ющее', 'ованный', 'енный', 'анный',
+     'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой',
+     'ую', 'юю', 'ым', 'им', 'ых', 'их'),
+    # глаголы
+    ('ировать', 'ировал', 'ировала', 'ует', 'уют', 'ить', 'ать', 'ять', 'еть', 'оть', 'ыть',
+     'ила', 'ала', 'яла', 'ело', 'или', 'али', 'ют', 'ет', 'ит', 'ат', 'ят', 'ут', 'ешь', 'ишь'),
+    # существительные
+    ('иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой',
+     'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у',
+     'ы', 'ь', 'ю', 'я'),
+)
+
+# Казахские и турецкие суффиксы снимаются с конца слова по очереди (агглютинация)
+KK_SUFFIXES = sorted((
+    # множественное число
+    'лар', 'лер', 'дар', 'дер', 'тар', 'тер',
+    # принадлежность
+    'ымыз', 'іміз', 'мыз', 'міз', 'ыңыз', 'іңіз', 'ңыз', 'ңіз', 'ым', 'ім', 'ың', 'ің', 'сы', 'сі',
+    # падежи
+    'ның', 'нің', 'дың', 'дің', 'тың', 'тің', 'ға', 'ге', 'қа', 'ке', 'на', 'не', 'ны', 'ні',
+    'ды', 'ді', 'ты', 'ті', 'нда', 'нде', 'да', 'де', 'та', 'те', 'нан', 'нен', 'дан', 'ден',
+    'тан', 'тен', 'мен', 'бен', 'пен', 'ша', 'ше',
+    # производные прилагательные
+    'лық', 'лік', 'дық', 'дік', 'тық', 'тік', 'шы', 'ші',
+    # однобуквенные окончания
+    'ы', 'і', 'а', 'е', 'н', 'ң', 'м',
+), key=len, reverse=True)
+
+TR_SUFFIXES = sorted((
+    # множественное число
+    'lar', 'ler',
+    # принадлежность
+    'ımız', 'imiz', 'umuz', 'ümüz', 'ınız', 'iniz', 'unuz', 'ünüz', 'ları', 'leri',
+    'ım', 'im', 'um', 'üm', 'ın', 'in', 'un', 'ün', 'sı', 'si', 'su', 'sü',
+    # падежи
+    'nın', 'nin', 'nun', 'nün', 'dan', 'den', 'tan', 'ten', 'nda', 'nde', 'ndan', 'nden',
+    'da', 'de', 'ta', 'te', 'ya', 'ye', 'yı', 'yi', 'yu', 'yü', 'na', 'ne', 'nı', 'ni', 'nu', 'nü',
+    'la', 'le', 'yla', 'yle', 'ca', 'ce', 'ça', 'çe',
+    # производные прилагательные и существительные
+    'lık', 'lik', 'luk', 'lük', 'sız', 'siz', 'suz', 'süz', 'lı', 'li', 'lu', 'lü',
+    # однобуквенные окончания
+    'ı', 'i', 'u', 'ü', 'a', 'e',
+), key=len, reverse=True)
+
+EN_RULES = (
+    ('ies', 'y'), ('sses', 'ss'), ('ing', ''), ('edly', ''), ('ed', ''), ('ly', ''),
+    ('es', ''), ('s', ''),
+)
+
+
+def _stem_ru(token):
+    # Основа должна сохранить хотя бы одну гласную
+    for group in RU_ENDINGS:
+        for ending in group:
+            if token.endswith(ending):
+                stem = token[:-len(ending)]
+                if len(stem) >= MIN_STEM and RU_VOWELS & set(stem):
+                    token = stem
+                    break
+    return token
+
+
+def _strip_suffixes(token, suffixes, min_stem=MIN_STEM):
+    changed = True
+    while changed:
+        changed = False
+        for suffix in suffixes:
+            if token.endswith(suffix) and len(token) - len(suffix) >= min_stem:
+                token = token[:-len(suffix)]
+                changed = True
+                break
+    return token
+
+
+def _stem_kk(token):
+    # Кириллический казахский; латинские слова обрабатываются как турецкие
+    if token.isascii() or any('a' <= char <= 'z' or char in 'çşğöüı' for char in token):
+        return _stem_tr(token)
+    return _strip_suffixes(token, KK_SUFFIXES)
+
+
+def _stem_tr(token):
+    return _strip_suffixes(token, TR_SUFFIXES, TR_MIN_STEM)
+
+
+def _stem_en(token):
+    if token.endswith('ss'):
+        return token
+    for suffix, replacement in EN_RULES:
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= MIN_STEM:
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+STEMMERS = {
+    'ru': _stem_ru,
+    'kk': _stem_kk,
+    'tr': _stem_tr,
+    'en': _stem_en,
+}
+
+
+def stem_token(token, language_code):
+    """Основа одного нормализованного слова; для неизвестного языка - само слово"""
+    if len(token) <= MIN_STEM or token.isdigit():
+        return token
+    stemmer = STEMMERS.get(language_code)
+    return stemmer(token) if stemmer else token
+
+
+def stem_text(text, language_code):
+    """Ключ основ: нормализованный текст, каждое слово которого сведено к основе"""
+    folded = fold_headword(text, language_code)
+    return ' '.join(stem_token(token, language_code) for token in TOKEN_RE.findall(folded))
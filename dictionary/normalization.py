@@ -0,0 +1,125 @@
+"""Нормализация текста слов для поиска и проверки дубликатов"""
+import unicodedata
+from html.parser import HTMLParser
+
+from django.utils.text import Truncator
+
+# Языки с турецкими I/ı и İ/i (казахская латиница использует те же буквы)
+DOTTED_I_LANGUAGES = ('tr', 'kk')
+
+# Буквы алфавита, которые нельзя сводить к базовой букве при снятии диакритики
+PROTECTED_LETTERS = {
+    'ru': set('й'),
+    # Казахская латиница (алфавит 2021 года): ä, ğ, ñ, ö, ş, ū, ü - отдельные буквы
+    'kk': set('йäğñöşūü'),
+    'tr': set('çşğöü'),
+}
+
+# Казахская кириллица -> латиница (алфавит 2021 года)
+KAZAKH_LATIN = {
+    'а': 'a', 'ә': 'ä', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': 'ğ', 'д': 'd', 'е': 'e', 'ё': 'io',
+    'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'i', 'к': 'k', 'қ': 'q', 'л': 'l', 'м': 'm', 'н': 'n',
+    'ң': 'ñ', 'о': 'o', 'ө': 'ö', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ұ': 'ū',
+    'ү': 'ü', 'ф': 'f', 'х': 'h', 'һ': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'ş', 'щ': 'şş', 'ъ': '',
+    'ы': 'y', 'і': 'ı', 'ь': '', 'э': 'e', 'ю': 'iu', 'я': 'ia',
+}
+
+# Языки, слова которых пишут и кириллицей, и латиницей
+TRANSLITERATED_LANGUAGES = {'kk': KAZAKH_LATIN}
+
+# Латинские буквы с диакритикой, которые пользователи набирают без неё
+ASCII_LETTERS = {
+    'ä': 'a', 'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ñ': 'n', 'ö': 'o', 'ş': 's', 'ū': 'u', 'ü': 'u',
+}
+
+# Теги, между содержимым которых нужен пробел при извлечении текста
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'img', 'li', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+}
+
+# Теги, содержимое которых не является текстом
+SKIPPED_TAGS = {'script', 'style', 'template'}
+
+# Размер выдержки значения для карточек в списках
+EXCERPT_WORDS = 15
+EXCERPT_MAX_LENGTH = 255
+
+
+def fold_headword(text, language_code=None):
+    """Ключ заголовка слова: без регистра, лишней диакритики и лишних пробелов
+
+    Регистр снимается с учётом языка (турецкие İ/ı), диакритика - только та,
+    что не образует отдельную букву алфавита (ё -> е, но й остаётся й)."""
+    text = unicodedata.normalize('NFKC', text or '')
+    if language_code in DOTTED_I_LANGUAGES:
+        text = text.replace('I', 'ı').replace('İ', 'i')
+    text = unicodedata.normalize('NFC', text.casefold())
+
+    protected = PROTECTED_LETTERS.get(language_code, ())
+    folded = []
+    for char in text:
+        if char in protected:
+            folded.append(char)
+            continue
+        folded.extend(
+            part for part in unicodedata.normalize('NFD', char)
+            if unicodedata.category(part) != 'Mn'
+        )
+    return ' '.join(''.join(folded).split())
+
+
+def transliteration_key(text, language_code=None):
+    """Ключ заголовка, одинаковый для кириллицы, латиницы и ввода без диакритики
+
+    Для казахского кириллица переводится в латиницу ("Қазақ" -> "qazaq"), затем
+    у латинских букв снимается диакритика ("Türkçe" -> "turkce")."""
+    text = fold_headword(text, language_code)
+    alphabet = TRANSLITERATED_LANGUAGES.get(language_code)
+    if alphabet:
+        text = ''.join(alphabet.get(char, char) for char in text)
+    return ''.join(ASCII_LETTERS.get(char, char) for char in text)
+
+
+def normalize_query(text):
+    """Поисковый запрос без учёта регистра и лишних пробелов"""
+    return ' '.join((text or '').casefold().split())
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """Текст HTML-описания (TinyMCE) без разметки, стилей и лишних пробелов"""
+    if not html:
+        return ''
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return ' '.join(''.join(parser.parts).split())
+
+
+def make_excerpt(text):
+    """Выдержка из текста значения: первые EXCERPT_WORDS слов"""
+    return Truncator(Truncator(text).words(EXCERPT_WORDS)).chars(EXCERPT_MAX_LENGTH)
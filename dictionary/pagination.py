@@ -0,0 +1,260 @@
+"""Keyset-пагинация списков слов
+
+Страницы адресуются непрозрачным подписанным курсором со значениями ключа
+сортировки последней (первой) записи: следующая страница выбирается условием
+WHERE (word, id) > (...) LIMIT n без OFFSET. Номер страницы (?page=N)
+по-прежнему поддерживается для ссылок рядом с текущей страницей.
+
+Общее количество считается с ограничением COUNT_LIMIT: на больших выборках
+показывается "1000+" вместо полного COUNT(*).
+"""
+import datetime
+import math
+
+from django.core import signing
+from django.db.models import Q
+
+COUNT_LIMIT = 1000
+
+CURSOR_SALT = 'dictionary.pagination'
+
+# Направления курсора
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def capped_count(queryset, limit=COUNT_LIMIT):
+    """Количество записей, но не больше limit + 1 (SELECT COUNT(*) FROM (... LIMIT))"""
+    return queryset.order_by()[:limit + 1].count()
+
+
+class KeysetPage:
+    """Страница результатов; по интерфейсу близка к django.core.paginator.Page"""
+
+    def __init__(self, object_list, paginator, number, has_next, has_previous, first_values, last_values):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.number = number
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.first_values = first_values
+        self.last_values = last_values
+        self.next_cursor = paginator.encode_cursor(NEXT, last_values, number and number + 1) if has_next else ''
+        self.previous_cursor = (
+            paginator.encode_cursor(PREVIOUS, first_values, number and number - 1) if has_previous else ''
+        )
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def state(self):
+        """Всё, кроме самих объектов, что нужно для восстановления страницы (см. restore)"""
+        # Количество считается сразу: восстановленной странице оно понадобится без запроса
+        count = self.paginator._count if self.paginator.count is not None else None
+        return {
+            'ids': [obj.pk for obj in self.object_list],
+            'number': self.number,
+            'has_next': self._has_next,
+            'has_previous': self._has_previous,
+            'first_values': self.first_values,
+            'last_values': self.last_values,
+            'count': count,
+        }
+
+    @property
+    def total(self):
+        return self.paginator.count
+
+    @property
+    def total_is_approximate(self):
+        return self.paginator.count_is_approximate
+
+    @property
+    def last_cursor(self):
+        """Курсор последней страницы (обратный проход от конца выборки)"""
+        return self.paginator.encode_cursor(PREVIOUS, None, self.paginator.num_pages)
+
+    @property
+    def page_links(self):
+        """Окно номеров страниц вокруг текущей; None - пропуск (многоточие)"""
+        if not self.number:
+            return []
+        return list(self.paginator.page_window(self.number))
+
+
+class KeysetPaginator:
+    """Пагинатор по ключу сортировки ordering (последнее поле должно быть уникальным)
+
+    Поля задаются как в order_by ('word', '-id'); значения берутся из атрибутов
+    объектов, поэтому поля сортировки должны быть полями модели или аннотациями
+    без NULL."""
+
+    def __init__(self, queryset, per_page, ordering=('word', 'id'), count=True, count_limit=COUNT_LIMIT):
+        self.per_page = per_page
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.queryset = queryset.order_by(*ordering)
+        self._with_count = count
+        self._count_limit = count_limit
+        self._count = None
+
+    @property
+    def count(self):
+        """Количество записей, ограниченное count_limit (None - не считается)"""
+        if not self._with_count:
+            return None
+        if self._count is None:
+            self._count = capped_count(self.queryset, self._count_limit)
+        return min(self._count, self._count_limit)
+
+    @property
+    def count_is_approximate(self):
+        return self.count is not None and self._count > self._count_limit
+
+    @property
+    def num_pages(self):
+        """Число страниц, если количество известно точно"""
+        if self.count is None or self.count_is_approximate:
+            return None
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    def page_window(self, number, on_each_side=2, on_ends=1):
+        """Номера страниц: начало, окно вокруг текущей, конец (если известен)"""
+        last = self.num_pages
+        window_end = number + on_each_side if last is None else min(number + on_each_side, last)
+        candidates = set(range(1, min(on_ends, window_end) + 1))
+        candidates.update(range(max(number - on_each_side, 1), window_end + 1))
+        if last is not None:
+            candidates.update(range(max(last - on_ends + 1, 1), last + 1))
+        previous = 0
+        for page in sorted(candidates):
+            if page - previous > 1:
+                yield None
+            yield page
+            previous = page
+
+    def restore(self, state, object_list):
+        """Страница из сохранённого state() без запросов выборки и подсчёта"""
+        if state['count'] is not None:
+            self._count = state['count']
+        return KeysetPage(
+            object_list, self, state['number'],
+            has_next=state['has_next'],
+            has_previous=state['has_previous'],
+            first_values=state['first_values'],
+            last_values=state['last_values'],
+        )
+
+    # Курсоры
+
+    def _signer(self):
+        ordering = ','.join(('-' if desc else '') + field for field, desc in self.ordering)
+        return signing.Signer(salt=f'{CURSOR_SALT}:{ordering}')
+
+    def encode_cursor(self, direction, values, number):
+        payload = {'d': direction, 'v': values, 'n': number}
+        return self._signer().sign_object(payload, compress=True)
+
+    def decode_cursor(self, cursor):
+        """(направление, значения ключа, номер страницы) или None для неверного курсора"""
+        try:
+            payload = self._signer().unsign_object(cursor)
+            return payload['d'], payload['v'], payload['n']
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+
+    def _key_values(self, obj):
+        values = []
+        for field, desc in self.ordering:
+            value = getattr(obj, field)
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def _seek(self, values, forward):
+        """Условие "строго после" (или "строго до") значения ключа"""
+        condition = Q()
+        for index, (field, desc) in enumerate(self.ordering):
+            lookup = 'gt' if forward != desc else 'lt'
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            for (previous_field, _), previous_value in zip(self.ordering[:index], values):
+                step &= Q(**{previous_field: previous_value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [('' if desc else '-') + field for field, desc in self.ordering]
+
+    # Страницы
+
+    def page(self, cursor=None, number=None):
+        """Страница по курсору, иначе по номеру (OFFSET), иначе первая"""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is not None:
+            direction, values, page_number = decoded
+            if direction == PREVIOUS:
+                return self._page_before(values, page_number)
+            return self._page_after(values, page_number)
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        if self.num_pages is not None:
+            number = min(number, self.num_pages)
+        offset = (number - 1) * self.per_page
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        if not rows and number > 1:
+            return self.page()
+        return self._build(rows, number, has_previous=number > 1)
+
+    def _page_after(self, values, number):
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward=True))
+        rows = list(queryset[:self.per_page + 1])
+        return self._build(rows, number, has_previous=values is not None)
+
+    def _page_before(self, values, number):
+        queryset = self.queryset.order_by(*self._reversed_ordering())
+        size = self.per_page
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward=False))
+        elif self.num_pages is not None:
+            # Последняя страница неполная - как при переходе по номеру
+            size = self.count - (self.num_pages - 1) * self.per_page or self.per_page
+        rows = list(queryset[:size + 1])
+        has_previous = len(rows) > size
+        rows = rows[:size][::-1]
+        # Вернулись к началу выборки: это первая страница
+        if not has_previous:
+            number = 1
+        return KeysetPage(
+            rows, self, number,
+            has_next=values is not None,
+            has_previous=has_previous,
+            first_values=self._key_values(rows[0]) if rows else None,
+            last_values=self._key_values(rows[-1]) if rows else None,
+        )
+
+    def _build(self, rows, number, has_previous):
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows, self, number,
+            has_next=has_next,
+            has_previous=has_previous and bool(rows),
+            first_values=self._key_values(rows[0]) if rows else None,
+            last_values=self._key_values(rows[-1]) if rows else None,
+        )
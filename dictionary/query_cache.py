@@ -0,0 +1,273 @@
+"""Кэш результатов запросов (queryset.cached()) со сбросом по таблицам
+
+Результат помеченного запроса (CachedQuerySet.cached) хранится в общем кэше
+Django (django.core.cache) по ключу из SQL и параметров запроса вместе с
+версиями таблиц, которые запрос прочитал, включая JOIN, подзапросы и
+prefetch_related. Таблицы определяются по SQL, выполненному при вычислении.
+Запись годна, пока версии всех её таблиц не изменились.
+
+Версии увеличивает обёртка выполнения SQL на каждом соединении (install):
+любой INSERT, UPDATE, DELETE - save(), delete(), queryset.update(),
+bulk_create(), изменения m2m, RunPython и сырой SQL - увеличивает версию
+своей таблицы после коммита транзакции. Отслеживаются только таблицы, которые
+могут читать кэшируемые запросы (tracked_tables): таблицы моделей с
+CachedQuerySet и связанных с ними моделей. Запрос, прочитавший другую
+таблицу, не кэшируется. Другие воркеры видят новую версию не позже
+LOCAL_TIMEOUT общего кэша (см. dictionary/tiered_cache.py).
+
+Внутри транзакции кэш не используется: она может видеть свои незакоммиченные
+изменения. Кэшируются только списки результатов; count(), exists(),
+aggregate() идут в БД как обычно.
+"""
+import hashlib
+import pickle
+import re
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, transaction
+
+DEFAULT_TIMEOUT = 300
+
+VERSION_KEY = 'dictionary:table-version:{}'
+RESULT_KEY = 'dictionary:query:{}'
+
+# Запросы, которые меняют данные таблицы (таблица - первая после ключевых слов)
+WRITE_SQL = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM'
+    r'|TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE)\s+[`"]?(\w+)',
+    re.IGNORECASE,
+)
+
+# Таблицы, которые читает запрос
+READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+[`"](\w+)[`"]', re.IGNORECASE)
+
+_local = threading.local()
+# Таблицы, версии которых увеличатся после коммита: {alias соединения: set}
+_scheduled = threading.local()
+_counters = {'hits': 0, 'misses': 0, 'stale': 0, 'bypassed': 0, 'uncacheable': 0, 'bumps': 0}
+_counters_lock = threading.Lock()
+
+_tracked_tables = None
+
+
+def _count(name, n=1):
+    with _counters_lock:
+        _counters[name] += n
+
+
+# Версии таблиц
+
+def _new_version():
+    return int(time.time() * 1000)
+
+
+def table_versions(tables):
+    """{таблица: версия}; отсутствующая версия создаётся
+
+    Версия не бывает нулевой: вытесненный из кэша ключ получает новое
+    значение, и записи, построенные по старому, не становятся годными снова."""
+    versions = {}
+    for table in tables:
+        key = VERSION_KEY.format(table)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, _new_version(), None)
+            version = cache.get(key)
+        versions[table] = version
+    return versions
+
+
+def bump_tables(*tables):
+    """Делает устаревшими кэшированные запросы к таблицам во всех процессах"""
+    if getattr(_local, 'bumping', False):
+        return
+    _local.bumping = True
+    try:
+        for table in set(tables):
+            key = VERSION_KEY.format(table)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _new_version(), None)
+        _count('bumps', len(set(tables)))
+    finally:
+        _local.bumping = False
+
+
+# Отслеживание записи
+
+def _model_tables(model):
+    """Таблица модели, её связей many-to-many и связанных моделей (один шаг)"""
+    tables = {model._meta.db_table}
+    for field in model._meta.get_fields(include_hidden=True):
+        if field.related_model is not None:
+            tables.add(field.related_model._meta.db_table)
+        if field.many_to_many:
+            through = field.remote_field.through if field.concrete else field.through
+            tables.add(through._meta.db_table)
+    return tables
+
+
+def tracked_tables():
+    """Таблицы, запись в которые сбрасывает кэш запросов"""
+    global _tracked_tables
+    if _tracked_tables is None:
+        from django.apps import apps
+
+        tables = set()
+        for model in apps.get_models():
+            queryset_class = type(model._default_manager.get_queryset())
+            if issubclass(queryset_class, CachedQuerySet):
+                tables |= _model_tables(model)
+        _tracked_tables = frozenset(tables)
+    return _tracked_tables
+
+
+def _pending_tables(alias):
+    return _scheduled.__dict__.setdefault(alias, set())
+
+
+def _bump_pending(alias):
+    tables = _pending_tables(alias)
+    if tables:
+        _scheduled.__dict__[alias] = set()
+        bump_tables(*tables)
+
+
+def _schedule_bump(connection, table):
+    """Увеличить версию таблицы после коммита; все таблицы транзакции - одним bump_tables()"""
+    if not connection.in_atomic_block:
+        bump_tables(table)
+        return
+    _pending_tables(connection.alias).add(table)
+    # Обработчик добавляется на каждую запись: откат точки сохранения убирает
+    # добавленные в ней. Первый выполненный увеличивает версии всех таблиц
+    transaction.on_commit(partial(_bump_pending, connection.alias), using=connection.alias)
+
+
+def _track_writes(execute, sql, params, many, context):
+    result = execute(sql, params, many, context)
+    match = WRITE_SQL.match(sql)
+    if match and match.group(1) in tracked_tables():
+        _schedule_bump(context['connection'], match.group(1))
+    return result
+
+
+def install(connection):
+    """Подключает отслеживание записи к соединению (сигнал connection_created)"""
+    if _track_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_track_writes)
+
+
+# Чтение
+
+class _ReadTables:
+    """Обёртка выполнения SQL: собирает таблицы из прочитанных запросов"""
+
+    def __init__(self):
+        self.tables = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.tables.update(READ_TABLES.findall(sql))
+        return execute(sql, params, many, context)
+
+
+def _result_key(queryset):
+    """Ключ записи и таблицы, которые читает SQL запроса (без prefetch_related)"""
+    sql, params = queryset.query.chain().get_compiler(queryset.db).as_sql()
+    iterable = queryset._iterable_class
+    payload = '|'.join(str(part) for part in (
+        queryset.db, queryset.model._meta.label, f'{iterable.__module__}.{iterable.__qualname__}',
+        sql, repr(params), repr(queryset._prefetch_related_lookups),
+    ))
+    return RESULT_KEY.format(hashlib.sha1(payload.encode('utf-8')).hexdigest()), set(READ_TABLES.findall(sql))
+
+
+def fetch(queryset, timeout):
+    """Список результатов queryset из кэша или из БД; None - кэш не применим"""
+    connection = connections[queryset.db]
+    if connection.in_atomic_block:
+        _count('bypassed')
+        return None
+    try:
+        key, tables = _result_key(queryset)
+    except EmptyResultSet:
+        return None
+
+    entry = cache.get(key)
+    if entry is not None:
+        versions, rows = entry
+        if table_versions(versions) == versions:
+            _count('hits')
+            return rows
+        _count('stale')
+        # Прошлое вычисление знает и таблицы prefetch_related
+        tables |= set(versions)
+    _count('misses')
+
+    # Версии читаются до запроса: запись, закоммиченная во время него, сделает результат устаревшим
+    before = table_versions(tables & tracked_tables())
+    plain = queryset._chain()
+    plain._cache_timeout = None
+    reader = _ReadTables()
+    with connection.execute_wrapper(reader):
+        rows = list(plain)
+    if not reader.tables <= tracked_tables():
+        # Запись в эту таблицу не сбросит кэш
+        _count('uncacheable')
+        return rows
+    # Версии таблиц, которых не было в снимке, не известны: запись только
+    # сохраняет их список и будет пересчитана при следующем обращении
+    versions = {table: before.get(table) for table in reader.tables}
+    try:
+        cache.set(key, (versions, rows), timeout)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        # Например, namedtuple из values_list(named=True) не сериализуется
+        pass
+    return rows
+
+
+class CachedQuerySet(models.QuerySet):
+    """QuerySet с кэшем результатов по запросу: Category.objects.cached().order_by('code')"""
+
+    _cache_timeout = None
+
+    def cached(self, timeout=None):
+        """Результаты этого запроса (и построенных из него) берутся из кэша"""
+        clone = self._chain()
+        if timeout is None:
+            timeout = getattr(settings, 'QUERY_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        clone._cache_timeout = timeout
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._cache_timeout = self._cache_timeout
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._cache_timeout is not None:
+            rows = fetch(self, self._cache_timeout)
+            if rows is not None:
+                self._result_cache = rows
+                # Объекты из кэша приходят вместе с результатами prefetch_related
+                self._prefetch_done = True
+        super()._fetch_all()
+
+    def iterator(self, chunk_size=2000):
+        # ModelChoiceIterator перебирает queryset.iterator(): для форм тоже работает кэш
+        if self._cache_timeout is None:
+            return super().iterator(chunk_size)
+        self._fetch_all()
+        return iter(self._result_cache)
+
+
+def stats():
+    """Счётчики кэша запросов текущего процесса"""
+    with _counters_lock:
+        return dict(_counters)
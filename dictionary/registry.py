@@ -0,0 +1,149 @@
+"""Справочные данные в памяти процесса: языки, категории, теги и их переводы
+
+Справочники маленькие и меняются редко, поэтому загружаются целиком одним
+набором запросов и дальше читаются из памяти: названия категорий и тегов
+на нужном языке находятся по словарю, без запроса. При изменении справочника
+сигналы увеличивают версию в общем кэше Django (django.core.cache); процессы
+сверяют версию не чаще CHECK_INTERVAL секунд и перечитывают данные, если она
+изменилась. Свой процесс перечитывает данные сразу.
+
+Объекты справочника общие для всех запросов процесса - их нельзя изменять.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'dictionary:registry-version'
+
+# Как часто сверять версию справочника с общим кэшем
+CHECK_INTERVAL = 2.0
+
+
+class Snapshot:
+    """Загруженное состояние справочника"""
+
+    def __init__(self, languages, categories, tags, category_names, tag_names):
+        self.languages = languages
+        self.categories = categories
+        self.tags = tags
+        self.languages_by_id = {language.pk: language for language in languages}
+        self.languages_by_code = {language.code: language for language in languages}
+        self.categories_by_id = {category.pk: category for category in categories}
+        self.tags_by_id = {tag.pk: tag for tag in tags}
+        self.category_names = category_names  # (id категории, код языка) -> название
+        self.tag_names = tag_names            # (id тега, код языка) -> название
+
+
+class Registry:
+    """Справочник процесса с проверкой версии"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked_at = 0.0
+        self.loads = 0
+
+    def _load(self):
+        from .models import Category, CategoryTranslation, Language, Tag, TagTranslation
+
+        languages = list(Language.objects.order_by('code'))
+        codes = {language.pk: language.code for language in languages}
+        category_names = {
+            (category_id, codes[language_id]): name
+            for category_id, language_id, name in CategoryTranslation.objects.values_list(
+                'category_id', 'language_id', 'name'
+            )
+        }
+        tag_names = {
+            (tag_id, codes[language_id]): name
+            for tag_id, language_id, name in TagTranslation.objects.values_list('tag_id', 'language_id', 'name')
+        }
+        self.loads += 1
+        return Snapshot(
+            languages,
+            list(Category.objects.order_by('code')),
+            list(Tag.objects.order_by('code')),
+            category_names,
+            tag_names,
+        )
+
+    def snapshot(self):
+        """Актуальный снимок справочника (загружается при первом обращении)"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < CHECK_INTERVAL:
+            return snapshot
+        with self._lock:
+            version = cache.get(VERSION_KEY, 0)
+            if self._snapshot is None or version != self._version:
+                # Версия читается до загрузки: изменение во время загрузки вызовет повторную
+                self._snapshot = self._load()
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def version(self):
+        """Версия загруженного справочника (меняется при каждом изменении)"""
+        self.snapshot()
+        return self._version
+
+    def invalidate(self):
+        """Перечитать справочник при следующем обращении (в этом процессе)"""
+        with self._lock:
+            self._snapshot = None
+
+    # Чтение
+
+    def languages(self):
+        return self.snapshot().languages
+
+    def categories(self):
+        return self.snapshot().categories
+
+    def tags(self):
+        return self.snapshot().tags
+
+    def language(self, pk=None, code=None):
+        """Язык по id или коду; None, если такого нет"""
+        snapshot = self.snapshot()
+        if code is not None:
+            return snapshot.languages_by_code.get(code)
+        return snapshot.languages_by_id.get(pk)
+
+    def category(self, pk):
+        return self.snapshot().categories_by_id.get(pk)
+
+    def tag(self, pk):
+        return self.snapshot().tags_by_id.get(pk)
+
+    def category_name(self, category, language_code):
+        """Название категории на языке; код категории, если перевода нет"""
+        return self.snapshot().category_names.get((category.pk, language_code), category.code)
+
+    def tag_name(self, tag, language_code):
+        """Название тега на языке; код тега, если перевода нет"""
+        return self.snapshot().tag_names.get((tag.pk, language_code), tag.code)
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'version': self._version,
+            'loads': self.loads,
+            'languages': len(snapshot.languages) if snapshot else None,
+            'categories': len(snapshot.categories) if snapshot else None,
+            'tags': len(snapshot.tags) if snapshot else None,
+        }
+
+
+def bump_version():
+    """Делает справочник устаревшим во всех процессах"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Ключа ещё нет (или он вытеснен): любое новое значение отличается от 0
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+    registry.invalidate()
+
+
+registry = Registry()
@@ -0,0 +1,146 @@
+"""Кэш результатов поиска: id слов страницы выдачи по нормализованному запросу
+
+Кэш живёт в памяти процесса: ограниченный размер, вытеснение давно не
+использованных записей (LRU) и короткий TTL. Записи привязаны к поколениям
+языков: при создании, одобрении, изменении или удалении слова поколение его
+языка увеличивается в общем кэше Django (django.core.cache), и записи всех
+воркеров, построенные по старому поколению, перестают использоваться.
+
+Промах в памяти процесса идёт в общий кэш воркеров через
+tiered_cache.get_or_compute: одну выдачу считает один воркер, остальные
+получают готовое состояние, а после истечения TTL (или при блокировке БД)
+отдаётся прежнее состояние того же поколения, пока идёт пересчёт.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .normalization import normalize_query
+from .tiered_cache import get_or_compute
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL = 60
+DEFAULT_STALE_TTL = 300
+
+GENERATION_KEY = 'dictionary:search-generation:{}'
+SHARED_KEY = 'dictionary:search-results:{}:{}'
+
+# Поколение для выдачи по всем языкам
+ALL_LANGUAGES = '*'
+
+
+def _settings():
+    return getattr(settings, 'SEARCH_RESULT_CACHE', {})
+
+
+def generation(language_code=None):
+    """Текущее поколение выдачи языка (или всех языков)"""
+    return cache.get(GENERATION_KEY.format(language_code or ALL_LANGUAGES), 0)
+
+
+def bump_generation(*language_codes):
+    """Делает устаревшими результаты поиска по этим языкам и по всем языкам сразу"""
+    for code in set(language_codes) | {ALL_LANGUAGES}:
+        key = GENERATION_KEY.format(code)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Ключа ещё нет (или он вытеснен): любое новое значение отличается от 0
+            cache.set(key, int(time.time() * 1000), None)
+
+
+class ResultCache:
+    """LRU-кэш состояний страниц выдачи с TTL и счётчиками"""
+
+    def __init__(self, max_entries=None, ttl=None):
+        options = _settings()
+        self.max_entries = max_entries or options.get('MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        self.ttl = ttl or options.get('TTL', DEFAULT_TTL)
+        self.stale_ttl = options.get('STALE_TTL', DEFAULT_STALE_TTL)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evictions = 0
+
+    def get(self, key, language_code=None):
+        current = generation(language_code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, entry_generation, value = entry
+            if expires_at < time.monotonic():
+                self.expired += 1
+            elif entry_generation != current:
+                self.invalidated += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, language_code=None):
+        entry = (time.monotonic() + self.ttl, generation(language_code), value)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, language_code=None):
+        """Состояние из памяти процесса, общего кэша или compute() (один пересчёт на ключ)"""
+        value = self.get(key, language_code)
+        if value is None:
+            digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+            shared_key = SHARED_KEY.format(generation(language_code), digest)
+            value = get_or_compute(shared_key, compute, timeout=self.ttl, stale_timeout=self.stale_ttl)
+            self.set(key, value, language_code)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'invalidated': self.invalidated,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+def make_key(query, language_code, category_id, sort, cursor, page, staff, mode=''):
+    """Ключ выдачи: запрос без учёта регистра и лишних пробелов"""
+    return (
+        'staff' if staff else 'published',
+        mode,
+        normalize_query(query),
+        language_code or '',
+        category_id,
+        sort,
+        cursor or '',
+        str(page) if not cursor else '',
+    )
+
+
+results = ResultCache()
@@ -0,0 +1,258 @@
+"""Полнотекстовый поиск по словам (SQLite FTS5)"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .autocomplete import language_codes
+from .models import Translation, Word
+from .morphology import stem_text
+from .normalization import fold_headword, transliteration_key
+
+# Таблица индекса синхронизируется с dictionary_word триггерами. SQLite удаляет
+# триггеры при пересоздании таблицы в миграциях, поэтому схема индекса
+# проверяется и восстанавливается после каждого migrate (ensure_index).
+# Колонка meaning индекса заполняется текстом без разметки (Word.meaning_text).
+FTS_TABLE = 'dictionary_word_fts'
+
+INDEX_SCHEMA = {
+    FTS_TABLE: (
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"word, meaning, tokenize = 'unicode61 remove_diacritics 2')"
+    ),
+    f'{FTS_TABLE}_ai': (
+        f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON dictionary_word BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, word, meaning) VALUES (new.id, new.word, new.meaning_text); "
+        f"END"
+    ),
+    f'{FTS_TABLE}_ad': (
+        f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON dictionary_word BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+        f"END"
+    ),
+    f'{FTS_TABLE}_au': (
+        f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF word, meaning_text ON dictionary_word BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+        f"INSERT INTO {FTS_TABLE}(rowid, word, meaning) VALUES (new.id, new.word, new.meaning_text); "
+        f"END"
+    ),
+}
+
+# Заполнение индекса по таблице слов
+INDEX_POPULATE_SQL = (
+    f'INSERT INTO {FTS_TABLE}(rowid, word, meaning) '
+    f'SELECT id, word, meaning_text FROM dictionary_word'
+)
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Уровни релевантности: точный заголовок, другая форма того же слова (общая
+# основа), начало заголовка, слово внутри заголовка, совпадение только
+# в значении (или в категории/теге)
+TIER_EXACT = 0
+TIER_STEM = 1
+TIER_PREFIX = 2
+TIER_TOKEN = 3
+TIER_OTHER = 4
+
+# Веса колонок индекса (word, meaning) в bm25
+BM25_WEIGHTS = (10.0, 1.0)
+
+# Порядок выдачи по релевантности; id делает ключ уникальным для пагинации
+RELEVANCE_ORDERING = ('search_tier', 'search_score', 'word', 'id')
+
+# Режимы поиска: по самим словам или через их одобренные переводы
+MODE_WORDS = 'words'
+MODE_TRANSLATIONS = 'translations'
+SEARCH_MODES = (MODE_WORDS, MODE_TRANSLATIONS)
+
+# Служебные маркеры подсветки: экранируются отдельно от текста слова
+MARK_OPEN = '\x02'
+MARK_CLOSE = '\x03'
+
+
+def fts_available():
+    """Полнотекстовый индекс есть только в SQLite"""
+    return connection.vendor == 'sqlite'
+
+
+def query_stems(text, language_code=None):
+    """Основы текста для языка фильтра или, без фильтра, для всех языков словаря"""
+    codes = [language_code] if language_code else language_codes()
+    return {stem_text(text, code) for code in codes} - {''}
+
+
+def query_translit_keys(text, language_code=None):
+    """Ключи транслитерации запроса для языка фильтра или для всех языков словаря"""
+    codes = [language_code] if language_code else language_codes()
+    return {transliteration_key(text, code) for code in codes} - {''}
+
+
+def build_match_expression(query, language_code=None):
+    """Преобразует поисковую строку в выражение FTS5: префиксный поиск по каждому слову
+
+    Слово запроса ищется и по своим основам, поэтому "договора" находит
+    "договор", а "заңның" - "заң"."""
+    groups = []
+    for token in TOKEN_RE.findall(query):
+        variants = [token.lower()]
+        variants += sorted(query_stems(token, language_code) - set(variants))
+        terms = ' OR '.join(f'"{variant}"*' for variant in variants)
+        groups.append(f'({terms})' if len(variants) > 1 else terms)
+    return ' '.join(groups)
+
+
+def visible_words(user):
+    """Слова, доступные пользователю: персонал видит все неудалённые, остальные - опубликованные"""
+    if user.is_authenticated and (user.is_staff or user.is_superuser):
+        return Word.objects.filter(is_deleted=False)
+    return Word.objects.published()
+
+
+def search_q(query, language_code=None):
+    """Условие поиска по слову и значению через полнотекстовый индекс
+
+    Заголовок, набранный в другой письменности или без диакритики, находится
+    по индексированному translit_key в том же запросе."""
+    expression = build_match_expression(query, language_code)
+    translit = Q(translit_key__in=query_translit_keys(query, language_code))
+    if not expression or not fts_available():
+        stems = query_stems(query, language_code)
+        return Q(word__icontains=query) | Q(stem_key__in=stems) | translit | Q(meaning_text__icontains=query)
+    return Q(id__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [expression],
+    )) | translit
+
+
+def search_words(words, query, language_code=None):
+    """Фильтрует queryset слов по запросу, сохраняя его условия видимости"""
+    return words.filter(search_q(query, language_code))
+
+
+def translation_q(query):
+    """Условие обратного поиска: слова, связанные одобренным переводом со словами запроса
+
+    Запрос ищется на всех языках, переводы обходятся в обе стороны. Оба
+    подзапроса к переводам читают только индексы (from_word, status, to_word)
+    и (to_word, status, from_word), поэтому фильтр выполняется одним запросом."""
+    matched = Word.objects.filter(is_deleted=False).filter(search_q(query)).values('id')
+    approved = Translation.objects.filter(status='approved')
+    return (
+        Q(id__in=approved.filter(from_word__in=matched).values('to_word'))
+        | Q(id__in=approved.filter(to_word__in=matched).values('from_word'))
+    )
+
+
+def rank_words(words, query, language_code=None):
+    """Аннотирует слова уровнем (search_tier) и оценкой bm25 (search_score)
+
+    Уровень считается по headword_key, translit_key и stem_key, оценка - коррелированным подзапросом
+    к индексу, поэтому сортировка и пагинация выполняются одним запросом.
+    Меньшие значения обоих полей означают более релевантное слово."""
+    codes = [language_code] if language_code else language_codes()
+    keys = {fold_headword(query, code) for code in codes} - {''}
+    stems = query_stems(query, language_code)
+    translits = query_translit_keys(query, language_code)
+
+    prefix = Q()
+    token = Q()
+    for key in keys:
+        prefix |= Q(headword_key__startswith=key)
+        token |= Q(headword_key__contains=f' {key}')
+    if keys:
+        tier = Case(
+            When(Q(headword_key__in=keys) | Q(translit_key__in=translits), then=Value(TIER_EXACT)),
+            When(stem_key__in=stems, then=Value(TIER_STEM)),
+            When(prefix, then=Value(TIER_PREFIX)),
+            When(token, then=Value(TIER_TOKEN)),
+            default=Value(TIER_OTHER),
+            output_field=IntegerField(),
+        )
+    else:
+        tier = Value(TIER_OTHER, output_field=IntegerField())
+
+    expression = build_match_expression(query, language_code)
+    if expression and fts_available():
+        # bm25 отрицателен: чем меньше, тем релевантнее; без совпадения в индексе - 0
+        score = RawSQL(
+            f'COALESCE((SELECT bm25({FTS_TABLE}, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{Word._meta.db_table}"."id"), 0.0)',
+            [*BM25_WEIGHTS, expression],
+            output_field=FloatField(),
+        )
+    else:
+        score = Value(0.0, output_field=FloatField())
+    return words.annotate(search_tier=tier, search_score=score)
+
+
+def highlight_words(words, query, language_code=None):
+    """Подсвечивает совпадения в словах страницы (атрибут highlighted_word)
+
+    Один запрос к индексу на всю страницу результатов."""
+    words = list(words)
+    expression = build_match_expression(query, language_code)
+    highlights = {}
+    if words and expression and fts_available():
+        ids = [word.pk for word in words]
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid IN ({placeholders})',
+                [MARK_OPEN, MARK_CLOSE, expression, *ids],
+            )
+            highlights = dict(cursor.fetchall())
+    for word in words:
+        word.highlighted_word = render_marks(highlights.get(word.pk, word.word))
+    return words
+
+
+def render_marks(text):
+    """Экранирует текст и заменяет маркеры подсветки на <mark>"""
+    html = escape(text).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+    return mark_safe(html)
+
+
+def rebuild_index(using=None):
+    """Полностью перестраивает полнотекстовый индекс по таблице слов"""
+    conn = connections[using or DEFAULT_DB_ALIAS]
+    if conn.vendor != 'sqlite':
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(INDEX_POPULATE_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def ensure_index(using=None):
+    """Приводит таблицу индекса и триггеры к INDEX_SCHEMA
+
+    Возвращает True, если схему пришлось пересоздать (индекс перестроен)."""
+    conn = connections[using or DEFAULT_DB_ALIAS]
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE name IN (%s)" % ', '.join(['%s'] * len(INDEX_SCHEMA)),
+            list(INDEX_SCHEMA),
+        )
+        existing = dict(cursor.fetchall())
+        if existing == INDEX_SCHEMA:
+            return False
+        with transaction.atomic(using=conn.alias):
+            for name in INDEX_SCHEMA:
+                if name != FTS_TABLE:
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            if existing.get(FTS_TABLE) != INDEX_SCHEMA[FTS_TABLE]:
+                cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+            for name, sql in INDEX_SCHEMA.items():
+                if name != FTS_TABLE or existing.get(FTS_TABLE) != sql:
+                    cursor.execute(sql)
+            rebuild_index(using=conn.alias)
+    return True
@@ -0,0 +1,166 @@
+"""Буферизованная запись истории поиска (SearchHistory)
+
+Запрос только добавляет событие в буфер процесса; фоновый поток пишет
+накопленные события одним bulk_create, когда буфер заполнится до BATCH_SIZE
+или пройдёт FLUSH_INTERVAL секунд. Если база занята (SQLite держит блокировку
+записи), пачка отбрасывается - запросы пользователей никогда не ждут запись
+истории. Переполненный буфер вытесняет самые старые события.
+"""
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .normalization import normalize_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_MAX_BUFFER = 2000
+
+
+def _option(name, default):
+    return getattr(settings, 'SEARCH_HISTORY', {}).get(name, default)
+
+
+class SearchRecorder:
+    """Буфер событий поиска одного процесса с фоновым сбросом в БД"""
+
+    def __init__(self):
+        self.batch_size = _option('BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.flush_interval = _option('FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self._buffer = deque(maxlen=_option('MAX_BUFFER', DEFAULT_MAX_BUFFER))
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, query, user=None, language='', results_count=None):
+        """Добавляет событие в буфер; не обращается к БД"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((
+            (user.pk if user is not None and user.is_authenticated else None),
+            query[:100],
+            language or '',
+            results_count,
+            timezone.now(),
+        ))
+        self.recorded += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='search-history-flush', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _take_batch(self):
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+        return batch
+
+    def flush(self):
+        """Записывает всё накопленное; пачки, упавшие из-за занятой БД, отбрасываются"""
+        from .models import SearchHistory
+
+        try:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return
+                try:
+                    SearchHistory.objects.bulk_create([
+                        SearchHistory(
+                            user_id=user_id, word=word, language=language,
+                            results_count=results_count, searched_at=searched_at,
+                        )
+                        for user_id, word, language, results_count, searched_at in batch
+                    ])
+                    self.written += len(batch)
+                except DatabaseError as e:
+                    self.dropped += len(batch)
+                    logger.warning('История поиска: отброшено %s событий (%s)', len(batch), e)
+                    return
+        finally:
+            connection.close()
+
+    def stats(self):
+        return {
+            'buffered': len(self._buffer),
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+
+
+recorder = SearchRecorder()
+
+
+def record_search(request, query, language='', results_count=None):
+    """Записать поисковый запрос в историю (асинхронно)"""
+    recorder.record(query, user=getattr(request, 'user', None), language=language, results_count=results_count)
+
+
+def rollup_day(day):
+    """Пересчитывает сводку SearchQueryDaily за день по сырой истории поиска
+
+    Группировка по исходному тексту выполняется в БД, объединение вариантов
+    написания одного запроса - в Python. Повторный запуск заменяет сводку дня."""
+    from .models import SearchHistory, SearchQueryDaily
+
+    # Полуоткрытый интервал по локальным полуночам: __date обернул бы столбец
+    # в функцию, и индекс по searched_at не использовался бы
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    groups = SearchHistory.objects.filter(searched_at__gte=start, searched_at__lt=end).values('language', 'word').annotate(
+        searches=Count('id'),
+        zero_result_searches=Count('id', filter=Q(results_count=0)),
+    ).order_by()
+
+    totals = {}
+    for group in groups.iterator():
+        query = normalize_query(group['word'])
+        if not query:
+            continue
+        counters = totals.setdefault((group['language'], query), [0, 0])
+        counters[0] += group['searches']
+        counters[1] += group['zero_result_searches']
+
+    with transaction.atomic():
+        SearchQueryDaily.objects.filter(day=day).delete()
+        SearchQueryDaily.objects.bulk_create([
+            SearchQueryDaily(
+                day=day, language=language, query=query[:100],
+                searches=searches, zero_result_searches=zero_results,
+                is_miss=zero_results == searches,
+            )
+            for (language, query), (searches, zero_results) in totals.items()
+        ], batch_size=500)
+    return len(totals)
+
+
+@atexit.register
+def _flush_on_exit():
+    if recorder._buffer:
+        recorder.flush()
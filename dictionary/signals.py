@@ -0,0 +1,360 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed, post_save, post_delete, post_migrate, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, CategoryTranslation, Example, Language, Tag, TagTranslation, Translation, Word
+from . import autocomplete, documents, fuzzy, microcache, query_cache, registry, result_cache, search, stats
+
+# Поля слова, которые попадают в словарь автодополнения
+AUTOCOMPLETE_FIELDS = ('word', 'slug', 'status', 'is_deleted', 'language_id')
+
+# Поля слова, которые хранит индекс похожих слов
+FUZZY_FIELDS = ('word', 'slug', 'is_deleted', 'language_id')
+
+# Поля слова, которые попадают в документы страниц слов, переводящихся в него
+DOCUMENT_LINK_FIELDS = ('word', 'slug', 'meaning', 'language_id')
+
+# Поля слова, от которых зависит выдача поиска и карточки слов в ней
+SEARCH_FIELDS = ('word', 'meaning', 'status', 'is_deleted', 'language_id', 'category_id', 'slug', 'difficulty')
+
+# Поля слова, от которых зависят счётчики словаря
+STATS_FIELDS = ('status', 'is_deleted', 'language_id', 'category_id')
+
+
+def _language_code(language_id):
+    language = registry.registry.language(language_id)
+    if language is not None:
+        return language.code
+    # Язык создан в ещё не завершённой транзакции - справочник его пока не знает
+    return Language.objects.filter(pk=language_id).values_list('code', flat=True).first()
+
+
+def _invalidate_search_results(*language_ids):
+    codes = {_language_code(language_id) for language_id in set(language_ids) if language_id}
+    transaction.on_commit(lambda: result_cache.bump_generation(*(codes - {None})))
+
+
+def _schedule_autocomplete(word_id, *language_ids):
+    codes = {_language_code(language_id) for language_id in set(language_ids) if language_id}
+    for code in codes - {None}:
+        transaction.on_commit(lambda code=code: autocomplete.schedule_rebuild(code, [word_id]))
+
+
+def _refresh_pages(slugs, home_language_ids=()):
+    """Обновляет микрокэш nginx для страниц слов и, если изменилась выдача, главной"""
+    paths = {f'/word/{slug}/' for slug in slugs if slug}
+    if home_language_ids:
+        codes = {_language_code(language_id) for language_id in set(home_language_ids) if language_id}
+        paths |= microcache.home_paths(*(codes - {None}))
+    microcache.refresh(paths)
+
+
+@receiver(post_save, sender=Word)
+def word_saved(sender, instance, created, raw=False, **kwargs):
+    """Пересборка словаря автодополнения при одобрении, переименовании и удалении слов"""
+    if raw:
+        return
+    if created or instance.has_changed(*AUTOCOMPLETE_FIELDS):
+        _schedule_autocomplete(instance.pk, instance.language_id, instance.loaded_value('language_id'))
+    if created or instance.has_changed(*SEARCH_FIELDS):
+        _invalidate_search_results(instance.language_id, instance.loaded_value('language_id'))
+    if created or instance.has_changed(*FUZZY_FIELDS):
+        old_language_id = instance.loaded_value('language_id')
+        transaction.on_commit(lambda: fuzzy.word_saved(
+            instance,
+            _language_code(instance.language_id),
+            _language_code(old_language_id) if old_language_id else None,
+        ))
+    documents.schedule_rebuild([instance.pk])
+    if not created and instance.has_changed(*DOCUMENT_LINK_FIELDS):
+        documents.schedule_rebuild(_words_translated_to(instance.pk))
+    search_changed = created or instance.has_changed(*SEARCH_FIELDS)
+    _refresh_pages(
+        {instance.slug, instance.loaded_value('slug')},
+        (instance.language_id, instance.loaded_value('language_id')) if search_changed else (),
+    )
+
+
+@receiver(post_delete, sender=Word)
+def word_deleted(sender, instance, **kwargs):
+    _schedule_autocomplete(instance.pk, instance.language_id)
+    _invalidate_search_results(instance.language_id)
+    transaction.on_commit(lambda: fuzzy.word_deleted(instance.pk, _language_code(instance.language_id)))
+    _refresh_pages({instance.slug}, (instance.language_id,))
+
+
+@receiver(post_save, sender=Translation)
+@receiver(post_delete, sender=Translation)
+def translation_changed(sender, instance, raw=False, **kwargs):
+    """Обратный поиск через переводы зависит от связей обоих слов"""
+    if raw:
+        return
+    language_ids = Word.objects.filter(
+        pk__in=[instance.from_word_id, instance.to_word_id]
+    ).values_list('language_id', flat=True)
+    _invalidate_search_results(*language_ids)
+
+
+# Счётчики словаря (stats): приращения в транзакции изменения
+
+def _stored_word_state(word_id):
+    return Word.objects.filter(pk=word_id).values_list(*STATS_FIELDS).first()
+
+
+def _word_contributions(state, translated, tag_ids=()):
+    status, is_deleted, language_id, category_id = state
+    return stats.word_contributions(status, is_deleted, language_id, category_id, translated, tag_ids)
+
+
+@receiver(pre_save, sender=Word)
+def word_stats_before_save(sender, instance, raw=False, **kwargs):
+    """Состояние слова до сохранения: из загруженных значений или из БД"""
+    if raw or instance._state.adding:
+        instance._stats_state = None
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if all(name in loaded for name in STATS_FIELDS):
+        instance._stats_state = tuple(loaded[name] for name in STATS_FIELDS)
+    else:
+        instance._stats_state = _stored_word_state(instance.pk)
+
+
+@receiver(post_save, sender=Word)
+def word_stats_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._stats_state
+    new = tuple(getattr(instance, name) for name in STATS_FIELDS)
+    if old is not None and update_fields is not None:
+        # Поля вне update_fields в БД не записаны
+        new = tuple(
+            value if Word._meta.get_field(name).name in update_fields else old_value
+            for name, value, old_value in zip(STATS_FIELDS, new, old)
+        )
+    if old is not None and old[2] != new[2]:
+        # Сменился язык слова - меняются языки переводов слов, переводящихся в него
+        stats.update_translation_languages(
+            Translation.objects.filter(to_word_id=instance.pk, status='approved').values_list('from_word_id', flat=True)
+        )
+    if old == new:
+        return
+    translated = False
+    tag_ids = ()
+    if not created:
+        translated = Word.objects.filter(pk=instance.pk, approved_translations__gt=0).exists()
+        tag_ids = list(instance.tags.values_list('pk', flat=True))
+    deltas = stats.difference(
+        _word_contributions(new, translated, tag_ids),
+        _word_contributions(old, translated, tag_ids) if old else {},
+    )
+    stats.apply(deltas)
+
+
+@receiver(pre_delete, sender=Word)
+def word_stats_deleted(sender, instance, **kwargs):
+    state = _stored_word_state(instance.pk)
+    if state is None:
+        return
+    tag_ids = list(instance.tags.values_list('pk', flat=True))
+    # Счётчики переведённых слов уменьшат удаления переводов (каскадом перед словом)
+    deltas = stats.difference({}, _word_contributions(state, False, tag_ids))
+    stats.apply(deltas)
+
+
+@receiver(m2m_changed, sender=Word.tags.through)
+def word_tags_stats_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Счётчики тегов считают только опубликованные слова"""
+    if action == 'pre_clear':
+        # После очистки связей уже не узнать, какие были
+        instance._stats_cleared = list(
+            (instance.words if reverse else instance.tags).values_list('pk', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    sign = 1 if action == 'post_add' else -1
+    pk_set = instance.__dict__.pop('_stats_cleared', []) if action == 'post_clear' else pk_set
+    if not pk_set:
+        return
+    if reverse:
+        # instance - тег, pk_set - слова
+        published = Word.objects.published().filter(pk__in=pk_set).count()
+        deltas = {stats.tag_key(instance.pk): sign * published}
+    elif Word.objects.published().filter(pk=instance.pk).exists():
+        deltas = {stats.tag_key(tag_id): sign for tag_id in pk_set}
+    else:
+        return
+    stats.apply(deltas)
+
+
+def _change_approved_translations(word_id, delta):
+    """Меняет Word.approved_translations; переход через 0 меняет счётчики переведённых слов"""
+    words = Word.objects.filter(pk=word_id)
+    if delta < 0:
+        words = words.filter(approved_translations__gte=-delta)
+    if not words.update(approved_translations=F('approved_translations') + delta):
+        return
+    count, status, is_deleted = Word.objects.filter(pk=word_id).values_list(
+        'approved_translations', 'status', 'is_deleted'
+    ).get()
+    if is_deleted or (count > 0) == (count - delta > 0):
+        return
+    sign = 1 if count > 0 else -1
+    deltas = {stats.WORDS_TRANSLATED_ACTIVE: sign}
+    if status == 'approved':
+        deltas[stats.WORDS_TRANSLATED_PUBLISHED] = sign
+    stats.apply(deltas)
+
+
+@receiver(pre_save, sender=Translation)
+def translation_stats_before_save(sender, instance, raw=False, **kwargs):
+    instance._stats_state = None
+    if not raw and not instance._state.adding:
+        instance._stats_state = Translation.objects.filter(pk=instance.pk).values_list(
+            'from_word_id', 'to_word_id', 'status'
+        ).first()
+
+
+@receiver(post_save, sender=Translation)
+def translation_stats_saved(sender, instance, created, raw=False, **kwargs):
+    """Число одобренных переводов и языки переводов исходного слова"""
+    if raw:
+        return
+    old_from_id, old_to_id, old_status = (None if created else instance._stats_state) or (None, None, None)
+    was_counted = (old_from_id, old_to_id) if old_status == 'approved' else None
+    is_counted = (instance.from_word_id, instance.to_word_id) if instance.status == 'approved' else None
+    if was_counted == is_counted:
+        return
+    if not (was_counted and is_counted and was_counted[0] == is_counted[0]):
+        if was_counted:
+            _change_approved_translations(was_counted[0], -1)
+        if is_counted:
+            _change_approved_translations(is_counted[0], 1)
+    stats.update_translation_languages(pair[0] for pair in (was_counted, is_counted) if pair)
+
+
+@receiver(post_delete, sender=Translation)
+def translation_stats_deleted(sender, instance, **kwargs):
+    if instance.status == 'approved':
+        _change_approved_translations(instance.from_word_id, -1)
+        stats.update_translation_languages([instance.from_word_id])
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=CategoryTranslation)
+@receiver(post_delete, sender=CategoryTranslation)
+@receiver(post_save, sender=TagTranslation)
+@receiver(post_delete, sender=TagTranslation)
+def reference_data_changed(sender, raw=False, **kwargs):
+    """Справочник языков, категорий и тегов перечитывается во всех процессах"""
+    if raw:
+        return
+    transaction.on_commit(registry.bump_version)
+
+
+def _words_translated_to(word_id):
+    return Translation.objects.filter(to_word_id=word_id).values_list('from_word_id', flat=True)
+
+
+@receiver(post_save, sender=Translation)
+@receiver(post_delete, sender=Translation)
+def translation_document_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        documents.schedule_rebuild([instance.from_word_id])
+
+
+@receiver(post_save, sender=Example)
+@receiver(post_delete, sender=Example)
+def example_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        documents.schedule_rebuild([instance.word_id])
+
+
+@receiver(m2m_changed, sender=Word.tags.through)
+def word_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Теги слова меняются с любой стороны связи: word.tags или tag.words
+
+    Теги - часть слова: updated_at (ключ кэша карточек) тоже меняется."""
+    if not reverse:
+        word_ids = [instance.pk] if action in ('post_add', 'post_remove', 'post_clear') else []
+    elif action in ('post_add', 'post_remove'):
+        word_ids = list(pk_set)
+    elif action == 'pre_clear':
+        word_ids = list(instance.words.values_list('pk', flat=True))
+    else:
+        word_ids = []
+    if word_ids:
+        documents.schedule_rebuild(word_ids)
+        Word.objects.filter(pk__in=word_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        documents.schedule_rebuild(instance.words.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    # После удаления связи со словами уже не найти
+    documents.schedule_rebuild(list(instance.words.values_list('pk', flat=True)))
+
+
+@receiver(post_save, sender=TagTranslation)
+@receiver(post_delete, sender=TagTranslation)
+def tag_translation_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        documents.schedule_rebuild(Word.objects.filter(tags__id=instance.tag_id).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        documents.schedule_rebuild(instance.words.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    documents.schedule_rebuild(list(instance.words.values_list('pk', flat=True)))
+
+
+@receiver(post_save, sender=CategoryTranslation)
+@receiver(post_delete, sender=CategoryTranslation)
+def category_translation_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        documents.schedule_rebuild(Word.objects.filter(category_id=instance.category_id).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Language)
+def language_saved(sender, instance, created, raw=False, **kwargs):
+    """Название языка есть в документах его слов и слов, переводящихся на него;
+    новый язык добавляет названия категорий и тегов во все документы"""
+    if raw:
+        return
+    if created:
+        documents.schedule_rebuild(Word.objects.values_list('pk', flat=True))
+    else:
+        documents.schedule_rebuild(Word.objects.filter(
+            Q(language=instance) | Q(from_translations__to_word__language=instance)
+        ).values_list('pk', flat=True).distinct())
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """Восстанавливает триггеры полнотекстового индекса после пересоздания таблиц"""
+    if sender.name == 'dictionary':
+        search.ensure_index(using=using)
+
+
+@receiver(connection_created)
+def track_table_writes(sender, connection, **kwargs):
+    """Запись в таблицы сбрасывает кэш запросов к ним (queryset.cached())"""
+    query_cache.install(connection)
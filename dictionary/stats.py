@@ -0,0 +1,242 @@
+"""Счётчики словаря (DictionaryStat), поддерживаемые изменениями, а не подсчётом
+
+Каждый счётчик - строка с ключом: 'words:published', 'language:3:published'
+и т.п. Сигналы слов и переводов применяют к счётчикам приращения F('value') + n
+в той же транзакции, что и само изменение, поэтому счётчики откатываются
+вместе с ним. Отсутствующий счётчик один раз считается по БД и сохраняется.
+Изменения в обход сигналов (queryset.update, правки в БД) исправляет команда
+reconcile_stats.
+
+Число одобренных переводов слова и языки, на которые оно переведено, хранятся
+в самом слове (Word.approved_translations, Word.translation_languages).
+"""
+import copy
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+WORDS_ACTIVE = 'words:active'
+WORDS_PUBLISHED = 'words:published'
+WORDS_TRANSLATED_ACTIVE = 'words:translated:active'
+WORDS_TRANSLATED_PUBLISHED = 'words:translated:published'
+
+
+def language_key(language_id):
+    return f'language:{language_id}:published'
+
+
+def category_key(category_id):
+    return f'category:{category_id}:published'
+
+
+def tag_key(tag_id):
+    return f'tag:{tag_id}:published'
+
+
+# Вычисление счётчиков по БД
+
+def _words():
+    from .models import Word
+    return Word.objects
+
+
+def compute(key):
+    """Значение счётчика, посчитанное по БД"""
+    words = _words()
+    if key == WORDS_ACTIVE:
+        return words.filter(is_deleted=False).count()
+    if key == WORDS_PUBLISHED:
+        return words.published().count()
+    if key == WORDS_TRANSLATED_ACTIVE:
+        return words.filter(is_deleted=False, approved_translations__gt=0).count()
+    if key == WORDS_TRANSLATED_PUBLISHED:
+        return words.published().filter(approved_translations__gt=0).count()
+    kind, object_id, _ = key.split(':')
+    field = {'language': 'language_id', 'category': 'category_id', 'tag': 'tags__id'}[kind]
+    return words.published().filter(**{field: int(object_id)}).count()
+
+
+def compute_all():
+    """Все счётчики по БД: шесть запросов независимо от размера словаря"""
+    words = _words()
+    published = words.published()
+    values = {
+        WORDS_ACTIVE: words.filter(is_deleted=False).count(),
+        WORDS_PUBLISHED: published.count(),
+        WORDS_TRANSLATED_ACTIVE: words.filter(is_deleted=False, approved_translations__gt=0).count(),
+        WORDS_TRANSLATED_PUBLISHED: published.filter(approved_translations__gt=0).count(),
+    }
+    for field, make_key in (('language_id', language_key), ('category_id', category_key), ('tags__id', tag_key)):
+        for object_id, count in published.filter(**{f'{field}__isnull': False}).values_list(field).annotate(
+            count=Count('id')
+        ).order_by():
+            values[make_key(object_id)] = count
+    return values
+
+
+# Чтение
+
+def values(*keys):
+    """Значения счётчиков одним запросом; отсутствующие считаются и сохраняются"""
+    from .models import DictionaryStat
+
+    found = dict(DictionaryStat.objects.filter(key__in=keys).values_list('key', 'value'))
+    for key in keys:
+        if key not in found:
+            found[key] = _initialize(key)
+    return found
+
+
+def value(key):
+    return values(key)[key]
+
+
+def load_word_counts(objects):
+    """Копии языков, категорий или тегов с word_count, загруженным одним запросом
+
+    Без загрузки каждое обращение к word_count читает свой счётчик отдельным
+    запросом. Копии нужны, чтобы общие объекты справочника (registry) не
+    хранили загруженное значение."""
+    objects = [copy.copy(obj) for obj in objects]
+    if not objects:
+        return objects
+    make_key = {'language': language_key, 'category': category_key, 'tag': tag_key}[objects[0]._meta.model_name]
+    counts = values(*{make_key(obj.pk) for obj in objects})
+    for obj in objects:
+        obj._word_count = counts[make_key(obj.pk)]
+    return objects
+
+
+def _initialize(key):
+    from .models import DictionaryStat
+
+    current = compute(key)
+    try:
+        with transaction.atomic():
+            DictionaryStat.objects.create(key=key, value=current)
+    except IntegrityError:
+        # Счётчик создан параллельно - его значение уже учитывает изменения
+        return DictionaryStat.objects.get(key=key).value
+    return current
+
+
+# Приращения
+
+def apply(deltas):
+    """Применяет приращения {ключ: n} к счётчикам"""
+    from .models import DictionaryStat
+
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        if not DictionaryStat.objects.filter(key=key).update(value=F('value') + delta):
+            # Счётчика ещё нет: подсчёт по БД уже видит текущее изменение
+            _initialize(key)
+
+
+def word_contributions(status, is_deleted, language_id, category_id, translated, tag_ids=()):
+    """Счётчики, в которые входит слово в этом состоянии"""
+    keys = Counter()
+    if is_deleted:
+        return keys
+    keys[WORDS_ACTIVE] += 1
+    if translated:
+        keys[WORDS_TRANSLATED_ACTIVE] += 1
+    if status == 'approved':
+        keys[WORDS_PUBLISHED] += 1
+        keys[language_key(language_id)] += 1
+        if category_id:
+            keys[category_key(category_id)] += 1
+        for tag_id in tag_ids:
+            keys[tag_key(tag_id)] += 1
+        if translated:
+            keys[WORDS_TRANSLATED_PUBLISHED] += 1
+    return keys
+
+
+def difference(new, old):
+    """Приращения при переходе слова из состояния old в new"""
+    deltas = Counter(new)
+    deltas.subtract(old)
+    return deltas
+
+
+# Языки переводов слова
+
+def language_set(codes):
+    """Значение Word.translation_languages: ',en,kk,' ('' - переводов нет)"""
+    codes = sorted(set(codes))
+    return f",{','.join(codes)}," if codes else ''
+
+
+def translation_languages(word_ids=None):
+    """{id слова: значение translation_languages} по одобренным переводам"""
+    from .models import Translation
+
+    translations = Translation.objects.filter(status='approved')
+    if word_ids is not None:
+        translations = translations.filter(from_word_id__in=word_ids)
+    codes = defaultdict(set)
+    for word_id, code in translations.values_list('from_word_id', 'to_word__language__code').order_by():
+        codes[word_id].add(code)
+    return {word_id: language_set(word_codes) for word_id, word_codes in codes.items()}
+
+
+def update_translation_languages(word_ids):
+    """Пересчитывает Word.translation_languages слов"""
+    from .models import Word
+
+    word_ids = set(word_ids)
+    if not word_ids:
+        return
+    current = translation_languages(word_ids)
+    for word_id in word_ids:
+        Word.objects.filter(pk=word_id).update(translation_languages=current.get(word_id, ''))
+
+
+# Сверка
+
+def reconcile(dry_run=False):
+    """Пересчитывает Word.approved_translations, Word.translation_languages и все счётчики по БД
+
+    Возвращает (число исправленных полей слов, {ключ: (было, стало)})."""
+    from .models import DictionaryStat, Translation, Word
+
+    approved = Translation.objects.filter(from_word=OuterRef('pk'), status='approved').order_by().values(
+        'from_word'
+    ).annotate(count=Count('id')).values('count')
+    stale = Word.objects.annotate(actual=Coalesce(Subquery(approved), Value(0))).exclude(
+        approved_translations=F('actual')
+    )
+    fixed_words = 0
+    with transaction.atomic():
+        if dry_run:
+            fixed_words = stale.count()
+        else:
+            for word_id, actual in stale.values_list('pk', 'actual').iterator():
+                Word.objects.filter(pk=word_id).update(approved_translations=actual)
+                fixed_words += 1
+        languages = translation_languages()
+        for word_id, stored in Word.objects.values_list('pk', 'translation_languages').iterator():
+            if stored != languages.get(word_id, ''):
+                if not dry_run:
+                    Word.objects.filter(pk=word_id).update(translation_languages=languages.get(word_id, ''))
+                fixed_words += 1
+        expected = compute_all()
+        current = dict(DictionaryStat.objects.values_list('key', 'value'))
+        # Счётчики удалённых языков, категорий и тегов (None) удаляются
+        changes = {
+            key: (current.get(key), expected.get(key))
+            for key in set(expected) | set(current)
+            if current.get(key) != expected.get(key)
+        }
+        if not dry_run:
+            DictionaryStat.objects.filter(
+                key__in=[key for key, (_, new) in changes.items() if new is None]
+            ).delete()
+            for key, (_, new) in changes.items():
+                if new is not None:
+                    DictionaryStat.objects.update_or_create(key=key, defaults={'value': new})
+    return fixed_words, changes
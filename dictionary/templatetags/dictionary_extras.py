@@ -1,9 +1,38 @@
 from django import template
+from django.conf import settings
+from django.db.models import prefetch_related_objects
 from django.utils.html import strip_tags
 import re
+import warnings
+
+from django.urls import reverse
+
+from ..interface_catalog import DEFAULT_LANGUAGE, catalogs
+from ..registry import registry
 
 register = template.Library()
 
+def _interface_language(context):
+    """Язык интерфейса: из контекста шаблона, иначе из сессии"""
+    language_code = context.get('user_language')
+    if not language_code and 'request' in context:
+        language_code = context['request'].session.get('language')
+    return language_code or DEFAULT_LANGUAGE
+
+@register.simple_tag(takes_context=True)
+def iface(context, key, default=None):
+    """Строка интерфейса по ключу из опубликованного каталога: {% iface 'menu.home' %}"""
+    return catalogs.get(key, _interface_language(context), default)
+
+@register.simple_tag(takes_context=True)
+def iface_catalog_url(context):
+    """Адрес JS-каталога строк интерфейса текущего языка (с хэшем содержимого)"""
+    language_code = _interface_language(context)
+    return reverse('dictionary:interface_catalog_js', kwargs={
+        'language_code': language_code,
+        'version': catalogs.version(language_code) or '0',
+    })
+
 @register.filter
 def get_item(dictionary, key):
     """Получить значение из словаря по ключу"""
@@ -11,14 +40,47 @@ def get_item(dictionary, key):
         return None
     return dictionary.get(key)
 
+class UnprefetchedTranslationsWarning(RuntimeWarning):
+    """Фильтр перевода обратился к БД: queryset собран без prefetch_related('translations')"""
+
+
+def _translations(obj):
+    """Переводы объекта: из prefetch_related('translations'), иначе одним запросом на объект
+
+    Без prefetch переводы загружаются в кэш prefetch объекта, так что остальные
+    фильтры для этого объекта запросов уже не делают. В режиме DEBUG такой
+    запрос сопровождается предупреждением UnprefetchedTranslationsWarning."""
+    if not hasattr(obj, 'translations'):
+        return None
+    if 'translations' not in getattr(obj, '_prefetched_objects_cache', {}):
+        if settings.DEBUG:
+            warnings.warn(
+                f'{type(obj).__name__}.translations не загружены заранее: '
+                f'добавьте prefetch_related("translations") в queryset',
+                UnprefetchedTranslationsWarning,
+                stacklevel=3,
+            )
+        prefetch_related_objects([obj], 'translations')
+    return obj.translations.all()
+
+
+def _language_code(translation):
+    # Язык берётся из справочника процесса, если перевод загружен без select_related
+    if 'language' in translation._state.fields_cache:
+        return translation.language.code
+    language = registry.language(translation.language_id)
+    return language.code if language else None
+
+
 @register.filter
 def get_translation(obj, language_code):
     """Получить перевод объекта для указанного языка"""
-    if hasattr(obj, 'translations'):
-        try:
-            return obj.translations.get(language__code=language_code)
-        except:
-            return None
+    translations = _translations(obj)
+    if translations is None:
+        return None
+    for translation in translations:
+        if _language_code(translation) == language_code:
+            return translation
     return None
 
 @register.filter
@@ -45,20 +107,23 @@ def has_translation(obj, language_code):
 @register.filter
 def get_missing_languages(obj, all_languages):
     """Получить список языков, для которых нет переводов"""
-    if not hasattr(obj, 'translations'):
+    translations = _translations(obj)
+    if translations is None:
         return all_languages
     
-    existing_languages = set(obj.translations.values_list('language__code', flat=True))
+    existing_languages = {_language_code(translation) for translation in translations}
     return [lang for lang in all_languages if lang.code not in existing_languages]
 
 @register.filter
 def get_translation_percentage(obj, all_languages):
     """Получить процент переведенных языков"""
-    if not hasattr(obj, 'translations'):
+    translations = _translations(obj)
+    if translations is None:
         return 0
     
-    total_languages = all_languages.count()
-    translated_languages = obj.translations.count()
+    # len() вычисляет queryset один раз и кэширует результат (count() - запрос на каждый вызов)
+    total_languages = len(all_languages)
+    translated_languages = len(translations)
     
     if total_languages == 0:
         return 0
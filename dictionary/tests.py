@@ -1,3 +1,1023 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+import time as clock
+from datetime import date, datetime, time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, CategoryTranslation, InterfaceTranslation, Language, SearchHistory, SearchQueryDaily, Tag, Translation, Word, WordDocument
+from .interface_catalog import catalogs, publish
+from .morphology import stem_text
+from .normalization import fold_headword, html_to_text, make_excerpt, transliteration_key
+from .pagination import KeysetPaginator
+from .registry import Registry, registry
+from .search_log import SearchRecorder, rollup_day
+from .templatetags import dictionary_extras
+from . import autocomplete, documents, fuzzy, microcache, query_cache, result_cache, search, stats, tiered_cache
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'dictionary.tiered_cache.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'LOCAL_TIMEOUT': 2, 'LOCAL_MAX_ENTRIES': 1000},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dictionary-tests'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DictionaryTestCase(TestCase):
+    """Общая основа тестов: кэш в памяти, очищается перед каждым тестом"""
+
+    def setUp(self):
+        cache.clear()
+        registry.invalidate()
+        catalogs.invalidate()
+        # Отложенные до коммита пересборки остаются от транзакций прошлых тестов,
+        # обработчики on_commit которых не выполнялись
+        documents._scheduled.__dict__.clear()
+        query_cache._scheduled.__dict__.clear()
+        # Фоновая пересборка словарей автодополнения читала бы тестовую БД из другого потока
+        patcher = mock.patch.object(autocomplete, 'schedule_rebuild')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ru = Language.objects.create(code='ru', name='Русский')
+        cls.kk = Language.objects.create(code='kk', name='Қазақша')
+        cls.en = Language.objects.create(code='en', name='English')
+        cls.tr = Language.objects.create(code='tr', name='Türkçe')
+
+    def make_word(self, word, language, meaning='', status='approved', **fields):
+        return Word.objects.create(
+            word=word, language=language, meaning=meaning or f'<p>Значение слова {word}</p>',
+            status=status, **fields,
+        )
+
+
+class FullTextSearchTests(DictionaryTestCase):
+    """Полнотекстовый индекс FTS5"""
+
+    def found(self, query):
+        return set(search.search_words(Word.objects.all(), query).values_list('word', flat=True))
+
+    def test_finds_by_word_prefix_and_meaning(self):
+        self.make_word('договор', self.ru, '<p>Соглашение <b>сторон</b></p>')
+        self.make_word('суд', self.ru, '<p>Орган правосудия</p>')
+        self.assertEqual(self.found('догов'), {'договор'})
+        self.assertEqual(self.found('правосудия'), {'суд'})
+        self.assertEqual(self.found('сторон'), {'договор'})
+
+    def test_index_follows_updates_and_deletes(self):
+        word = self.make_word('закон', self.ru, '<p>Нормативный акт</p>')
+        word.meaning = '<p>Правило поведения</p>'
+        word.save()
+        self.assertEqual(self.found('нормативный'), set())
+        self.assertEqual(self.found('поведения'), {'закон'})
+        word.delete()
+        self.assertEqual(self.found('закон'), set())
+
+    def test_ensure_index_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_ai')
+        self.assertTrue(search.ensure_index())
+        self.assertFalse(search.ensure_index())
+        self.make_word('истец', self.ru)
+        self.assertEqual(self.found('истец'), {'истец'})
+
+
+class AutocompleteLexiconTests(DictionaryTestCase):
+    """Словари автодополнения в memory-mapped файлах"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(AUTOCOMPLETE_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        autocomplete._lexicons.clear()
+        self.addCleanup(autocomplete._lexicons.clear)
+
+    def test_suggest_without_lexicon_falls_back(self):
+        self.assertIsNone(autocomplete.suggest('до', 'ru'))
+
+    def test_prefix_lookup_skips_unpublished_words(self):
+        self.make_word('договор', self.ru)
+        self.make_word('доверенность', self.ru)
+        self.make_word('дознание', self.ru, status='pending')
+        self.make_word('суд', self.ru)
+        self.assertEqual(autocomplete.build_lexicon('ru'), 4)
+        self.assertEqual([item['word'] for item in autocomplete.suggest('До', 'ru')], ['доверенность', 'договор'])
+        self.assertEqual(
+            [item['word'] for item in autocomplete.suggest('до', 'ru', published_only=False)],
+            ['доверенность', 'договор', 'дознание'],
+        )
+
+    def test_rebuilt_file_is_reopened(self):
+        self.make_word('договор', self.ru)
+        autocomplete.build_lexicon('ru')
+        self.assertEqual(len(autocomplete.suggest('дог', 'ru')), 1)
+        self.make_word('догма', self.ru)
+        autocomplete.build_lexicon('ru')
+        self.assertEqual([item['word'] for item in autocomplete.suggest('дог', 'ru')], ['догма', 'договор'])
+
+    def test_changed_words_go_to_delta(self):
+        contract = self.make_word('договор', self.ru)
+        dogma = self.make_word('догма', self.ru)
+        autocomplete.build_lexicon('ru')
+        added = self.make_word('догадка', self.ru)
+        contract.word = 'контракт'
+        contract.save()
+        dogma_id = dogma.pk
+        dogma.delete()
+        self.assertEqual(autocomplete.update_lexicon('ru', [contract.pk, dogma_id, added.pk]), 3)
+        self.assertEqual([item['word'] for item in autocomplete.suggest('дог', 'ru')], ['догадка'])
+        self.assertEqual([item['word'] for item in autocomplete.suggest('кон', 'ru')], ['контракт'])
+
+        autocomplete.build_lexicon('ru')
+        self.assertFalse(os.path.exists(autocomplete.delta_path('ru')))
+        self.assertEqual([item['word'] for item in autocomplete.suggest('дог', 'ru')], ['догадка'])
+
+    def test_large_delta_rebuilds_lexicon(self):
+        words = [self.make_word(f'слово{number}', self.ru) for number in range(3)]
+        with mock.patch.object(autocomplete, 'DELTA_LIMIT', 2):
+            self.assertEqual(autocomplete.update_lexicon('ru', [words[0].pk]), 0)
+            self.assertEqual(autocomplete.update_lexicon('ru', [words[0].pk, words[1].pk]), 2)
+            self.assertEqual(autocomplete.update_lexicon('ru', [words[2].pk]), 0)
+        self.assertFalse(os.path.exists(autocomplete.delta_path('ru')))
+        self.assertEqual(len(autocomplete.suggest('слово', 'ru')), 3)
+
+
+class HeadwordKeyTests(DictionaryTestCase):
+    """Нормализованный заголовок и уникальность по нему"""
+
+    def test_fold_headword(self):
+        self.assertEqual(fold_headword('  Ёлка  ', 'ru'), 'елка')
+        self.assertEqual(fold_headword('Йод', 'ru'), 'йод')
+        self.assertEqual(fold_headword('Café', 'en'), 'cafe')
+        self.assertEqual(fold_headword('IŞIK', 'tr'), 'ışık')
+        self.assertEqual(fold_headword('İstanbul', 'tr'), 'istanbul')
+        self.assertNotEqual(fold_headword('çam', 'tr'), fold_headword('cam', 'tr'))
+
+    def test_kazakh_latin_letters_stay_distinct(self):
+        for accented, plain in (('säbiz', 'sabiz'), ('qoñyr', 'qonyr'), ('şaq', 'saq'), ('ūl', 'ul'), ('ğasyr', 'gasyr')):
+            self.assertNotEqual(fold_headword(accented, 'kk'), fold_headword(plain, 'kk'))
+        self.make_word('säbiz', self.kk)
+        self.make_word('sabiz', self.kk)
+
+    def test_case_duplicates_are_rejected(self):
+        self.make_word('Договор', self.ru)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.make_word('договор ', self.ru)
+        # На другом языке тот же заголовок допустим
+        self.make_word('договор', self.kk)
+
+    def test_lookup_and_validation_use_the_key(self):
+        word = self.make_word('Ёлка', self.ru)
+        self.assertEqual(Word.objects.by_headword('елка', self.ru).get(), word)
+        self.assertEqual(Word.objects.get_or_create_headword('ЕЛКА', self.ru), (word, False))
+        with self.assertRaises(ValidationError):
+            Word(word='елка', language=self.ru, meaning='x').clean()
+
+
+class FuzzyIndexTests(DictionaryTestCase):
+    """BK-дерево похожих заголовков"""
+
+    def setUp(self):
+        super().setUp()
+        fuzzy._indexes.clear()
+        self.addCleanup(fuzzy._indexes.clear)
+
+    def similar(self, text):
+        return [item['word'] for item in fuzzy.similar_words('ru', [text])[text]]
+
+    def test_levenshtein(self):
+        self.assertEqual(fuzzy.levenshtein('договор', 'догавор'), 1)
+        self.assertEqual(fuzzy.levenshtein('суд', 'суды'), 1)
+        self.assertEqual(fuzzy.levenshtein('kitten', 'sitting'), 3)
+        self.assertEqual(fuzzy.levenshtein('a', 'abcdef', limit=2), 3)
+
+    def test_bk_tree_search(self):
+        tree = fuzzy.BKTree()
+        for key in ('книга', 'книги', 'кинга', 'река', 'рука'):
+            tree.add(key)
+        self.assertEqual(sorted(tree.search('река', 1)), [(0, 'река'), (1, 'рука')])
+        self.assertEqual(sorted(tree.search('книга', 1)), [(0, 'книга'), (1, 'книги')])
+
+    def test_similar_words_excludes_exact_match(self):
+        self.make_word('договор', self.ru)
+        self.make_word('договоры', self.ru, status='pending')
+        self.make_word('приговор', self.ru)
+        self.assertEqual(self.similar('догавор'), ['договор', 'договоры'])
+        self.assertEqual(self.similar('договор'), ['договоры'])
+        self.assertEqual(self.similar('кодекс'), [])
+
+    def test_index_follows_saves_in_this_process(self):
+        self.make_word('договор', self.ru)
+        self.assertEqual(self.similar('догавор'), ['договор'])
+        with self.captureOnCommitCallbacks(execute=True):
+            word = self.make_word('договоры', self.ru)
+        self.assertEqual(self.similar('догавор'), ['договор', 'договоры'])
+        with self.captureOnCommitCallbacks(execute=True):
+            word.is_deleted = True
+            word.save()
+        self.assertEqual(self.similar('догавор'), ['договор'])
+
+
+class MeaningTextTests(DictionaryTestCase):
+    """Текст значения без разметки"""
+
+    def test_html_to_text(self):
+        self.assertEqual(
+            html_to_text('<p>Один&nbsp;<b>два</b></p><p>три<br>четыре</p><style>p {}</style><script>x()</script>'),
+            'Один два три четыре',
+        )
+        self.assertEqual(html_to_text(''), '')
+
+    def test_save_keeps_shadow_in_sync(self):
+        word = self.make_word('иск', self.ru, '<p><strong>Требование</strong> истца</p>')
+        self.assertEqual(word.meaning_text, 'Требование истца')
+        word.meaning = '<p>Заявление в суд</p>'
+        word.save(update_fields=['meaning'])
+        word.refresh_from_db()
+        self.assertEqual(word.meaning_text, 'Заявление в суд')
+        self.assertFalse(search.search_words(Word.objects.all(), 'strong').exists())
+
+
+class KeysetPaginationTests(DictionaryTestCase):
+    """Keyset-пагинация с подписанными курсорами"""
+
+    def setUp(self):
+        super().setUp()
+        for index in range(12):
+            self.make_word(f'слово{index:02d}', self.ru)
+        self.words = Word.objects.all()
+
+    def words_of(self, page):
+        return [word.word for word in page]
+
+    def test_cursors_walk_forward_and_back(self):
+        paginator = KeysetPaginator(self.words, per_page=5)
+        first = paginator.page()
+        second = paginator.page(cursor=first.next_cursor)
+        third = paginator.page(cursor=second.next_cursor)
+        self.assertEqual(self.words_of(second), [f'слово{index:02d}' for index in range(5, 10)])
+        self.assertEqual(self.words_of(third), ['слово10', 'слово11'])
+        self.assertEqual((third.number, third.has_next()), (3, False))
+        back = paginator.page(cursor=third.previous_cursor)
+        self.assertEqual(self.words_of(back), self.words_of(second))
+        self.assertEqual(self.words_of(paginator.page(cursor=first.last_cursor)), ['слово10', 'слово11'])
+
+    def test_tampered_cursor_is_rejected(self):
+        paginator = KeysetPaginator(self.words, per_page=5)
+        cursor = paginator.page().next_cursor
+        self.assertEqual(paginator.decode_cursor(cursor), ('n', ['слово04', self.words.get(word='слово04').pk], 2))
+        self.assertIsNone(paginator.decode_cursor(cursor[:-1] + ('A' if cursor[-1] != 'A' else 'B')))
+        self.assertIsNone(paginator.decode_cursor('garbage'))
+        # Курсор другой сортировки не принимается
+        self.assertIsNone(KeysetPaginator(self.words, per_page=5, ordering=('-word', '-id')).decode_cursor(cursor))
+        self.assertEqual(paginator.page(cursor='garbage').number, 1)
+
+    def test_capped_count_and_page_window(self):
+        paginator = KeysetPaginator(self.words, per_page=5, count_limit=10)
+        self.assertEqual(paginator.count, 10)
+        self.assertTrue(paginator.count_is_approximate)
+        self.assertIsNone(paginator.num_pages)
+        paginator = KeysetPaginator(self.words, per_page=1)
+        self.assertEqual(paginator.num_pages, 12)
+        self.assertEqual(list(paginator.page_window(6)), [1, None, 4, 5, 6, 7, 8, None, 12])
+
+
+class ListProjectionTests(DictionaryTestCase):
+    """Выдержка значения и узкая выборка для списков"""
+
+    def test_excerpt(self):
+        text = ' '.join(f'w{index}' for index in range(30))
+        self.assertEqual(make_excerpt(text), ' '.join(f'w{index}' for index in range(15)) + '…')
+        word = self.make_word('кодекс', self.ru, '<p>Систематизированный <i>акт</i></p>')
+        self.assertEqual(word.excerpt, 'Систематизированный акт')
+
+    def test_for_list_loads_only_card_columns(self):
+        self.make_word('кодекс', self.ru)
+        self.make_word('закон', self.ru)
+        with self.assertNumQueries(1):
+            rows = [(word.word, word.excerpt, word.language.code) for word in Word.objects.all().for_list()]
+        self.assertEqual([row[2] for row in rows], ['ru', 'ru'])
+        self.assertIn('meaning', Word.objects.all().for_list().first().get_deferred_fields())
+
+
+class RelevanceRankingTests(DictionaryTestCase):
+    """Уровни совпадения заголовка и BM25"""
+
+    def ranked(self, query):
+        words = search.search_words(Word.objects.all(), query)
+        return [
+            (word.word, word.search_tier)
+            for word in search.rank_words(words, query).order_by(*search.RELEVANCE_ORDERING)
+        ]
+
+    def test_headword_tiers_come_before_meaning_matches(self):
+        self.make_word('истец', self.ru, '<p>Сторона, подавшая иск в суд</p>')
+        self.make_word('верховный суд', self.ru)
+        self.make_word('судебный', self.ru)
+        self.make_word('суды', self.ru)
+        self.make_word('суд', self.ru)
+        self.assertEqual(self.ranked('суд'), [
+            ('суд', search.TIER_EXACT),
+            ('суды', search.TIER_STEM),
+            ('судебный', search.TIER_PREFIX),
+            ('верховный суд', search.TIER_TOKEN),
+            ('истец', search.TIER_OTHER),
+        ])
+
+    def test_bm25_orders_within_a_tier(self):
+        self.make_word('акт', self.ru, '<p>Документ</p>')
+        self.make_word('норма', self.ru, '<p>Правило, правило поведения, общее правило</p>')
+        self.make_word('обычай', self.ru, '<p>Сложившееся правило</p>')
+        self.assertEqual([word for word, tier in self.ranked('правило')], ['норма', 'обычай'])
+
+    def test_highlight_escapes_text(self):
+        word = self.make_word('<суд>', self.ru)
+        [highlighted] = search.highlight_words([word], 'суд')
+        self.assertEqual(highlighted.highlighted_word, '&lt;<mark>суд</mark>&gt;')
+
+
+class SearchResultCacheTests(DictionaryTestCase):
+    """Кэш выдачи по нормализованному запросу и роли"""
+
+    def test_key_normalizes_query_and_separates_roles(self):
+        key = result_cache.make_key('  Суд  ', 'ru', None, 'relevance', '', 1, staff=False)
+        self.assertEqual(key, result_cache.make_key('суд', 'ru', None, 'relevance', '', 1, staff=False))
+        self.assertNotEqual(key, result_cache.make_key('суд', 'ru', None, 'relevance', '', 1, staff=True))
+
+    def test_generation_bump_invalidates_language_and_all_languages(self):
+        results = result_cache.ResultCache(max_entries=10, ttl=60)
+        results.set('ru-key', [1], 'ru')
+        results.set('all-key', [2], None)
+        results.set('en-key', [3], 'en')
+        result_cache.bump_generation('ru')
+        self.assertIsNone(results.get('ru-key', 'ru'))
+        self.assertIsNone(results.get('all-key', None))
+        self.assertEqual(results.get('en-key', 'en'), [3])
+
+    def test_word_changes_bump_generation_after_commit(self):
+        before = result_cache.generation('ru')
+        with self.captureOnCommitCallbacks(execute=True):
+            word = self.make_word('суд', self.ru)
+        self.assertNotEqual(result_cache.generation('ru'), before)
+        before = result_cache.generation('ru')
+        with self.captureOnCommitCallbacks(execute=True):
+            word.pronunciation = 'sut'
+            word.save()
+        # Поле не влияет на выдачу
+        self.assertEqual(result_cache.generation('ru'), before)
+
+    def test_lru_eviction(self):
+        results = result_cache.ResultCache(max_entries=2, ttl=60)
+        for key in ('a', 'b', 'c'):
+            results.set(key, [key])
+        self.assertIsNone(results.get('a'))
+        self.assertEqual(results.stats()['evictions'], 1)
+
+    def test_workers_share_computed_results(self):
+        results = result_cache.ResultCache(max_entries=2, ttl=60)
+        calls = []
+        compute = lambda: calls.append(1) or [42]
+        self.assertEqual(results.get_or_compute('q', compute, 'ru'), [42])
+        # Другой воркер получает состояние из общего кэша
+        self.assertEqual(result_cache.ResultCache().get_or_compute('q', compute, 'ru'), [42])
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(SEARCH_HISTORY={'BATCH_SIZE': 2, 'FLUSH_INTERVAL': 3600, 'MAX_BUFFER': 3})
+class SearchRecorderTests(DictionaryTestCase):
+    """Буфер истории поиска и запись пачками"""
+
+    def setUp(self):
+        super().setUp()
+        self.recorder = SearchRecorder()
+        # Фоновый поток не запускается: сброс вызывается вручную
+        patcher = mock.patch.object(self.recorder, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_record_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            self.recorder.record('суд', language='ru', results_count=3)
+        self.assertEqual(self.recorder.stats()['buffered'], 1)
+        self.assertFalse(SearchHistory.objects.exists())
+
+    def test_flush_writes_buffer_in_batches(self):
+        for query in ('суд', 'закон', 'право'):
+            self.recorder.record(query, language='ru', results_count=1)
+        with self.assertNumQueries(2):
+            self.recorder.flush()
+        self.assertEqual(sorted(SearchHistory.objects.values_list('word', flat=True)), ['закон', 'право', 'суд'])
+        self.assertEqual(self.recorder.stats(), {'buffered': 0, 'recorded': 3, 'written': 3, 'dropped': 0})
+
+    def test_full_buffer_drops_oldest(self):
+        for query in ('a', 'b', 'c', 'd'):
+            self.recorder.record(query)
+        self.recorder.flush()
+        self.assertEqual(sorted(SearchHistory.objects.values_list('word', flat=True)), ['b', 'c', 'd'])
+        self.assertEqual(self.recorder.dropped, 1)
+
+    def test_database_error_drops_batch(self):
+        self.recorder.record('суд')
+        with mock.patch.object(SearchHistory.objects, 'bulk_create', side_effect=DatabaseError('locked')), \
+                self.assertLogs('dictionary.search_log', 'WARNING'):
+            self.recorder.flush()
+        self.assertEqual(self.recorder.stats()['buffered'], 0)
+        self.assertEqual(self.recorder.dropped, 1)
+
+
+class SearchRollupTests(DictionaryTestCase):
+    """Дневная сводка поиска"""
+
+    def search(self, word, at, results_count=1, language='ru'):
+        SearchHistory.objects.create(word=word, language=language, results_count=results_count, searched_at=at)
+
+    def test_rollup_merges_variants_and_marks_misses(self):
+        day = date(2026, 10, 16)
+        noon = timezone.make_aware(datetime.combine(day, time(12)))
+        self.search('Суд', noon)
+        self.search('  суд ', noon, results_count=0)
+        self.search('зкаон', noon, results_count=0)
+        self.assertEqual(rollup_day(day), 2)
+        summary = {row.query: row for row in SearchQueryDaily.objects.filter(day=day)}
+        self.assertEqual((summary['суд'].searches, summary['суд'].zero_result_searches), (2, 1))
+        self.assertFalse(summary['суд'].is_miss)
+        self.assertTrue(summary['зкаон'].is_miss)
+
+    def test_rollup_uses_half_open_day_range(self):
+        day = date(2026, 10, 16)
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        self.search('первый', start)
+        self.search('последний', timezone.make_aware(datetime.combine(day, time.max)))
+        self.search('завтра', timezone.make_aware(datetime.combine(date(2026, 10, 17), time.min)))
+        rollup_day(day)
+        self.assertEqual(set(SearchQueryDaily.objects.filter(day=day).values_list('query', flat=True)), {'первый', 'последний'})
+
+    def test_rollup_replaces_previous_summary(self):
+        day = date(2026, 10, 16)
+        self.search('суд', timezone.make_aware(datetime.combine(day, time(9))))
+        rollup_day(day)
+        rollup_day(day)
+        self.assertEqual(SearchQueryDaily.objects.get(day=day, query='суд').searches, 1)
+
+
+class MorphologySearchTests(DictionaryTestCase):
+    """Поиск словоформ по основе"""
+
+    def found(self, query, language_code=None):
+        words = search.search_words(Word.objects.all(), query, language_code)
+        return sorted(words.values_list('word', flat=True))
+
+    def test_stem_text_per_language(self):
+        self.assertEqual(stem_text('договорами', 'ru'), 'договор')
+        self.assertEqual(stem_text('заңның', 'kk'), 'заң')
+        self.assertEqual(stem_text('kitapları', 'tr'), 'kitap')
+        self.assertEqual(stem_text('books', 'en'), 'book')
+
+    def test_stem_key_computed_on_save(self):
+        word = self.make_word('договора', self.ru)
+        self.assertEqual(word.stem_key, 'договор')
+
+    def test_inflected_query_finds_headword(self):
+        self.make_word('договор', self.ru)
+        self.make_word('заң', self.kk)
+        self.assertEqual(self.found('договорами', 'ru'), ['договор'])
+        self.assertEqual(self.found('заңның'), ['заң'])
+
+    def test_fallback_without_fts_uses_stem_key(self):
+        self.make_word('договор', self.ru)
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            self.assertEqual(self.found('договора', 'ru'), ['договор'])
+
+
+class ReverseLookupTests(DictionaryTestCase):
+    """Поиск исходных слов через одобренные переводы"""
+
+    def found(self, query, language):
+        words = Word.objects.filter(language=language).filter(search.translation_q(query))
+        return sorted(words.values_list('word', flat=True))
+
+    def test_finds_words_through_translations_in_both_directions(self):
+        court = self.make_word('суд', self.ru)
+        law = self.make_word('закон', self.ru)
+        Translation.objects.create(from_word=court, to_word=self.make_word('court', self.en))
+        Translation.objects.create(from_word=self.make_word('law', self.en), to_word=law)
+        self.assertEqual(self.found('court', self.ru), ['суд'])
+        self.assertEqual(self.found('law', self.ru), ['закон'])
+        self.assertEqual(self.found('суд', self.en), ['court'])
+
+    def test_ignores_unapproved_translations(self):
+        court = self.make_word('суд', self.ru)
+        Translation.objects.create(from_word=court, to_word=self.make_word('court', self.en), status='pending')
+        self.assertEqual(self.found('court', self.ru), [])
+
+    def test_home_translation_mode(self):
+        court = self.make_word('суд', self.ru)
+        Translation.objects.create(from_word=court, to_word=self.make_word('court', self.en))
+        # История поиска не пишется: буфер процесса сбросился бы в рабочую БД при выходе
+        with mock.patch('dictionary.views.record_search'):
+            response = self.client.get('/', {'q': 'court', 'lang': 'ru', 'mode': search.MODE_TRANSLATIONS})
+        self.assertEqual([word.word for word in response.context['words']], ['суд'])
+
+
+class TransliterationLookupTests(DictionaryTestCase):
+    """Казахская кириллица, латиница и ввод без диакритики"""
+
+    def test_key_is_script_and_diacritic_independent(self):
+        self.assertEqual(transliteration_key('Қазақ', 'kk'), 'qazaq')
+        self.assertEqual(transliteration_key('qazaq', 'kk'), 'qazaq')
+        self.assertEqual(transliteration_key('şehir', 'tr'), transliteration_key('sehir', 'tr'))
+
+    def test_by_lookup_key_prefers_exact_headword(self):
+        latin = self.make_word('qazaq', self.kk)
+        cyrillic = self.make_word('қазақ', self.kk)
+        self.assertEqual(list(Word.objects.by_lookup_key('қазақ', self.kk)), [cyrillic, latin])
+        self.assertEqual(Word.objects.by_lookup_key('Qazaq', self.kk).first(), latin)
+
+    def test_search_matches_other_script(self):
+        self.make_word('қазақ', self.kk)
+        words = search.search_words(Word.objects.all(), 'qazaq', 'kk')
+        self.assertEqual(list(words.values_list('word', flat=True)), ['қазақ'])
+        [ranked] = search.rank_words(words, 'qazaq', 'kk')
+        self.assertEqual(ranked.search_tier, search.TIER_EXACT)
+
+
+class RegistryTests(DictionaryTestCase):
+    """Справочники в памяти процесса"""
+
+    def test_lookups_do_not_query_after_load(self):
+        category = Category.objects.create(code='law')
+        CategoryTranslation.objects.create(category=category, language=self.ru, name='Право')
+        registry.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.language(code='kk'), self.kk)
+            self.assertEqual(registry.language(pk=self.ru.pk), self.ru)
+            self.assertEqual(registry.category_name(category, 'ru'), 'Право')
+            # Без перевода - код категории
+            self.assertEqual(registry.category_name(category, 'en'), 'law')
+
+    def test_change_reloads_after_commit(self):
+        registry.snapshot()
+        loads = registry.loads
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(code='law')
+        self.assertEqual(registry.category(category.pk), category)
+        self.assertEqual(registry.loads, loads + 1)
+
+    def test_other_process_reloads_after_check_interval(self):
+        other = Registry()
+        other.snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(code='law')
+        self.assertEqual(other.loads, 1)
+        with mock.patch('dictionary.registry.CHECK_INTERVAL', 0):
+            self.assertEqual([category.code for category in other.categories()], ['law'])
+        self.assertEqual(other.loads, 2)
+
+
+class TranslationFilterTests(DictionaryTestCase):
+    """Фильтры переводов читают prefetch_related"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(code='law')
+        CategoryTranslation.objects.create(category=category, language=cls.ru, name='Право')
+        CategoryTranslation.objects.create(category=category, language=cls.en, name='Law')
+
+    def test_prefetched_translations_need_no_queries(self):
+        [category] = Category.objects.prefetch_related('translations')
+        languages = list(Language.objects.all())
+        registry.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(dictionary_extras.get_translation_name(category, 'ru'), 'Право')
+            self.assertEqual(dictionary_extras.get_translation_name(category, 'kk'), 'law')
+            self.assertTrue(dictionary_extras.has_translation(category, 'en'))
+            self.assertEqual(dictionary_extras.get_translation_percentage(category, languages), 50)
+            self.assertEqual(
+                {language.code for language in dictionary_extras.get_missing_languages(category, languages)},
+                {'kk', 'tr'},
+            )
+
+    @override_settings(DEBUG=True)
+    def test_unprefetched_object_loads_once_and_warns(self):
+        category = Category.objects.get(code='law')
+        registry.snapshot()
+        with self.assertWarns(dictionary_extras.UnprefetchedTranslationsWarning), self.assertNumQueries(1):
+            self.assertEqual(dictionary_extras.get_translation_name(category, 'en'), 'Law')
+        with self.assertNumQueries(0):
+            self.assertFalse(dictionary_extras.has_translation(category, 'kk'))
+
+
+class WordDocumentTests(DictionaryTestCase):
+    """Документы страниц слов"""
+
+    def test_get_document_builds_missing_document_with_visibility(self):
+        court = self.make_word('суд', self.ru)
+        claim = self.make_word('иск', self.ru, status='pending')
+        WordDocument.objects.all().delete()
+        self.assertEqual(documents.get_document(court.slug)['word'], 'суд')
+        self.assertTrue(WordDocument.objects.filter(slug=court.slug).exists())
+        self.assertIsNone(documents.get_document(claim.slug))
+        self.assertEqual(documents.get_document(claim.slug, staff=True)['word'], 'иск')
+
+    def test_translation_change_rebuilds_source_document_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            court = self.make_word('суд', self.ru)
+        self.assertEqual(documents.get_document(court.slug)['translations'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Translation.objects.create(from_word=court, to_word=self.make_word('court', self.en))
+        data = WordDocument.objects.get(word=court).data
+        self.assertEqual([translation['to_word']['word'] for translation in data['translations']], ['court'])
+
+    def test_one_rebuild_per_transaction(self):
+        with mock.patch.object(documents, 'rebuild', wraps=documents.rebuild) as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                first = self.make_word('суд', self.ru)
+                second = self.make_word('иск', self.ru)
+        rebuild.assert_called_once_with({first.pk, second.pk})
+
+    def test_savepoint_rollback_does_not_drop_rebuild(self):
+        with mock.patch.object(documents, 'rebuild') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        documents.schedule_rebuild([1])
+                        raise DatabaseError('rollback')
+                except DatabaseError:
+                    pass
+                documents.schedule_rebuild([2])
+        rebuild.assert_called_once()
+        self.assertIn(2, rebuild.call_args.args[0])
+
+    def test_rebuild_failure_is_logged_not_raised(self):
+        with mock.patch.object(documents, 'rebuild', side_effect=DatabaseError('locked')), \
+                self.assertLogs('dictionary.documents', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.make_word('суд', self.ru)
+
+
+class InterfaceCatalogTests(DictionaryTestCase):
+    """Опубликованные каталоги строк интерфейса"""
+
+    def catalog_url(self, version, language_code='kk'):
+        return reverse('dictionary:interface_catalog_js', kwargs={'language_code': language_code, 'version': version})
+
+    def test_strings_change_only_after_publish(self):
+        InterfaceTranslation.objects.create(language=self.ru, key='menu.home', value='Главная')
+        self.assertEqual(catalogs.get('menu.home', 'ru'), 'menu.home')
+        with self.captureOnCommitCallbacks(execute=True):
+            versions = publish()
+        self.assertEqual(catalogs.version('ru'), versions['ru'])
+        self.assertEqual(catalogs.get('menu.home', 'ru'), 'Главная')
+        # Без перевода - строка языка по умолчанию
+        self.assertEqual(catalogs.get('menu.home', 'kk'), 'Главная')
+
+    def test_render_js_escapes_closing_tags(self):
+        InterfaceTranslation.objects.create(language=self.kk, key='x', value='</script>')
+        with self.captureOnCommitCallbacks(execute=True):
+            publish()
+        self.assertEqual(catalogs.render_js('kk'), 'window.INTERFACE_STRINGS = {"x": "<\\/script>"};\n')
+
+    def test_unpublished_catalog_is_served_without_redirect(self):
+        response = self.client.get(self.catalog_url('0'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_stale_version_redirects_to_immutable_current(self):
+        InterfaceTranslation.objects.create(language=self.kk, key='menu.home', value='Басты бет')
+        with self.captureOnCommitCallbacks(execute=True):
+            version = publish()['kk']
+        self.assertRedirects(self.client.get(self.catalog_url('0')), self.catalog_url(version))
+        response = self.client.get(self.catalog_url(version))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertContains(response, 'Басты бет')
+
+
+class DictionaryStatTests(DictionaryTestCase):
+    """Счётчики словаря, которые ведут сигналы"""
+
+    def counters(self, *keys):
+        return [stats.value(key) for key in keys]
+
+    def test_word_lifecycle_updates_counters(self):
+        keys = (stats.WORDS_ACTIVE, stats.WORDS_PUBLISHED, stats.language_key(self.ru.pk))
+        self.assertEqual(self.counters(*keys), [0, 0, 0])
+        word = self.make_word('суд', self.ru, status='pending')
+        self.assertEqual(self.counters(*keys), [1, 0, 0])
+        word.status = 'approved'
+        word.save()
+        self.assertEqual(self.counters(*keys), [1, 1, 1])
+        word.is_deleted = True
+        word.save()
+        self.assertEqual(self.counters(*keys), [0, 0, 0])
+        word.is_deleted = False
+        word.save()
+        word.delete()
+        self.assertEqual(self.counters(*keys), [0, 0, 0])
+
+    def test_tags_and_translations_update_counters(self):
+        tag = Tag.objects.create(code='legal')
+        court = self.make_word('суд', self.ru)
+        self.assertEqual(stats.value(stats.tag_key(tag.pk)), 0)
+        court.tags.add(tag)
+        self.assertEqual(stats.value(stats.tag_key(tag.pk)), 1)
+        court.tags.remove(tag)
+        self.assertEqual(stats.value(stats.tag_key(tag.pk)), 0)
+        self.assertEqual(stats.value(stats.WORDS_TRANSLATED_PUBLISHED), 0)
+        translation = Translation.objects.create(from_word=court, to_word=self.make_word('court', self.en))
+        self.assertEqual(stats.value(stats.WORDS_TRANSLATED_PUBLISHED), 1)
+        translation.delete()
+        self.assertEqual(stats.value(stats.WORDS_TRANSLATED_PUBLISHED), 0)
+
+    def test_reconcile_fixes_changes_that_bypass_signals(self):
+        self.make_word('суд', self.ru)
+        self.assertEqual(stats.value(stats.WORDS_PUBLISHED), 1)
+        Word.objects.update(status='pending')
+        fixed_words, changes = stats.reconcile()
+        self.assertEqual(fixed_words, 0)
+        self.assertEqual(changes[stats.WORDS_PUBLISHED], (1, 0))
+        self.assertEqual(stats.value(stats.WORDS_PUBLISHED), 0)
+
+    def test_word_counts_load_in_one_query(self):
+        self.make_word('суд', self.ru)
+        self.make_word('сот', self.kk)
+        languages = list(Language.objects.order_by('code'))
+        stats.values(*(stats.language_key(language.pk) for language in languages))
+        with self.assertNumQueries(1):
+            counts = {language.code: language.word_count for language in stats.load_word_counts(languages)}
+        self.assertEqual(counts, {'en': 0, 'kk': 1, 'ru': 1, 'tr': 0})
+
+
+class TranslationFlagTests(DictionaryTestCase):
+    """Флаги переводов в самом слове"""
+
+    def refreshed(self, word):
+        word.refresh_from_db()
+        return word.approved_translations, word.translation_languages
+
+    def test_flags_follow_translation_changes(self):
+        court = self.make_word('суд', self.ru)
+        english = Translation.objects.create(from_word=court, to_word=self.make_word('court', self.en))
+        Translation.objects.create(from_word=court, to_word=self.make_word('сот', self.kk))
+        self.assertEqual(self.refreshed(court), (2, ',en,kk,'))
+        english.status = 'pending'
+        english.save()
+        self.assertEqual(self.refreshed(court), (1, ',kk,'))
+        english.to_word = self.make_word('mahkeme', self.tr)
+        english.status = 'approved'
+        english.save()
+        self.assertEqual(self.refreshed(court), (2, ',kk,tr,'))
+
+    def test_target_changing_language_updates_sources(self):
+        court = self.make_word('суд', self.ru)
+        target = self.make_word('court', self.en)
+        Translation.objects.create(from_word=court, to_word=target)
+        target.language = self.tr
+        target.save()
+        self.assertEqual(self.refreshed(court), (1, ',tr,'))
+
+    def test_queryset_predicates(self):
+        court = self.make_word('суд', self.ru)
+        self.make_word('иск', self.ru)
+        Translation.objects.create(from_word=court, to_word=self.make_word('court', self.en))
+        russian = Word.objects.filter(language=self.ru)
+        self.assertEqual(list(russian.with_translations()), [court])
+        self.assertEqual([word.word for word in russian.without_translations()], ['иск'])
+        self.assertEqual(list(Word.objects.translated_to('en')), [court])
+        self.assertNotIn(court, Word.objects.untranslated_to('en'))
+
+
+class TieredCacheTests(DictionaryTestCase):
+    """Память процесса перед общим кэшем и пересчёт без лавины"""
+
+    def test_local_copy_outlives_shared_delete_until_timeout(self):
+        cache.set('key', {'value': 1})
+        cache.get('key')['value'] = 2
+        self.assertEqual(cache.get('key'), {'value': 1})
+        caches['shared'].delete('key')
+        self.assertEqual(cache.get('key'), {'value': 1})
+        later = clock.monotonic() + cache.local_timeout + 1
+        with mock.patch('dictionary.tiered_cache.time.monotonic', return_value=later):
+            self.assertIsNone(cache.get('key'))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            clock.sleep(0.2)
+            return 'fresh'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(tiered_cache.get_or_compute('key', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['fresh'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_value_served_while_rebuilding_or_on_database_error(self):
+        cache.set('key', (clock.time() - 1, 'stale'), 300)
+        self.assertTrue(cache.lock('key:rebuild', 30))
+        self.assertEqual(tiered_cache.get_or_compute('key', lambda: 'fresh'), 'stale')
+        cache.unlock('key:rebuild')
+
+        def locked():
+            raise DatabaseError('database is locked')
+
+        self.assertEqual(tiered_cache.get_or_compute('key', locked), 'stale')
+        self.assertEqual(tiered_cache.get_or_compute('key', lambda: 'fresh'), 'fresh')
+        self.assertEqual(tiered_cache.get_or_compute('key', locked), 'fresh')
+
+
+class ConditionalGetTests(DictionaryTestCase):
+    """ETag и 304 для публичных страниц"""
+
+    def test_word_page_revalidates_until_word_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            word = self.make_word('суд', self.ru)
+        url = reverse('dictionary:word_detail', kwargs={'slug': word.slug})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            word.meaning = '<p>Орган правосудия</p>'
+            word.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_home_revalidates_until_search_results_change(self):
+        etag = self.client.get('/')['ETag']
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_word('суд', self.ru)
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_home_has_no_etag_for_signed_in_users(self):
+        self.client.force_login(get_user_model().objects.create_user('reader', password='secret'))
+        self.assertFalse(self.client.get('/').has_header('ETag'))
+
+
+class WordCardCacheTests(DictionaryTestCase):
+    """Кэш карточек слов по updated_at"""
+
+    def updated_at(self, word):
+        return Word.objects.values_list('updated_at', flat=True).get(pk=word.pk)
+
+    def test_save_with_update_fields_touches_updated_at(self):
+        word = self.make_word('суд', self.ru)
+        before = self.updated_at(word)
+        word.status = 'pending'
+        word.save(update_fields=['status'])
+        self.assertGreater(self.updated_at(word), before)
+
+    def test_tag_changes_touch_updated_at_from_both_sides(self):
+        word = self.make_word('суд', self.ru)
+        tag = Tag.objects.create(code='legal')
+        before = self.updated_at(word)
+        word.tags.add(tag)
+        self.assertGreater(self.updated_at(word), before)
+        before = self.updated_at(word)
+        tag.words.remove(word)
+        self.assertGreater(self.updated_at(word), before)
+
+    def test_home_card_follows_word_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            word = self.make_word('суд', self.ru, '<p>Орган правосудия</p>')
+        self.assertContains(self.client.get('/'), 'Орган правосудия')
+        with self.captureOnCommitCallbacks(execute=True):
+            word.meaning = '<p>Государственный орган</p>'
+            word.save()
+        response = self.client.get('/')
+        self.assertContains(response, 'Государственный орган')
+        self.assertNotContains(response, 'Орган правосудия')
+
+
+@override_settings(MICRO_CACHE_SECONDS=10, CACHE_PURGE_URL='http://nginx:8080')
+class MicroCacheTests(DictionaryTestCase):
+    """Микрокэш nginx для анонимных страниц"""
+
+    def test_anonymous_pages_go_to_shared_cache(self):
+        response = self.client.get('/')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=0', response['Cache-Control'])
+        self.assertEqual(response['X-Accel-Expires'], '10')
+
+    def test_signed_in_pages_are_private(self):
+        self.client.force_login(get_user_model().objects.create_user('reader', password='secret'))
+        response = self.client.get('/')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(response['X-Accel-Expires'], '0')
+
+    def test_pending_messages_keep_response_private(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        messages.info(request, 'Слово сохранено')
+        response = microcache.role_cache_control(lambda request: HttpResponse())(request)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(response['X-Accel-Expires'], '0')
+
+    def test_word_change_refreshes_pages_after_commit(self):
+        with mock.patch('dictionary.microcache.threading.Thread') as thread:
+            with self.captureOnCommitCallbacks() as callbacks:
+                word = self.make_word('суд', self.ru)
+            thread.assert_not_called()
+            for callback in callbacks:
+                callback()
+        [(_, kwargs)] = thread.call_args_list
+        self.assertEqual(kwargs['args'], ({f'/word/{word.slug}/', '/', '/?lang=ru'},))
+        thread.return_value.start.assert_called_once_with()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryCacheTests(TransactionTestCase):
+    """Queryset.cached() со сбросом по таблицам
+
+    Внутри транзакции кэш не применяется, поэтому тесты идут без обёртки TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(autocomplete, 'schedule_rebuild')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Category.objects.create(code='law')
+
+    def codes(self):
+        return [category.code for category in Category.objects.cached().order_by('code')]
+
+    def counter(self, name):
+        return query_cache.stats()[name]
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.assertEqual(self.codes(), ['law'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.codes(), ['law'])
+
+    def test_writes_invalidate_cached_results(self):
+        self.codes()
+        Category.objects.create(code='civil')
+        self.assertEqual(self.codes(), ['civil', 'law'])
+        Category.objects.filter(code='civil').update(code='tax')
+        self.assertEqual(self.codes(), ['law', 'tax'])
+        Category.objects.bulk_create([Category(code='crime', slug='crime')])
+        self.assertEqual(self.codes(), ['crime', 'law', 'tax'])
+
+    def test_transactions_bypass_cache_and_bump_on_commit(self):
+        self.codes()
+        bypassed = self.counter('bypassed')
+        with transaction.atomic():
+            Category.objects.create(code='civil')
+            self.assertEqual(self.codes(), ['civil', 'law'])
+        self.assertEqual(self.counter('bypassed'), bypassed + 1)
+        self.assertEqual(self.codes(), ['civil', 'law'])
+
+    def test_savepoint_rollback_keeps_pending_bumps(self):
+        self.codes()
+        with mock.patch.object(query_cache, 'bump_tables', wraps=query_cache.bump_tables) as bump_tables:
+            with transaction.atomic():
+                Category.objects.create(code='civil')
+                try:
+                    with transaction.atomic():
+                        Category.objects.create(code='tax')
+                        raise DatabaseError('rollback')
+                except DatabaseError:
+                    pass
+                Category.objects.create(code='crime', slug='crime')
+        bump_tables.assert_called_once()
+        self.assertEqual(self.codes(), ['civil', 'crime', 'law'])
+
+    def test_query_reading_untracked_table_is_not_cached(self):
+        words = Word.objects.cached().filter(created_by__search_history__word='суд')
+        uncacheable = self.counter('uncacheable')
+        self.assertEqual(list(words), [])
+        self.assertEqual(self.counter('uncacheable'), uncacheable + 1)
+        with self.assertNumQueries(1):
+            list(words.all())
@@ -0,0 +1,292 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим для воркеров бэкендом
+
+TieredCache - бэкенд кэша Django. Чтение идёт сначала из памяти процесса,
+затем из общего бэкенда (CACHES[LOCATION]: файлы, SQLite или Redis), запись -
+в оба уровня. Значение в памяти живёт не дольше LOCAL_TIMEOUT секунд, поэтому
+изменения, сделанные другими воркерами, становятся видны с этой задержкой.
+
+get_or_compute() строит поверх кэша пересчёт дорогих значений:
+- одновременные промахи по ключу вызывают один пересчёт (single-flight):
+  один поток в процессе и один процесс среди воркеров (TieredCache.lock);
+- пока значение пересчитывается, остальные получают устаревшее значение;
+- если пересчёт упал на ошибке БД (например, «database is locked»), тоже
+  отдаётся устаревшее значение.
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import DatabaseError
+
+DEFAULT_LOCAL_TIMEOUT = 2.0
+DEFAULT_LOCAL_MAX_ENTRIES = 1000
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """Бэкенд кэша: память процесса (LRU) + общий бэкенд из CACHES[LOCATION]"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location or 'shared'
+        self.local_timeout = options.get('LOCAL_TIMEOUT', DEFAULT_LOCAL_TIMEOUT)
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', DEFAULT_LOCAL_MAX_ENTRIES)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    # Уровень памяти процесса
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+        # Копия при каждом чтении: изменение полученного объекта не портит кэш
+        return pickle.loads(payload)
+
+    def _local_set(self, key, value, timeout):
+        lifetime = self.local_timeout
+        if timeout is not None:
+            lifetime = min(lifetime, timeout)
+        if lifetime <= 0:
+            self._local_delete(key)
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[key] = (time.monotonic() + lifetime, payload)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # API кэша Django
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        value = self._local_get(local_key)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.shared_hits += 1
+        self._local_set(local_key, value, None)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(self._local_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        self._local_set(self._local_key(key, version), value, timeout)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self._local_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(self._local_key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        # Счётчики версий (справочник, каталоги, поколения выдачи) хранятся без срока
+        self._local_set(self._local_key(key, version), value, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    # Межпроцессная блокировка
+
+    def _lock_path(self, key):
+        digest = hashlib.md5(self.shared.make_key(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.shared._dir, f'{digest}.lock')
+
+    def lock(self, key, timeout):
+        """Берёт блокировку ключа для всех воркеров; True, если взята
+
+        add() файлового бэкенда не атомарен, поэтому для него блокировка -
+        файл, созданный с O_EXCL (файлы .lock кэш не вычищает)."""
+        shared = self.shared
+        if not isinstance(shared, FileBasedCache):
+            return shared.add(key, os.getpid(), timeout)
+        path = self._lock_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < timeout:
+                        return False
+                    # Блокировку оставил упавший процесс
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def unlock(self, key):
+        if not isinstance(self.shared, FileBasedCache):
+            self.shared.delete(key)
+            return
+        try:
+            os.remove(self._lock_path(key))
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            'shared': self.shared_alias,
+            'local_entries': len(self._local),
+            'local_max_entries': self.local_max_entries,
+            'local_timeout': self.local_timeout,
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.local_hits + self.shared_hits) / lookups, 3) if lookups else None,
+        }
+
+
+# Пересчёт с защитой от лавины промахов
+
+# Сколько держится блокировка пересчёта, если процесс упал, не сняв её
+LOCK_TIMEOUT = 30
+
+# Как часто ожидающий проверяет, не появилось ли значение
+POLL_INTERVAL = 0.05
+
+_rebuilding = set()
+_rebuilding_lock = threading.Lock()
+_counters = {'computed': 0, 'stale': 0, 'waited': 0, 'errors': 0}
+
+
+def _count(name):
+    with _rebuilding_lock:
+        _counters[name] += 1
+
+
+def _acquire(cache, key):
+    with _rebuilding_lock:
+        if key in _rebuilding:
+            return False
+        _rebuilding.add(key)
+    lock_key = f'{key}:rebuild'
+    if cache.lock(lock_key, LOCK_TIMEOUT) if isinstance(cache, TieredCache) else cache.add(lock_key, os.getpid(), LOCK_TIMEOUT):
+        return True
+    with _rebuilding_lock:
+        _rebuilding.discard(key)
+    return False
+
+
+def _release(cache, key):
+    lock_key = f'{key}:rebuild'
+    if isinstance(cache, TieredCache):
+        cache.unlock(lock_key)
+    else:
+        cache.delete(lock_key)
+    with _rebuilding_lock:
+        _rebuilding.discard(key)
+
+
+def _compute(cache, key, compute, timeout, stale_timeout):
+    value = compute()
+    # Запись хранится дольше срока свежести: её отдают, пока идёт пересчёт
+    cache.set(key, (time.time() + timeout, value), timeout + stale_timeout)
+    _count('computed')
+    return value
+
+
+def get_or_compute(key, compute, timeout=60, stale_timeout=300, wait=5.0, using='default'):
+    """Значение из кэша или compute(); пересчитывает один вызывающий на ключ
+
+    timeout - сколько секунд значение свежее, stale_timeout - сколько после
+    этого его ещё можно отдавать, пока идёт пересчёт, wait - сколько ждать
+    чужой пересчёт, если отдать нечего."""
+    cache = caches[using]
+    entry = cache.get(key)
+    if entry is not None and entry[0] > time.time():
+        return entry[1]
+
+    if entry is not None:
+        if not _acquire(cache, key):
+            _count('stale')
+            return entry[1]
+        try:
+            return _compute(cache, key, compute, timeout, stale_timeout)
+        except DatabaseError:
+            _count('errors')
+            _count('stale')
+            return entry[1]
+        finally:
+            _release(cache, key)
+
+    # Отдать нечего: ждём результат чужого пересчёта, затем считаем сами
+    deadline = time.monotonic() + wait
+    acquired = _acquire(cache, key)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            _count('waited')
+            return entry[1]
+        acquired = _acquire(cache, key)
+    try:
+        return _compute(cache, key, compute, timeout, stale_timeout)
+    finally:
+        if acquired:
+            _release(cache, key)
+
+
+def stats():
+    """Счётчики get_or_compute и уровней кэша текущего процесса"""
+    with _rebuilding_lock:
+        result = dict(_counters, rebuilding=len(_rebuilding))
+    cache = caches['default']
+    if isinstance(cache, TieredCache):
+        result.update(cache.stats())
+    return result
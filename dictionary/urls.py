@@ -27,6 +27,9 @@ urlpatterns = [
     
     # API endpoints
     path('api/check-translations/', views.check_translations_api, name='check_translations_api'),
+    path('api/autocomplete/', api_views.autocomplete_api, name='autocomplete_api'),
+    path('api/search-cache-stats/', api_views.search_cache_stats_api, name='search_cache_stats_api'),
+    path('i18n/interface/<slug:language_code>/<slug:version>.js', api_views.interface_catalog_js, name='interface_catalog_js'),
     path('api/create-category/', views.create_category_api, name='create_category_api'),
     path('api/create-tag/', views.create_tag_api, name='create_tag_api'),
     path('api/change-word-status/<slug:slug>/', views.change_word_status, name='change_word_status'),
@@ -1,27 +1,44 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.db.models import Prefetch, Q, Value, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.conf import settings
-from .models import Category, CategoryTranslation, Tag, TagTranslation, Language, InterfaceTranslation, Word, Translation, CustomUser
+from django.utils.dateparse import parse_datetime
+from .models import Category, CategoryTranslation, Tag, TagTranslation, Language, InterfaceTranslation, Word, WordChangeLog, Translation, CustomUser, SearchQueryDaily
 from .forms import CustomUserCreationForm, WordForm, WordTranslationForm, WordStatusChangeForm, TagForm
+from .search import (
+    visible_words, search_q, search_words, translation_q, highlight_words, rank_words,
+    RELEVANCE_ORDERING, MODE_WORDS, MODE_TRANSLATIONS, SEARCH_MODES,
+)
+from .autocomplete import suggest
+from .fuzzy import similar_words as similar_words_for
+from .pagination import KeysetPaginator
+from . import result_cache, stats
+from .search_log import record_search
+from .registry import registry
+from .documents import get_document
+from .interface_catalog import publish as publish_interface_catalog
+from .conditional import home_etag, word_detail_etag, word_detail_last_modified
+from .microcache import role_cache_control
 import json
 import os
 import uuid
 from PIL import Image
 import mimetypes
 
+@role_cache_control
+@condition(etag_func=home_etag)
 def home(request):
     """Главная страница с поиском слов"""
     # Получить параметры поиска
@@ -29,10 +46,13 @@ def home(request):
     language_code = request.GET.get('lang', '')
     category_id = request.GET.get('category', '')
     page = request.GET.get('page', 1)
-    try:
-        page = int(page)
-    except ValueError:
-        page = 1
+    cursor = request.GET.get('cursor', '')
+    # При поиске по умолчанию сортируем по релевантности
+    sort_by = request.GET.get('sort', 'relevance' if query else 'word')  # relevance, word
+    # words - поиск по словам, translations - слова, чьи переводы совпали с запросом
+    mode = request.GET.get('mode', MODE_WORDS)
+    if mode not in SEARCH_MODES:
+        mode = MODE_WORDS
     
     # Преобразуем category_id в int, если он не пустой
     try:
@@ -40,11 +60,13 @@ def home(request):
     except ValueError:
         category_id = None
     
+    is_admin = request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser)
+    # Совпадения при обратном поиске - в переводах, ранжировать слова по запросу незачем
+    if not query or sort_by != 'relevance' or mode == MODE_TRANSLATIONS:
+        sort_by = 'word'
+    
     # Базовый queryset - администраторы видят все слова, обычные пользователи - только одобренные
-    if request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser):
-        words = Word.objects.filter(is_deleted=False)
-    else:
-        words = Word.objects.published()
+    words = visible_words(request.user)
     
     # Фильтр по языку - используем новый метод
     if language_code:
@@ -55,40 +77,54 @@ def home(request):
         words = words.filter(category_id=category_id)
     
     # Поиск по запросу
-    if query:
-        # Поиск по слову и значению на всех языках
-        search_query = Q(word__icontains=query) | Q(meaning__icontains=query)
-        words = words.filter(search_query)
+    if query and mode == MODE_TRANSLATIONS:
+        # Запрос на любом языке, в выдаче - слова выбранного языка, связанные с найденными переводом
+        words = words.filter(translation_q(query))
+    elif query:
+        # Поиск по слову и значению на всех языках через полнотекстовый индекс
+        words = search_words(words, query, language_code or None)
     
     # Сортировка
-    words = words.order_by('word')
+    if sort_by == 'relevance':
+        words = rank_words(words, query, language_code or None)
+        ordering = RELEVANCE_ORDERING
+    else:
+        ordering = ('word', 'id')
     
-    # Пагинация
-    paginator = Paginator(words, 20)  # 20 слов на страницу
-    words_page = paginator.get_page(page)
+    # Пагинация по ключу сортировки: 20 слов на страницу
+    paginator = KeysetPaginator(words.for_list(), 20, ordering=ordering)
     
-    # Получить данные для фильтров
-    languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
+    # Состояние страницы берём из кэша выдачи: фильтр, подсчёт и пагинация не выполняются
+    cache_key = result_cache.make_key(query, language_code, category_id, sort_by, cursor, page, is_admin, mode)
+    words_page = None
+
+    def build_state():
+        nonlocal words_page
+        words_page = paginator.page(cursor, page)
+        return words_page.state()
+
+    cached_state = result_cache.results.get_or_compute(cache_key, build_state, language_code)
+    if words_page is None:
+        words_by_id = Word.objects.for_list().in_bulk(cached_state['ids'])
+        words_page = paginator.restore(
+            cached_state, [words_by_id[pk] for pk in cached_state['ids'] if pk in words_by_id]
+        )
+    if query:
+        if mode == MODE_WORDS:
+            words_page.object_list = highlight_words(words_page.object_list, query, language_code or None)
+        # В историю попадает запрос, а не листание его результатов
+        if words_page.number == 1 and not cursor:
+            record_search(request, query, language_code, words_page.total)
     
-    # Получить переводы названий категорий
+    # Данные для фильтров - из справочника процесса, без запросов
+    languages = registry.languages()
+    
+    # Названия категорий на языке интерфейса
     user_language = request.session.get('language', 'ru')
-    categories_with_translations = []
-    for category in categories:
-        try:
-            translation = CategoryTranslation.objects.get(
-                category=category, 
-                language__code=user_language
-            )
-            categories_with_translations.append({
-                'category': category,
-                'name': translation.name
-            })
-        except CategoryTranslation.DoesNotExist:
-            categories_with_translations.append({
-                'category': category,
-                'name': category.code
-            })
+    categories_with_translations = [
+        {'category': category, 'name': registry.category_name(category, user_language)}
+        for category in registry.categories()
+    ]
     
     context = {
         'words': words_page,
@@ -97,61 +133,49 @@ def home(request):
         'current_query': query,
         'current_language': language_code,
         'current_category': category_id,
+        'current_sort': sort_by,
+        'current_mode': mode,
         'user_language': user_language,
-        'is_admin': request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser),
+        'is_admin': is_admin,
         # Дополнительная информация для редактора (только для персонала)
-        'recent_words': Word.objects.recent(days=7)[:5] if request.user.is_authenticated and request.user.is_staff else None,
-        'words_without_translations': Word.objects.without_translations()[:5] if request.user.is_authenticated and request.user.is_staff else None,
-        'total_published_words': Word.objects.published().count(),
-        'total_all_words': Word.objects.filter(is_deleted=False).count() if request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser) else None,
+        'recent_words': get_recent_words() if request.user.is_authenticated and request.user.is_staff else None,
+        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5] if request.user.is_authenticated and request.user.is_staff else None,
+        # Справочник входит в ключ кэша карточек: коды языков и категорий
+        'card_version': registry.version(),
+        'total_published_words': stats.value(stats.WORDS_PUBLISHED),
+        'total_all_words': stats.value(stats.WORDS_ACTIVE) if request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser) else None,
     }
     
     return render(request, 'dictionary/home.html', context)
 
+@role_cache_control
+@condition(etag_func=word_detail_etag, last_modified_func=word_detail_last_modified)
 def word_detail(request, slug):
-    """Детальная страница слова с переводами"""
-    # Администраторы видят все слова (включая pending), обычные пользователи - только одобренные
-    if request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser):
-        # Для администраторов - показываем все слова кроме удаленных
-        word = get_object_or_404(Word, slug=slug, is_deleted=False)
-    else:
-        # Для обычных пользователей - только одобренные слова
-        word = get_object_or_404(Word, slug=slug, status='approved', is_deleted=False)
-    
-    # Получить все переводы слова
-    translations = word.from_translations.all().select_related('to_word', 'to_word__language')
+    """Детальная страница слова с переводами
     
-    # Получить примеры
-    examples = word.examples.all()
+    Всё содержимое страницы берётся из документа слова (WordDocument) одним чтением по slug."""
+    # Администраторы видят все слова (включая pending), обычные пользователи - только одобренные
+    is_admin = request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser)
+    word = get_document(slug, staff=is_admin)
+    if word is None:
+        raise Http404('Слово не найдено')
+    word['created_at'] = parse_datetime(word['created_at'])
     
-    # Получить теги с переводами
+    # Теги с названиями на языке интерфейса
     user_language = request.session.get('language', 'ru')
-    tags_with_translations = []
-    for tag in word.tags.all():
-        try:
-            translation = TagTranslation.objects.get(
-                tag=tag, 
-                language__code=user_language
-            )
-            tags_with_translations.append({
-                'tag': tag,
-                'name': translation.name,
-                'display_mode': tag.display_mode
-            })
-        except TagTranslation.DoesNotExist:
-            tags_with_translations.append({
-                'tag': tag,
-                'name': tag.code,
-                'display_mode': tag.display_mode
-            })
+    tags_with_translations = [
+        {'name': tag['names'].get(user_language, tag['code']), 'display_mode': tag['display_mode']}
+        for tag in word['tags']
+    ]
     
     context = {
         'word': word,
-        'translations': translations,
-        'examples': examples,
+        'translations': word['translations'],
+        'examples': word['examples'],
         'tags': tags_with_translations,
+        'status_choices': Word.STATUS_CHOICES,
         'user_language': user_language,
-        'is_admin': request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser),
+        'is_admin': is_admin,
     }
     
     return render(request, 'dictionary/word_detail.html', context)
@@ -203,15 +227,15 @@ def user_profile(request):
 def translation_dashboard(request):
     """Дашборд для управления переводами"""
     languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
-    tags = Tag.objects.all().order_by('code')
+    # Переводы загружаются двумя запросами на все категории и теги; шаблон выводит их из того же кэша
+    categories = Category.objects.prefetch_related('translations__language').order_by('code')
+    tags = Tag.objects.prefetch_related('translations__language').order_by('code')
+    total_languages = len(languages)
     
     # Получаем статистику переводов
     category_stats = {}
     for category in categories:
-        translations = category.translations.all()
-        total_languages = languages.count()
-        translated_languages = translations.count()
+        translated_languages = len(category.translations.all())
         category_stats[category.id] = {
             'total': total_languages,
             'translated': translated_languages,
@@ -220,9 +244,7 @@ def translation_dashboard(request):
     
     tag_stats = {}
     for tag in tags:
-        translations = tag.translations.all()
-        total_languages = languages.count()
-        translated_languages = translations.count()
+        translated_languages = len(tag.translations.all())
         tag_stats[tag.id] = {
             'total': total_languages,
             'translated': translated_languages,
@@ -231,9 +253,8 @@ def translation_dashboard(request):
         }
     
     # Общая статистика
-    total_categories = categories.count()
-    total_tags = tags.count()
-    total_languages = languages.count()
+    total_categories = len(categories)
+    total_tags = len(tags)
     
     # Категории с полными переводами
     fully_translated_categories = sum(1 for stats in category_stats.values() if stats['percentage'] == 100)
@@ -243,6 +264,13 @@ def translation_dashboard(request):
     untranslated_categories = sum(1 for stats in category_stats.values() if stats['percentage'] == 0)
     untranslated_tags = sum(1 for stats in tag_stats.values() if stats['percentage'] == 0)
     
+    # Поисковые запросы за последний сведённый день (по индексам сводки)
+    search_day = SearchQueryDaily.objects.order_by('-day').values_list('day', flat=True).first()
+    top_queries = top_misses = []
+    if search_day:
+        top_queries = SearchQueryDaily.objects.filter(day=search_day).order_by('-searches')[:10]
+        top_misses = SearchQueryDaily.objects.filter(day=search_day, is_miss=True).order_by('-searches')[:10]
+    
     context = {
         'languages': languages,
         'categories': categories,
@@ -256,6 +284,9 @@ def translation_dashboard(request):
         'fully_translated_tags': fully_translated_tags,
         'untranslated_categories': untranslated_categories,
         'untranslated_tags': untranslated_tags,
+        'search_day': search_day,
+        'top_queries': top_queries,
+        'top_misses': top_misses,
     }
     return render(request, 'dictionary/translation_dashboard.html', context)
 
@@ -378,23 +409,16 @@ def interface_translations_edit(request):
                         if not created:
                             translation.value = value
                             translation.save()
+            # Новые строки попадают в каталоги процессов только после публикации
+            publish_interface_catalog()
         
         messages.success(request, 'Переводы интерфейса обновлены')
         return redirect('dictionary:translation_dashboard')
     
-    # Получаем все ключи переводов
-    all_keys = set(InterfaceTranslation.objects.values_list('key', flat=True))
-    
-    # Получаем существующие переводы
+    # Получаем существующие переводы одним запросом (редактируются строки БД, а не опубликованный каталог)
     translations = {}
-    for key in all_keys:
-        translations[key] = {}
-        for language in languages:
-            try:
-                translation = InterfaceTranslation.objects.get(language=language, key=key)
-                translations[key][language.code] = translation.value
-            except InterfaceTranslation.DoesNotExist:
-                translations[key][language.code] = ''
+    for key, code, value in InterfaceTranslation.objects.values_list('key', 'language__code', 'value'):
+        translations.setdefault(key, {language.code: '' for language in languages})[code] = value
     
     context = {
         'languages': languages,
@@ -503,8 +527,8 @@ def bulk_add_missing_translations(request):
 def translation_progress(request):
     """Страница с прогрессом переводов"""
     languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
-    tags = Tag.objects.all().order_by('code')
+    categories = Category.objects.cached().order_by('code')
+    tags = Tag.objects.cached().order_by('code')
     
     # Статистика по языкам
     language_stats = {}
@@ -544,6 +568,7 @@ def word_translations_dashboard(request):
     category_id = request.GET.get('category', '')
     status = request.GET.get('status', '')
     page = request.GET.get('page', 1)
+    cursor = request.GET.get('cursor', '')
     
     # Базовый queryset
     words = Word.objects.filter(is_deleted=False)
@@ -558,29 +583,32 @@ def word_translations_dashboard(request):
     
     # Поиск по запросу
     if query:
-        search_query = Q(word__icontains=query) | Q(meaning__icontains=query)
-        words = words.filter(search_query)
+        words = search_words(words, query, source_language or None)
     
     # Фильтр по статусу перевода
     if status == 'translated':
-        words = words.filter(from_translations__isnull=False).distinct()
+        words = words.with_translations()
     elif status == 'untranslated':
-        words = words.filter(from_translations__isnull=True)
-    
-    # Сортировка
-    words = words.order_by('word')
+        words = words.without_translations()
     
-    # Пагинация
-    paginator = Paginator(words, 20)
-    words_page = paginator.get_page(page)
+    # Пагинация по ключу (word, id)
+    paginator = KeysetPaginator(words.for_list(), 20, ordering=('word', 'id'))
+    words_page = paginator.page(cursor, page)
+    if query:
+        words_page.object_list = highlight_words(words_page.object_list, query, source_language or None)
+    # Переводы строк страницы - одним запросом, а не по два на строку
+    prefetch_related_objects(
+        list(words_page.object_list),
+        Prefetch('from_translations', queryset=Translation.objects.select_related('to_word__language')),
+    )
     
     # Получить данные для фильтров
     languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
+    categories = Category.objects.cached().order_by('code')
     
     # Статистика
     total_words = words.count()
-    translated_words = words.filter(from_translations__isnull=False).distinct().count()
+    translated_words = words.with_translations().count()
     untranslated_words = total_words - translated_words
     
     context = {
@@ -636,9 +664,9 @@ def word_translation_edit(request, slug):
                         if translation_word:  # Сохраняем только если есть перевод
                             try:
                                 # Создаем или получаем слово на целевом языке
-                                target_word, created = Word.objects.get_or_create(
-                                    word=translation_word,
-                                    language=language,
+                                target_word, created = Word.objects.get_or_create_headword(
+                                    translation_word,
+                                    language,
                                     defaults={
                                         'meaning': translation_meaning or '',
                                         'status': 'pending',
@@ -748,9 +776,9 @@ def test_translation_save(request, slug):
             language = Language.objects.get(code=language_code)
             
             # Создаем или получаем слово
-            target_word, created = Word.objects.get_or_create(
-                word=translation_word,
-                language=language,
+            target_word, created = Word.objects.get_or_create_headword(
+                translation_word,
+                language,
                 defaults={
                     'meaning': translation_meaning or '',
                     'status': 'pending',
@@ -819,12 +847,12 @@ def bulk_word_translation(request):
                                 target_language = Language.objects.get(code=target_lang_code)
                                 
                                 # Создаем или получаем слово на целевом языке
-                                target_word, created = Word.objects.get_or_create(
-                                    word=translation_text,
-                                    language=target_language,
-                                    category=word.category,
+                                target_word, created = Word.objects.get_or_create_headword(
+                                    translation_text,
+                                    target_language,
                                     defaults={
                                         'meaning': '',
+                                        'category': word.category,
                                         'status': 'pending',
                                         'is_deleted': False
                                     }
@@ -857,16 +885,13 @@ def bulk_word_translation(request):
     
     # Исключаем слова, которые уже имеют переводы на целевой язык
     if target_language:
-        target_lang = Language.objects.get(code=target_language)
-        words = words.exclude(
-            from_translations__to_word__language=target_lang
-        )
+        words = words.untranslated_to(target_language)
     
     words = words.order_by('word')[:50]  # Ограничиваем для производительности
     
     # Получить данные для фильтров
     languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
+    categories = Category.objects.cached().order_by('code')
     
     context = {
         'words': words,
@@ -888,20 +913,30 @@ def translation_search(request):
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         # AJAX запрос для автодополнения
         if query:
-            words = Word.objects.filter(
-                word__icontains=query,
-                is_deleted=False
-            )
+            found = suggest(query, source_lang or None, limit=10, published_only=False)
             
-            if source_lang:
-                words = words.filter(language__code=source_lang)
+            if found is None:
+                # Словари автодополнения ещё не собраны
+                words = Word.objects.filter(
+                    word__istartswith=query,
+                    is_deleted=False
+                )
+                
+                if source_lang:
+                    words = words.filter(language__code=source_lang)
+                words = words.select_related('language', 'category')[:10]
+            else:
+                words_by_id = Word.objects.select_related('language', 'category').in_bulk(
+                    [item['id'] for item in found]
+                )
+                words = [words_by_id[item['id']] for item in found if item['id'] in words_by_id]
             
             suggestions = []
-            for word in words[:10]:
+            for word in words:
                 suggestions.append({
             'id': word.id,
             'word': word.word,
-                    'meaning': word.meaning,
+                    'meaning': word.meaning_text,
             'language': word.language.code,
                     'category': word.category.code if word.category else ''
                 })
@@ -912,8 +947,7 @@ def translation_search(request):
     words = Word.objects.filter(is_deleted=False)
     
     if query:
-        search_query = Q(word__icontains=query) | Q(meaning__icontains=query)
-        words = words.filter(search_query)
+        words = search_words(words, query)
     
     if source_lang:
         words = words.filter(language__code=source_lang)
@@ -952,12 +986,12 @@ def multi_translate_word(request, slug):
                             translation_text = translations[lang_code].strip()
                             
                             # Создаем или получаем слово на целевом языке
-                            target_word, created = Word.objects.get_or_create(
-                                word=translation_text,
-                                language=target_language,
-                                category=word.category,
+                            target_word, created = Word.objects.get_or_create_headword(
+                                translation_text,
+                                target_language,
                                 defaults={
                                     'meaning': word.meaning,  # Копируем значение
+                                    'category': word.category,
                                     'status': 'pending',
                                     'is_deleted': False
                                 }
@@ -1026,31 +1060,20 @@ def bulk_multi_translate(request):
                                 target_language = Language.objects.get(code=lang_code)
                                 translation_text = translations[key].strip()
                                 
-                                # Проверяем, существует ли уже слово с таким переводом
-                                existing_word = Word.objects.filter(
-                                    word=translation_text,
-                                    language=target_language,
-                                    is_deleted=False
-                                ).first()
-                                
-                                if existing_word:
-                                    # Используем существующее слово
-                                    target_word = existing_word
-                                else:
-                                    # Создаем новое слово на целевом языке
-                                    target_word, created = Word.objects.get_or_create(
-                                        word=translation_text,
-                                        language=target_language,
-                                        category=word.category,
-                                        defaults={
-                                            'meaning': word.meaning,
-                                            'status': 'pending',
-                                            'is_deleted': False,
-                                            'created_by': request.user
-                                        }
-                                    )
-                                    if created:
-                                        created_count += 1
+                                # Используем существующее слово или создаем новое на целевом языке
+                                target_word, created = Word.objects.get_or_create_headword(
+                                    translation_text,
+                                    target_language,
+                                    defaults={
+                                        'meaning': word.meaning,
+                                        'category': word.category,
+                                        'status': 'pending',
+                                        'is_deleted': False,
+                                        'created_by': request.user
+                                    }
+                                )
+                                if created:
+                                    created_count += 1
                                 
                                 # Создаем или обновляем перевод
                                 translation, created = Translation.objects.get_or_create(
@@ -1093,23 +1116,16 @@ def bulk_multi_translate(request):
     if search_query:
         words = words.filter(word__icontains=search_query)
     
-    # Исключаем слова, которые уже имеют переводы на все языки
-    words = words.annotate(
-        translation_count=Count('from_translations', filter=Q(from_translations__status='approved'))
-    )
-    
     words = words.order_by('word')[:limit]
     
     # Получить данные для фильтров
     languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
+    categories = Category.objects.cached().order_by('code')
     
     # Статистика
-    total_words = Word.objects.filter(is_deleted=False).count()
-    words_with_translations = Word.objects.filter(
-        is_deleted=False,
-        from_translations__status='approved'
-    ).distinct().count()
+    counters = stats.values(stats.WORDS_ACTIVE, stats.WORDS_TRANSLATED_ACTIVE)
+    total_words = counters[stats.WORDS_ACTIVE]
+    words_with_translations = counters[stats.WORDS_TRANSLATED_ACTIVE]
     
     context = {
         'words': words,
@@ -1136,38 +1152,31 @@ def auto_fill_translations(request):
             
             auto_filled_translations = {}
             
-            for word_id in word_ids:
-                try:
-                    word = Word.objects.get(id=word_id)
-                    
-                    for lang_code in target_languages:
-                        # Ищем существующие переводы этого слова на целевой язык
-                        existing_translations = Translation.objects.filter(
-                            from_word=word,
-                            to_word__language__code=lang_code,
-                            status='approved'
-                        ).select_related('to_word')
-                        
-                        if existing_translations.exists():
-                            # Берем первый найденный перевод
-                            translation = existing_translations.first()
-                            auto_filled_translations[f"{word_id}_{lang_code}"] = translation.to_word.word
-                        else:
-                            # Ищем похожие слова на целевом языке
-                            similar_words = Word.objects.filter(
-                                language__code=lang_code,
-                                word__icontains=word.word[:3],  # Поиск по первым 3 буквам
-                                is_deleted=False
-                            )[:1]
-                            
-                            if similar_words.exists():
-                                auto_filled_translations[f"{word_id}_{lang_code}"] = f"[SIMILAR] {similar_words.first().word}"
-                            else:
-                                # Генерируем заглушку
-                                auto_filled_translations[f"{word_id}_{lang_code}"] = f"[AUTO] {word.word} ({lang_code})"
+            words = Word.objects.in_bulk(word_ids)
+            
+            # Существующие одобренные переводы на целевые языки - одним запросом
+            existing_translations = {}
+            for from_word_id, lang_code, to_word in Translation.objects.filter(
+                from_word_id__in=words,
+                to_word__language__code__in=target_languages,
+                status='approved'
+            ).order_by('-order', '-id').values_list('from_word_id', 'to_word__language__code', 'to_word__word'):
+                existing_translations[(from_word_id, lang_code)] = to_word
+            
+            for lang_code in target_languages:
+                # Похожие слова на целевом языке для всех слов без перевода сразу
+                missing = [word for word in words.values() if (word.pk, lang_code) not in existing_translations]
+                similar = similar_words_for(lang_code, {word.word for word in missing}, limit=1, exclude_exact=False)
                 
-                except Word.DoesNotExist:
-                    continue
+                for word in words.values():
+                    key = f"{word.pk}_{lang_code}"
+                    if (word.pk, lang_code) in existing_translations:
+                        auto_filled_translations[key] = existing_translations[(word.pk, lang_code)]
+                    elif similar[word.word]:
+                        auto_filled_translations[key] = f"[SIMILAR] {similar[word.word][0]['word']}"
+                    else:
+                        # Генерируем заглушку
+                        auto_filled_translations[key] = f"[AUTO] {word.word} ({lang_code})"
             
             return JsonResponse({
                 'success': True,
@@ -1190,7 +1199,8 @@ def quick_translate(request):
     language_filter = request.GET.get('language', '')
     category_filter = request.GET.get('category', '')
     tag_filter = request.GET.get('tag', '')
-    sort_by = request.GET.get('sort', 'word')  # word, category, created_at
+    # При поиске по умолчанию сортируем по релевантности
+    sort_by = request.GET.get('sort', 'relevance' if search_query else 'word')  # relevance, word, category, created_at
     sort_order = request.GET.get('order', 'asc')  # asc, desc
     
     # Базовый queryset
@@ -1199,8 +1209,7 @@ def quick_translate(request):
     # Фильтрация по поиску
     if search_query:
         words = words.filter(
-            Q(word__icontains=search_query) |
-            Q(meaning__icontains=search_query) |
+            search_q(search_query, language_filter or None) |
             Q(category__code__icontains=search_query) |
             Q(tags__code__icontains=search_query)
         ).distinct()
@@ -1217,34 +1226,39 @@ def quick_translate(request):
     if tag_filter:
         words = words.filter(tags__code=tag_filter)
     
-    # Сортировка
-    if sort_by == 'category':
-        words = words.order_by('category__code', 'word')
+    # Сортировка: ключ пагинации всегда заканчивается уникальным id
+    if sort_by == 'relevance' and search_query:
+        words = rank_words(words, search_query, language_filter or None)
+        ordering = list(RELEVANCE_ORDERING)
+    elif sort_by == 'category':
+        # Слова без категории идут первыми (как NULL при сортировке в SQLite)
+        words = words.annotate(category_sort=Coalesce('category__code', Value('')))
+        ordering = ['category_sort', 'word', 'id']
     elif sort_by == 'created_at':
-        words = words.order_by('created_at')
+        ordering = ['created_at', 'id']
     else:
-        words = words.order_by('word')
+        sort_by = 'word'
+        ordering = ['word', 'id']
     
-    if sort_order == 'desc':
-        words = words.reverse()
+    # Релевантность всегда от лучших совпадений к худшим
+    if sort_order == 'desc' and sort_by != 'relevance':
+        ordering = ['-' + field for field in ordering]
     
     # Пагинация
-    paginator = Paginator(words, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(words.for_list(), 20, ordering=ordering)
+    page_obj = paginator.page(request.GET.get('cursor'), request.GET.get('page'))
+    if search_query:
+        page_obj.object_list = highlight_words(page_obj.object_list, search_query, language_filter or None)
     
     # Получение данных для фильтров
     languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
-    tags = Tag.objects.filter(display_mode='visible').order_by('code')
+    categories = Category.objects.cached().order_by('code')
+    tags = Tag.objects.cached().filter(display_mode='visible').order_by('code')
     
     # Статистика
-    total_terms = Word.objects.published().count()
-    terms_with_translations = Word.objects.filter(
-        is_deleted=False, 
-        status='approved',
-        from_translations__status='approved'
-    ).distinct().count()
+    counters = stats.values(stats.WORDS_PUBLISHED, stats.WORDS_TRANSLATED_PUBLISHED)
+    total_terms = counters[stats.WORDS_PUBLISHED]
+    terms_with_translations = counters[stats.WORDS_TRANSLATED_PUBLISHED]
     
     context = {
         'page_obj': page_obj,
@@ -1259,7 +1273,11 @@ def quick_translate(request):
         'sort_order': sort_order,
         'total_terms': total_terms,
         'terms_with_translations': terms_with_translations,
-        'translation_progress': round((terms_with_translations / total_terms * 100) if total_terms > 0 else 0, 1)
+        'translation_progress': round((terms_with_translations / total_terms * 100) if total_terms > 0 else 0, 1),
+        # Ключ кэша строк таблицы (см. шаблон)
+        'card_version': registry.version(),
+        'user_language': request.session.get('language', 'ru'),
+        'is_admin': request.user.is_staff or request.user.is_superuser,
     }
     
     return render(request, 'dictionary/quick_translate.html', context)
@@ -1302,11 +1320,9 @@ def quick_translate_detail(request, slug):
                         description_text = request.POST.get(description_key, '').strip()
                         
                         # Проверяем существующее слово
-                        existing_word = Word.objects.filter(
-                            word=translation_text,
-                            language=language,
-                            is_deleted=False
-                        ).first()
+                        existing_word = Word.objects.by_headword(
+                            translation_text, language
+                        ).filter(is_deleted=False).first()
                         
                         if existing_word:
                             target_word = existing_word
@@ -1372,8 +1388,8 @@ def quick_translate_detail(request, slug):
             }
     
     # Получение данных для форм
-    categories = Category.objects.all().order_by('code')
-    all_tags = Tag.objects.all().order_by('code')
+    categories = Category.objects.cached().order_by('code')
+    all_tags = Tag.objects.cached().order_by('code')
     
     context = {
         'word': word,
@@ -1386,6 +1402,10 @@ def quick_translate_detail(request, slug):
     
     return render(request, 'dictionary/quick_translate_detail.html', context)
 
+def get_recent_words():
+    """Вспомогательная функция: слова, добавленные за последнюю неделю (боковая панель)"""
+    return Word.objects.recent(days=7).for_list().cached()[:5]
+
 @staff_member_required
 def word_create(request):
     """Создание нового слова"""
@@ -1397,10 +1417,7 @@ def word_create(request):
                 word.created_by = request.user
                 
                 # Проверяем, не существует ли уже слово с таким же названием на том же языке
-                existing_word = Word.objects.filter(
-                    word=word.word, 
-                    language=word.language
-                ).first()
+                existing_word = Word.objects.by_headword(word.word, word.language).first()
                 
                 if existing_word:
                     messages.error(request, f'Слово "{word.word}" на языке {word.language.name} уже существует')
@@ -1408,8 +1425,8 @@ def word_create(request):
                         'form': form,
                         'title': 'Создание нового слова',
                         'submit_text': 'Создать слово',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1420,8 +1437,8 @@ def word_create(request):
                         'form': form,
                         'title': 'Создание нового слова',
                         'submit_text': 'Создать слово',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1431,8 +1448,8 @@ def word_create(request):
                         'form': form,
                         'title': 'Создание нового слова',
                         'submit_text': 'Создать слово',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1451,8 +1468,8 @@ def word_create(request):
                         'form': form,
                         'title': 'Создание нового слова',
                         'submit_text': 'Создать слово',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1465,8 +1482,8 @@ def word_create(request):
                         'form': form,
                         'title': 'Создание нового слова',
                         'submit_text': 'Создать слово',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1480,8 +1497,8 @@ def word_create(request):
                         'form': form,
                         'title': 'Создание нового слова',
                         'submit_text': 'Создать слово',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1499,8 +1516,8 @@ def word_create(request):
                     'form': form,
                     'title': 'Создание нового слова',
                     'submit_text': 'Создать слово',
-                    'recent_words': Word.objects.recent(days=7)[:5],
-                    'words_without_translations': Word.objects.without_translations()[:5],
+                    'recent_words': get_recent_words(),
+                    'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                 }
                 return render(request, 'dictionary/word_form.html', context)
     else:
@@ -1510,8 +1527,8 @@ def word_create(request):
         'form': form,
         'title': 'Создание нового слова',
         'submit_text': 'Создать слово',
-        'recent_words': Word.objects.recent(days=7)[:5],
-        'words_without_translations': Word.objects.without_translations()[:5],
+        'recent_words': get_recent_words(),
+        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
     }
     return render(request, 'dictionary/word_form.html', context)
 
@@ -1524,15 +1541,12 @@ def word_edit(request, slug):
         form = WordForm(request.POST, instance=word)
         if form.is_valid():
             try:
-                # Проверяем, не изменился ли язык слова
-                old_language = word.language
                 new_language = form.cleaned_data['language']
                 
                 # Проверяем, не существует ли уже слово с таким же названием на новом языке
-                if old_language != new_language:
-                    existing_word = Word.objects.filter(
-                        word=form.cleaned_data['word'], 
-                        language=new_language
+                if word.has_changed('word', 'language_id'):
+                    existing_word = Word.objects.by_headword(
+                        form.cleaned_data['word'], new_language
                     ).exclude(pk=word.pk).first()
                     
                     if existing_word:
@@ -1542,8 +1556,8 @@ def word_edit(request, slug):
                             'word': word,
                             'title': f'Редактирование слова "{word.word}"',
                             'submit_text': 'Сохранить изменения',
-                            'recent_words': Word.objects.recent(days=7)[:5],
-                            'words_without_translations': Word.objects.without_translations()[:5],
+                            'recent_words': get_recent_words(),
+                            'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                         }
                         return render(request, 'dictionary/word_form.html', context)
                 
@@ -1561,8 +1575,8 @@ def word_edit(request, slug):
                         'word': word,
                         'title': f'Редактирование слова "{word.word}"',
                         'submit_text': 'Сохранить изменения',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1575,8 +1589,8 @@ def word_edit(request, slug):
                         'word': word,
                         'title': f'Редактирование слова "{word.word}"',
                         'submit_text': 'Сохранить изменения',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1590,8 +1604,8 @@ def word_edit(request, slug):
                         'word': word,
                         'title': f'Редактирование слова "{word.word}"',
                         'submit_text': 'Сохранить изменения',
-                        'recent_words': Word.objects.recent(days=7)[:5],
-                        'words_without_translations': Word.objects.without_translations()[:5],
+                        'recent_words': get_recent_words(),
+                        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                     }
                     return render(request, 'dictionary/word_form.html', context)
                 
@@ -1610,8 +1624,8 @@ def word_edit(request, slug):
                     'word': word,
                     'title': f'Редактирование слова "{word.word}"',
                     'submit_text': 'Сохранить изменения',
-                    'recent_words': Word.objects.recent(days=7)[:5],
-                    'words_without_translations': Word.objects.without_translations()[:5],
+                    'recent_words': get_recent_words(),
+                    'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
                 }
                 return render(request, 'dictionary/word_form.html', context)
     else:
@@ -1622,8 +1636,8 @@ def word_edit(request, slug):
         'word': word,
         'title': f'Редактирование слова "{word.word}"',
         'submit_text': 'Сохранить изменения',
-        'recent_words': Word.objects.recent(days=7)[:5],
-        'words_without_translations': Word.objects.without_translations()[:5],
+        'recent_words': get_recent_words(),
+        'words_without_translations': Word.objects.without_translations().for_list().cached()[:5],
     }
     return render(request, 'dictionary/word_form.html', context)
 
@@ -1644,8 +1658,7 @@ def term_list(request):
     # Фильтрация по поиску
     if search_query:
         words = words.filter(
-            Q(word__icontains=search_query) |
-            Q(meaning__icontains=search_query) |
+            search_q(search_query) |
             Q(category__code__icontains=search_query) |
             Q(tags__code__icontains=search_query)
         ).distinct()
@@ -1662,34 +1675,32 @@ def term_list(request):
     if tag_filter:
         words = words.filter(tags__code=tag_filter)
     
-    # Сортировка
+    # Сортировка: ключ пагинации всегда заканчивается уникальным id
     if sort_by == 'category':
-        words = words.order_by('category__code', 'word')
+        # Слова без категории идут первыми (как NULL при сортировке в SQLite)
+        words = words.annotate(category_sort=Coalesce('category__code', Value('')))
+        ordering = ['category_sort', 'word', 'id']
     elif sort_by == 'created_at':
-        words = words.order_by('created_at')
+        ordering = ['created_at', 'id']
     else:
-        words = words.order_by('word')
+        ordering = ['word', 'id']
     
     if sort_order == 'desc':
-        words = words.reverse()
+        ordering = ['-' + field for field in ordering]
     
     # Пагинация
-    paginator = Paginator(words, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(words.for_list(), 20, ordering=ordering)
+    page_obj = paginator.page(request.GET.get('cursor'), request.GET.get('page'))
     
     # Получение данных для фильтров
     languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
-    tags = Tag.objects.filter(display_mode='visible').order_by('code')
+    categories = Category.objects.cached().order_by('code')
+    tags = Tag.objects.cached().filter(display_mode='visible').order_by('code')
     
     # Статистика
-    total_terms = Word.objects.published().count()
-    terms_with_translations = Word.objects.filter(
-        is_deleted=False, 
-        status='approved',
-        from_translations__status='approved'
-    ).distinct().count()
+    counters = stats.values(stats.WORDS_PUBLISHED, stats.WORDS_TRANSLATED_PUBLISHED)
+    total_terms = counters[stats.WORDS_PUBLISHED]
+    terms_with_translations = counters[stats.WORDS_TRANSLATED_PUBLISHED]
     
     context = {
         'page_obj': page_obj,
@@ -1747,11 +1758,9 @@ def term_detail(request, term_id):
                         description_text = request.POST.get(description_key, '').strip()
                         
                         # Проверяем существующее слово
-                        existing_word = Word.objects.filter(
-                            word=translation_text,
-                            language=language,
-                            is_deleted=False
-                        ).first()
+                        existing_word = Word.objects.by_headword(
+                            translation_text, language
+                        ).filter(is_deleted=False).first()
                         
                         if existing_word:
                             target_word = existing_word
@@ -1817,8 +1826,8 @@ def term_detail(request, term_id):
             }
     
     # Получение данных для форм
-    categories = Category.objects.all().order_by('code')
-    all_tags = Tag.objects.all().order_by('code')
+    categories = Category.objects.cached().order_by('code')
+    all_tags = Tag.objects.cached().order_by('code')
     
     context = {
         'word': word,
@@ -1909,11 +1918,8 @@ def check_translations_api(request):
     except Language.DoesNotExist:
         return JsonResponse({'error': 'Язык не найден'}, status=404)
     
-    # Проверяем существование слова
-    existing_word = Word.objects.filter(
-        word__iexact=word_text,
-        language=language
-    ).first()
+    # Проверяем существование слова по заголовку в любой письменности (кириллица, латиница, без диакритики)
+    existing_word = Word.objects.by_lookup_key(word_text, language).first()
     
     if existing_word:
         # Слово уже существует - возвращаем информацию о переводах
@@ -1932,17 +1938,14 @@ def check_translations_api(request):
             'translations': translations
         })
     
-    # Слово не существует - ищем похожие
-    similar_words = Word.objects.filter(
-        Q(word__icontains=word_text) | Q(word__istartswith=word_text),
-        language=language
-    ).exclude(word__iexact=word_text)[:5]
+    # Слово не существует - ищем похожие (с учетом опечаток)
+    similar_words = similar_words_for(language.code, [word_text], limit=5)[word_text]
     
     similar_data = []
     for word in similar_words:
         similar_data.append({
-            'word': word.word,
-            'url': reverse('dictionary:word_detail', kwargs={'slug': word.slug})
+            'word': word['word'],
+            'url': reverse('dictionary:word_detail', kwargs={'slug': word['slug']})
         })
     
     return JsonResponse({
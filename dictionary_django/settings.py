@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 
 from pathlib import Path
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -141,6 +142,64 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Словари автодополнения (memory-mapped файлы, общие для всех воркеров)
+AUTOCOMPLETE_DIR = os.getenv('DJANGO_AUTOCOMPLETE_DIR', BASE_DIR / 'var' / 'autocomplete')
+
+# Кэш: LRU в памяти воркера перед общим для всех воркеров бэкендом
+# (файлы в var/cache или Redis, если задан DJANGO_REDIS_URL), см. dictionary/tiered_cache.py
+if os.getenv('DJANGO_REDIS_URL'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('DJANGO_REDIS_URL'),
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR', BASE_DIR / 'var' / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'dictionary.tiered_cache.TieredCache',
+        'LOCATION': 'shared',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'LOCAL_TIMEOUT': float(os.getenv('DJANGO_LOCAL_CACHE_TIMEOUT', 2)),
+            'LOCAL_MAX_ENTRIES': 1000,
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+# Срок записей кэша запросов (queryset.cached()); сбрасываются они записью
+# в свои таблицы, см. dictionary/query_cache.py
+QUERY_CACHE_TIMEOUT = 300
+
+# Выкладка шаблонов: входит в ETag публичных страниц (см. dictionary/conditional.py)
+PAGE_RELEASE = os.getenv('DJANGO_RELEASE', '')
+
+# Микрокэш nginx для анонимных страниц и адрес его внутреннего сервера
+# для обновления записей после изменения слов (см. dictionary/microcache.py)
+MICRO_CACHE_SECONDS = int(os.getenv('DJANGO_MICRO_CACHE_SECONDS', 10))
+CACHE_PURGE_URL = os.getenv('DJANGO_CACHE_PURGE_URL', '')
+if CACHE_PURGE_URL:
+    # Запросы обновления приходят от внутреннего сервера nginx с его именем в Host
+    ALLOWED_HOSTS.append(urlsplit(CACHE_PURGE_URL).hostname)
+
+# Кэш результатов поиска на главной (в памяти каждого воркера)
+SEARCH_RESULT_CACHE = {
+    'MAX_ENTRIES': int(os.getenv('DJANGO_SEARCH_CACHE_ENTRIES', 512)),
+    'TTL': int(os.getenv('DJANGO_SEARCH_CACHE_TTL', 60)),
+}
+
+# Буферизованная запись истории поиска (пачки bulk_create из фонового потока)
+SEARCH_HISTORY = {
+    'BATCH_SIZE': 50,
+    'FLUSH_INTERVAL': 5.0,
+    'MAX_BUFFER': 2000,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -186,9 +186,9 @@ def populate_legal_terms():
     for lang_code, terms in LEGAL_TERMS.items():
         print(f"Creating words for language: {lang_code}")
         for word_text, meaning, pronunciation in terms:
-            word, created = Word.objects.get_or_create(
-                word=word_text,
-                language=language_objects[lang_code],
+            word, created = Word.objects.get_or_create_headword(
+                word_text,
+                language_objects[lang_code],
                 defaults={
                     'meaning': meaning,
                     'pronunciation': pronunciation,
@@ -8,6 +8,8 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dictionary_django.settings')
 django.setup()
 
+from django.db import transaction
+
 from dictionary.models import Word, Category
 
 def update_legal_terms_status():
@@ -18,8 +20,14 @@ def update_legal_terms_status():
     
     print(f"Найдено {legal_words.count()} юридических терминов")
     
-    # Обновляем статус на 'approved'
-    updated_count = legal_words.update(status='approved')
+    # Обновляем статус на 'approved' через save(): сигналы обновляют счётчики,
+    # словари автодополнения, документы слов и кэши (queryset.update их обходит)
+    updated_count = 0
+    with transaction.atomic():
+        for word in legal_words.exclude(status='approved'):
+            word.status = 'approved'
+            word.save(update_fields=['status', 'updated_at'])
+            updated_count += 1
     
     print(f"Обновлено {updated_count} записей - статус изменен на 'опубликовано'")
     